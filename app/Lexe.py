@@ -19,7 +19,7 @@ class Tokenizer(Lexer):
 
         }
         literals = {
-                '+', '-', '*', '/',")","(","{","}",";",",","%","<",">","=","!","[","]"
+                '+', '-', '*', '/',")","(","{","}",";",",","%","<",">","=","!","[","]","."
         }
 
         ignore = ' \t\r'
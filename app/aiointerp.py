@@ -0,0 +1,199 @@
+# minic/aiointerp.py
+'''
+Ejecución cooperativa con asyncio
+=================================
+
+AsyncInterpreter ejecuta un programa como una corrutina que cede el
+control al event loop cada yield_every instrucciones, de modo que un
+solo proceso puede intercalar cientos de programas MiniC.  Cada
+programa usa su propia instancia (registros, variables, globales y
+salida propios):
+
+	async def handle(source, writer):
+		interpreter = AsyncInterpreter(output=AsyncStreamSink(writer))
+		return await interpreter.execute_async(compile_ircode(source))
+
+Para poder ceder el control en medio de llamadas anidadas, las llamadas
+MiniC no usan la pila de Python: run_CALL y run_CALLQ solo dejan la
+llamada pendiente y el ciclo de execute_async mantiene su propia pila
+de frames.  Por lo mismo, la recursión de MiniC no está limitada por la
+de Python.
+
+Las instrucciones se cuentan por bloque, en cada salto, llamada y
+retorno.  La salida va a un sink asíncrono (ver output.py) que se vacía
+cada vez que el programa cede el control.  Para limitar el tiempo de un
+programa basta con asyncio.wait_for().
+
+    bash % python3 -m minic.aiointerp prog1.c prog2.c ...
+
+'''
+import asyncio
+
+from ircode import Function
+from interp import Interpreter, HALT
+from output import AsyncSink
+
+# Valor de pc que retornan las instrucciones de llamada
+CALL_PENDING = HALT - 1
+
+# Instrucciones por defecto entre dos cesiones del control
+YIELD_EVERY = 1000
+
+class AsyncInterpreter(Interpreter):
+	'''
+	Intérprete que se ejecuta como una corrutina de asyncio
+	'''
+	def __init__(self, yield_every=YIELD_EVERY, output=None, **kwargs):
+		super().__init__(output=output or AsyncSink(), **kwargs)
+		self.yield_every = yield_every
+
+		# Llamada dejada por run_CALL/run_CALLQ: (función, argumentos,
+		# registro destino)
+		self.pending_call = None
+
+		# Cuántas veces cedió el control
+		self.yields = 0
+
+	async def execute_async(self, code):
+		'''
+		Versión asíncrona de Interpreter.execute
+		'''
+		if code and isinstance(code[0], tuple):
+			function = Function('__minic_main', [], 'I')
+			function.code = list(code)
+			code = [function]
+
+		self.load(code)
+
+		try:
+			if '__minic_init' in self.functions:
+				await self.call_async(self.functions['__minic_init'], ())
+			if '__minic_main' in self.functions:
+				return await self.call_async(self.functions['__minic_main'], ())
+		finally:
+			await self.drain()
+
+	async def drain(self):
+		drain = getattr(self.output, 'drain', None)
+		if drain:
+			await drain()
+		else:
+			self.output.flush()
+
+	async def pause(self):
+		self.yields += 1
+		await self.drain()
+		await asyncio.sleep(0)
+
+	def enter(self, function, arguments):
+		'''
+		Prepara un frame para function y lo deja como frame actual
+		'''
+		frame = function.new_frame()
+		frame.vars[:len(arguments)] = arguments
+		self.function = function
+		self.registers = frame.registers
+		self.vars = frame.vars
+		self.slots = function.slots
+		return frame
+
+	async def call_async(self, function, arguments):
+		'''
+		Ejecuta function con su propia pila de llamadas, cediendo el
+		control cada yield_every instrucciones
+		'''
+		saved = self.function, self.registers, self.vars, self.slots
+		stack = [ ]
+		frame = self.enter(function, arguments)
+		program = function.program
+		pc = start = 0
+		budget = self.yield_every
+		try:
+			while True:
+				if pc >= len(program):
+					# Fin de la función (RET o fin del código)
+					function.release_frame(frame)
+					frame = None
+					result = self.retval
+					self.retval = None
+					if not stack:
+						return result
+					function, frame, program, pc, target = stack.pop()
+					self.function = function
+					self.registers = frame.registers
+					self.vars = frame.vars
+					self.slots = function.slots
+					self.registers[target] = result
+					start = pc
+					continue
+
+				handler, args = program[pc]
+				pc += 1
+				target = handler(*args)
+				if target is None:
+					continue
+
+				budget -= pc - start
+				if target == CALL_PENDING:
+					callee, values, result = self.pending_call
+					self.pending_call = None
+					stack.append((function, frame, program, pc, result))
+					function = callee
+					frame = self.enter(callee, values)
+					program = callee.program
+					target = 0
+				pc = start = target
+
+				if budget <= 0:
+					budget = self.yield_every
+					await self.pause()
+		finally:
+			# Si el programa falló o se canceló la tarea, los frames de la
+			# pila vuelven a sus funciones
+			if frame is not None:
+				function.release_frame(frame)
+			while stack:
+				function, frame, *_ = stack.pop()
+				function.release_frame(frame)
+			self.function, self.registers, self.vars, self.slots = saved
+
+	def run_CALL(self, name, *registers):
+		*arguments, target = registers
+		self.pending_call = (self.functions[name], [self.registers[r] for r in arguments], target)
+		return CALL_PENDING
+
+	def run_CALLQ(self, function, arguments, target):
+		registers = self.registers
+		self.pending_call = (function, [registers[r] for r in arguments], target)
+		return CALL_PENDING
+
+async def run_programs(programs, yield_every=YIELD_EVERY):
+	'''
+	Ejecuta concurrentemente una lista de programas (listas de
+	ircode.Function).  Retorna una lista de pares (resultado, salida).
+	'''
+	async def run(code):
+		interpreter = AsyncInterpreter(yield_every)
+		result = await interpreter.execute_async(code)
+		return result, interpreter.output.getvalue()
+
+	return await asyncio.gather(*(run(code) for code in programs))
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	if len(sys.argv) < 2:
+		sys.stderr.write('Usage: python3 -m minic.aiointerp filename ...\n')
+		raise SystemExit(1)
+
+	programs = [compile_ircode(open(filename).read()) for filename in sys.argv[1:]]
+	if not errors_reported():
+		results = asyncio.run(run_programs(programs))
+		for filename, (result, output) in zip(sys.argv[1:], results):
+			print(f'{"::"*5} {filename} -> {result} {"::"*5}')
+			print(output, end='')
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,169 @@
+# minic/batch.py
+'''
+Ejecución por lotes
+===================
+
+Compila y ejecuta muchos programas MiniC en paralelo con un
+concurrent.futures.ProcessPoolExecutor.  Cada proceso del pool importa
+el compilador una sola vez al arrancar (init_worker): las tablas del
+cparse.Parser se construyen al importar el módulo, así que los trabajos
+siguientes solo pagan el análisis de su propio programa.
+
+La entrada es un directorio (se ejecutan todos sus archivos .c, en
+orden) o un manifiesto: un archivo de texto con una ruta por línea,
+relativa al manifiesto.  Las líneas vacías y las que empiezan con '#'
+se ignoran.
+
+Por cada programa se registra:
+
+	path        ruta del programa
+	status      'ok', 'compile-error', 'limit', 'error' o 'crash'
+	exit        valor retornado por main (o None)
+	stdout      salida del programa
+	errors      mensajes de error del compilador o de la ejecución
+	limit       límite excedido y lo consumido (solo si status es 'limit')
+	compile     tiempo de compilación, en segundos
+	run         tiempo de ejecución, en segundos
+
+y todo se escribe en un solo archivo JSON:
+
+    bash % python3 -m minic.batch --workers=8 --output=results.json tests/
+
+Los límites de interp.py (--max-instructions, --time-limit,
+--max-allocated, --max-depth) se aplican a cada programa.  La
+profundidad de llamadas se limita siempre (MAX_DEPTH por defecto): una
+recursión sin fin termina el proceso del worker antes de que Python
+pueda detenerla, y con él el pool.
+
+'''
+import io
+import os
+import sys
+import json
+import contextlib
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Profundidad máxima de llamadas por defecto para cada programa
+MAX_DEPTH = 5000
+
+def init_worker():
+	'''
+	Inicializa un proceso del pool: importa el compilador (construye las
+	tablas del parser) y sube el límite de recursión
+	'''
+	import cparse
+	import ircode
+	from interp import RECURSION_LIMIT
+	sys.setrecursionlimit(RECURSION_LIMIT)
+
+def run_program(path, limits=None):
+	'''
+	Compila y ejecuta el programa en path.  Retorna un diccionario con
+	el resultado (ver el docstring del módulo).
+	'''
+	from ircode import compile_ircode
+	from interp import Interpreter, ExecutionLimitExceeded
+	from output import CaptureSink
+	from errores import errors_reported, clear_errors
+
+	result = {'path': path, 'status': 'ok', 'exit': None, 'stdout': '', 'errors': '', 'compile': 0.0, 'run': 0.0}
+	errors = io.StringIO()
+	with contextlib.redirect_stderr(errors):
+		clear_errors()
+		start = perf_counter()
+		try:
+			with open(path) as file:
+				code = compile_ircode(file.read())
+		except Exception as e:
+			code = None
+			print(f'{type(e).__name__}: {e}', file=sys.stderr)
+		result['compile'] = perf_counter() - start
+
+		if code is None or errors_reported():
+			result['status'] = 'compile-error'
+		else:
+			output = CaptureSink()
+			start = perf_counter()
+			try:
+				result['exit'] = Interpreter(output=output).execute(code, **(limits or { }))
+			except ExecutionLimitExceeded as e:
+				result['status'] = 'limit'
+				result['limit'] = e.as_dict()
+			except Exception as e:
+				result['status'] = 'error'
+				print(f'{type(e).__name__}: {e}', file=sys.stderr)
+			result['run'] = perf_counter() - start
+			result['stdout'] = output.getvalue()
+	result['errors'] = errors.getvalue()
+	return result
+
+def find_programs(path):
+	'''
+	Retorna la lista de programas de un directorio o de un manifiesto
+	'''
+	if os.path.isdir(path):
+		return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.c')]
+
+	base = os.path.dirname(path)
+	programs = []
+	with open(path) as file:
+		for line in file:
+			line = line.strip()
+			if line and not line.startswith('#'):
+				programs.append(os.path.join(base, line))
+	return programs
+
+def run_batch(paths, workers=None, limits=None):
+	'''
+	Ejecuta los programas de paths en un pool de workers procesos.
+	Retorna la lista de resultados, en el mismo orden que paths.
+	'''
+	limits = {'max_depth': MAX_DEPTH, **(limits or { })}
+	results = []
+	with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+		futures = [executor.submit(run_program, path, limits) for path in paths]
+		for path, future in zip(paths, futures):
+			try:
+				results.append(future.result())
+			except Exception as e:
+				results.append({'path': path, 'status': 'crash', 'exit': None, 'stdout': '', 
+					'errors': f'{type(e).__name__}: {e}', 'compile': 0.0, 'run': 0.0})
+	return results
+
+def main():
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write('Usage: python3 -m minic.batch [--workers=n] [--output=file] [--max-instructions=n] '
+			'[--time-limit=seconds] [--max-allocated=bytes] [--max-depth=n] directory|manifest\n')
+		raise SystemExit(1)
+
+	workers = None
+	output = 'results.json'
+	limits = { }
+	for arg in sys.argv[1:]:
+		if arg.startswith('--workers='):
+			workers = int(arg.split('=', 1)[1])
+		elif arg.startswith('--output='):
+			output = arg.split('=', 1)[1]
+		elif arg.startswith('--max-instructions='):
+			limits['max_instructions'] = int(arg.split('=', 1)[1])
+		elif arg.startswith('--time-limit='):
+			limits['time_limit'] = float(arg.split('=', 1)[1])
+		elif arg.startswith('--max-allocated='):
+			limits['max_allocated'] = int(arg.split('=', 1)[1])
+		elif arg.startswith('--max-depth='):
+			limits['max_depth'] = int(arg.split('=', 1)[1])
+
+	start = perf_counter()
+	results = run_batch(find_programs(args[0]), workers, limits)
+	elapsed = perf_counter() - start
+
+	with open(output, 'w') as file:
+		json.dump({'elapsed': elapsed, 'results': results}, file, indent=2)
+
+	failed = sum(result['status'] != 'ok' for result in results)
+	sys.stderr.write(f'{len(results)} programas, {failed} con errores, {elapsed:.2f} s -> {output}\n')
+
+if __name__ == '__main__':
+	main()
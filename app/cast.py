@@ -244,6 +244,12 @@ class ArraySimpleLocation(Location):
 	name: str
 	size: Expression
 
+class ArraySize(Expression):
+	'''
+	name.size
+	'''
+	name : str
+
 # ----------------------------------------------------------------------
 #                NO MODIFIQUE NADA DE AQUI EN ADELANTE
 # ----------------------------------------------------------------------
@@ -0,0 +1,416 @@
+# minic/cfg.py
+'''
+Grafo de flujo de control
+=========================
+
+Parte el código de una ircode.Function en bloques básicos y construye
+su grafo de flujo de control (CFG).  Un bloque empieza en un LABEL (o
+después de un salto) y termina en BRANCH, CBRANCH o RET, o cae al
+bloque siguiente.
+
+Además del grafo, el módulo calcula:
+
+  * El árbol de dominadores (algoritmo iterativo de Cooper, Harvey y
+    Kennedy sobre el orden reverso postorden).
+
+  * Las fronteras de dominancia, para colocar nodos phi (ver ssa.py).
+
+  * Los ciclos naturales: cada salto hacia atrás t -> h, donde h domina
+    a t, define un ciclo con encabezado h.
+
+ControlFlowGraph.to_code() vuelve a generar la lista de instrucciones.
+Los bloques se emiten en su orden; solo se agrega un BRANCH cuando un
+bloque que cae a su sucesor ya no queda justo antes de él.
+
+Para ver los bloques de un programa utiliza:
+
+    bash % python3 -m minic.cfg someprogram.c
+
+'''
+from ircode import IR_DEFINES, get_base_op_code, get_operand_kinds, get_registers, register_index
+
+TERMINATORS = {'BRANCH', 'CBRANCH', 'RET'}
+
+def new_register(function):
+	'''
+	Crea un nuevo registro en function (igual que GenerateCode)
+	'''
+	function.register_count += 1
+	return f'R{function.register_count}'
+
+def replace_uses(inst, mapping):
+	'''
+	Retorna inst con los registros leídos cambiados según mapping
+	'''
+	kinds = get_operand_kinds(inst)
+	last = max((n for n, kind in enumerate(kinds) if kind == 'r'), default=None)
+	if get_base_op_code(inst[0]) not in IR_DEFINES:
+		last = None
+	args = [mapping.get(arg, arg) if kind == 'r' and n != last else arg
+		for n, (kind, arg) in enumerate(zip(kinds, inst[1:]))]
+	return (inst[0], *args)
+
+def branch_targets(inst):
+	'''
+	Rotulos a los que salta la instrucción inst
+	'''
+	if inst[0] == 'BRANCH':
+		return [inst[1]]
+	if inst[0] == 'CBRANCH':
+		return [inst[2], inst[3]]
+	return []
+
+class BasicBlock(object):
+	'''
+	Un bloque básico: su rotulo, sus instrucciones (sin el LABEL), los
+	nodos phi (en forma SSA) y los bloques sucesores y predecesores.
+	'''
+	def __init__(self, label):
+		self.label = label
+		self.code = [ ]
+		self.phis = [ ]
+		self.succs = [ ]
+		self.preds = [ ]
+
+		# Bloque al que cae la ejecución si no termina en un salto
+		self.fallthrough = None
+
+	def terminator(self):
+		if self.code and self.code[-1][0] in TERMINATORS:
+			return self.code[-1]
+		return None
+
+	def __repr__(self):
+		return f'BasicBlock({self.label})'
+
+class ControlFlowGraph(object):
+	'''
+	CFG de una ircode.Function.  blocks guarda los bloques en el orden
+	del código; el primero es el bloque de entrada.
+	'''
+	def __init__(self, function):
+		self.function = function
+		self.blocks = [ ]
+		self.labels = { }
+
+		# Rotulos que estaban en el código original: se emiten siempre
+		self.original_labels = set()
+		self.label_count = 0
+
+		self.build(function.code)
+
+	def new_label(self):
+		'''
+		Crea un rotulo que no existe en la función
+		'''
+		while True:
+			self.label_count += 1
+			label = f'B{self.label_count}'
+			if label not in self.labels:
+				return label
+
+	def add_block(self, label=None):
+		block = BasicBlock(label or self.new_label())
+		self.labels[block.label] = block
+		self.blocks.append(block)
+		return block
+
+	def build(self, code):
+		current = None
+		for inst in code:
+			if inst[0] == 'LABEL':
+				current = self.add_block(inst[1])
+				self.original_labels.add(inst[1])
+				continue
+			if current is None or current.terminator():
+				current = self.add_block()
+			current.code.append(inst)
+		if not self.blocks:
+			self.add_block()
+		self.link()
+
+	def link(self):
+		'''
+		Calcula los sucesores y predecesores de cada bloque
+		'''
+		for block in self.blocks:
+			block.succs = [ ]
+			block.preds = [ ]
+		for n, block in enumerate(self.blocks):
+			block.fallthrough = None
+			term = block.terminator()
+			if term:
+				block.succs = [self.labels[label] for label in branch_targets(term)]
+			elif n + 1 < len(self.blocks):
+				block.fallthrough = self.blocks[n + 1]
+				block.succs = [block.fallthrough]
+		for block in self.blocks:
+			for succ in block.succs:
+				if block not in succ.preds:
+					succ.preds.append(block)
+
+	@property
+	def entry(self):
+		return self.blocks[0]
+
+	def instructions(self):
+		'''
+		Cantidad de instrucciones (sin contar rotulos)
+		'''
+		return sum(len(block.code) for block in self.blocks)
+
+	def reachable(self):
+		'''
+		Conjunto de bloques alcanzables desde la entrada
+		'''
+		seen = {self.entry}
+		work = [self.entry]
+		while work:
+			for succ in work.pop().succs:
+				if succ not in seen:
+					seen.add(succ)
+					work.append(succ)
+		return seen
+
+	def remove_unreachable(self):
+		'''
+		Elimina los bloques inalcanzables.  Retorna cuántas
+		instrucciones se eliminaron.
+		'''
+		reachable = self.reachable()
+		removed = 0
+		for block in self.blocks:
+			if block not in reachable:
+				removed += len(block.code)
+				del self.labels[block.label]
+		self.fix_fallthroughs(reachable)
+		self.blocks = [block for block in self.blocks if block in reachable]
+		self.link()
+		return removed
+
+	def fix_fallthroughs(self, kept):
+		'''
+		Antes de eliminar o mover bloques: los bloques de kept que caen a
+		su sucesor reciben un BRANCH explícito si el sucesor deja de
+		quedar a continuación
+		'''
+		order = [block for block in self.blocks if block in kept]
+		for n, block in enumerate(order):
+			if block.fallthrough is not None:
+				following = order[n + 1] if n + 1 < len(order) else None
+				if following is not block.fallthrough:
+					block.code.append(('BRANCH', block.fallthrough.label))
+
+	def split_edge(self, pred, succ):
+		'''
+		Inserta un bloque nuevo en la arista pred -> succ y lo retorna.
+		El bloque queda al final y termina en un BRANCH a succ.
+		'''
+		block = self.add_block()
+		block.code.append(('BRANCH', succ.label))
+		term = pred.terminator()
+		if term:
+			pred.code[-1] = tuple(block.label if arg == succ.label else arg for arg in term)
+		else:
+			pred.code.append(('BRANCH', block.label))
+		for phi in succ.phis:
+			phi.rename_pred(pred, block)
+		self.link()
+		return block
+
+	def insert_block_before(self, block, label=None):
+		'''
+		Crea un bloque vacío justo antes de block en el orden del código
+		(la ejecución cae de él a block) y lo retorna.  Los saltos a 
+		block no cambian.
+		'''
+		new = BasicBlock(label or self.new_label())
+		self.labels[new.label] = new
+		self.blocks.insert(self.blocks.index(block), new)
+		self.link()
+		return new
+
+	# ------------------------------------------------------------------
+	# Dominadores
+	# ------------------------------------------------------------------
+
+	def postorder(self):
+		'''
+		Bloques alcanzables en postorden (recorrido en profundidad)
+		'''
+		order = [ ]
+		seen = {self.entry}
+		stack = [(self.entry, iter(self.entry.succs))]
+		while stack:
+			block, succs = stack[-1]
+			for succ in succs:
+				if succ not in seen:
+					seen.add(succ)
+					stack.append((succ, iter(succ.succs)))
+					break
+			else:
+				stack.pop()
+				order.append(block)
+		return order
+
+	def dominators(self):
+		'''
+		Retorna el dominador inmediato de cada bloque alcanzable (el de
+		la entrada es ella misma)
+		'''
+		order = self.postorder()
+		number = {block: n for n, block in enumerate(order)}
+		idom = {self.entry: self.entry}
+
+		def intersect(a, b):
+			while a is not b:
+				while number[a] < number[b]:
+					a = idom[a]
+				while number[b] < number[a]:
+					b = idom[b]
+			return a
+
+		changed = True
+		while changed:
+			changed = False
+			for block in reversed(order):
+				if block is self.entry:
+					continue
+				preds = [pred for pred in block.preds if pred in idom]
+				new = preds[0]
+				for pred in preds[1:]:
+					new = intersect(pred, new)
+				if idom.get(block) is not new:
+					idom[block] = new
+					changed = True
+		return idom
+
+	def dominator_tree(self, idom=None):
+		'''
+		Retorna los hijos de cada bloque en el árbol de dominadores
+		'''
+		idom = idom or self.dominators()
+		children = {block: [ ] for block in idom}
+		for block in self.blocks:
+			if block in idom and block is not self.entry:
+				children[idom[block]].append(block)
+		return children
+
+	def dominates(self, a, b, idom):
+		'''
+		True si el bloque a domina al bloque b
+		'''
+		while True:
+			if a is b:
+				return True
+			if b is self.entry:
+				return False
+			b = idom[b]
+
+	def dominance_frontiers(self, idom=None):
+		'''
+		Retorna la frontera de dominancia de cada bloque alcanzable
+		'''
+		idom = idom or self.dominators()
+		frontiers = {block: set() for block in idom}
+		for block in idom:
+			preds = [pred for pred in block.preds if pred in idom]
+			if len(preds) < 2:
+				continue
+			for pred in preds:
+				runner = pred
+				while runner is not idom[block]:
+					frontiers[runner].add(block)
+					runner = idom[runner]
+		return frontiers
+
+	def loops(self, idom=None):
+		'''
+		Retorna los ciclos naturales como una lista de pares
+		(encabezado, conjunto de bloques), de los más internos a los
+		más externos.  Los saltos hacia atrás con el mismo encabezado
+		forman un solo ciclo.
+		'''
+		idom = idom or self.dominators()
+		bodies = { }
+		for block in idom:
+			for succ in block.succs:
+				if self.dominates(succ, block, idom):
+					body = bodies.setdefault(succ, {succ})
+					work = [block]
+					while work:
+						node = work.pop()
+						if node not in body:
+							body.add(node)
+							work.extend(pred for pred in node.preds if pred in idom)
+		return sorted(bodies.items(), key=lambda item: len(item[1]))
+
+	# ------------------------------------------------------------------
+	# Regreso a una lista de instrucciones
+	# ------------------------------------------------------------------
+
+	def to_code(self):
+		'''
+		Retorna la lista de instrucciones del grafo.  No debe tener nodos
+		phi (ver ssa.from_ssa).
+		'''
+		targets = set()
+		for block in self.blocks:
+			term = block.terminator()
+			if term:
+				targets.update(branch_targets(term))
+
+		code = [ ]
+		for n, block in enumerate(self.blocks):
+			assert not block.phis, f'{block.label} tiene nodos phi'
+			if block.label in targets or block.label in self.original_labels:
+				code.append(('LABEL', block.label))
+			code.extend(block.code)
+			following = self.blocks[n + 1] if n + 1 < len(self.blocks) else None
+			if block.fallthrough is not None and block.fallthrough is not following:
+				code.append(('BRANCH', block.fallthrough.label))
+			elif block.fallthrough is None and not block.terminator() and following is not None:
+				# El bloque terminaba la función, pero ya no es el último
+				code.append(('RET',))
+		return code
+
+	def update_function(self):
+		'''
+		Reemplaza el código de la función por el del grafo
+		'''
+		self.function.code = self.to_code()
+		self.function.register_count = max([self.function.register_count] +
+			[register_index(reg) for inst in self.function.code for regs in get_registers(inst) for reg in regs])
+
+	def __repr__(self):
+		lines = [ ]
+		for block in self.blocks:
+			preds = ', '.join(pred.label for pred in block.preds)
+			lines.append(f'{block.label}:    ; preds: {preds}')
+			for phi in block.phis:
+				lines.append(f'    {phi}')
+			for inst in block.code:
+				lines.append(f'    {inst}')
+		return '\n'.join(lines)
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	if len(sys.argv) != 2:
+		sys.stderr.write('Usage: python3 -m minic.cfg filename\n')
+		raise SystemExit(1)
+
+	code = compile_ircode(open(sys.argv[1]).read())
+	if not errors_reported():
+		for function in code:
+			graph = ControlFlowGraph(function)
+			print(f'{"::"*5} {function} {"::"*5}')
+			print(graph)
+			for header, body in graph.loops():
+				print(f'ciclo {header.label}: {sorted(block.label for block in body)}')
+			print()
+
+if __name__ == '__main__':
+	main()
@@ -186,8 +186,23 @@ class CheckProgramVisitor(NodeVisitor):
 	def visit_NewArrayExpression(self,node):
 		self.visit(node.datatype)
 		self.visit(node.expr)
-		if node.datatype.name != node.expr.type.name:
-			error(node.lineno, f"Tipo de dato no coincide.")
+		size_type = getattr(node.expr, 'type', None)
+		if size_type and size_type != IntType:
+			error(node.lineno, f"Tamaño de arreglo debe ser de tipo 'int' pero es de tipo '{size_type.name}'")
+			
+	def visit_ArraySize(self, node):
+		node.type = IntType
+		if node.name not in self.symbols:
+			error(node.lineno, f"Nombre '{node.name}' no fue definido")
+			
+	def check_array_index(self, location, decl):
+		# El rango solo se puede revisar si el indice es constante y el
+		# tamaño del arreglo es conocido
+		index = location.size
+		size = getattr(decl, 'size', None)
+		if isinstance(index, IntegerLiteral) and isinstance(size, int):
+			if index.value >= size or index.value < 0:
+				error(location.lineno, f"'{location.name}' Fuera de rango del arreglo.")
 
 
 
@@ -272,18 +287,13 @@ class CheckProgramVisitor(NodeVisitor):
 		if hasattr(node.location, 'type') and hasattr(node.value, 'type'):
 			loc_name = node.location.name
 			if loc_name in self.symbols:
-				if isinstance(self.symbols[loc_name], ArrayDeclaration):
-					if node.location.size.value >= self.symbols[node.location.name].size or node.location.size.value < 0:
-						error(node.lineno, f"'{loc_name}'  Fuera de rango de arreglo.")
+				if isinstance(node.location, ArraySimpleLocation):
+					self.check_array_index(node.location, self.symbols[loc_name])
 				if isinstance(self.symbols[loc_name], ConstDeclaration):
 				# Basically, if we are writting a to a location that was
 				# declared as a constant, then this is an error
 					error(node.lineno, f"No puedo escribir a una constante '{loc_name}'")
 					return
-			else:
-				if isinstance(self.temp_symbols[loc_name], ArrayLocalDecl):
-					if node.location.size.value >= self.temp_symbols[node.location.name].size or node.location.size.value < 0:
-						error(node.lineno, f"'{loc_name}'  Fuera de rango de arreglo.")
 
 
 			# If both have type information, then the type checking worked on
@@ -296,11 +306,12 @@ class CheckProgramVisitor(NodeVisitor):
 				f"No puedo asignar tipo  '{node.value.type.name}' a variable  '{node.location.name}' de tipo '{node.location.type.name}'")
 		else:
 			''''''
-			if hasattr(node.location.type,'name'):
+			if hasattr(node.location.type,'name') and isinstance(node.value, NewArrayExpression):
 				if node.location.type.name != node.value.datatype.name:
 					error(node.lineno, f"No coincide el tipo de dato.")
-				elif node.location.name in self.temp_symbols:
-					self.temp_symbols[node.location.name].size=node.value.expr.value
+				elif node.location.name in self.symbols and isinstance(node.value.expr, IntegerLiteral):
+					# Recordamos el tamaño para revisar los indices constantes
+					self.symbols[node.location.name].size = node.value.expr.value
 				'''nodee=
 				nodee.lista.append("df")
 				print(nodee)'''
@@ -314,15 +325,8 @@ class CheckProgramVisitor(NodeVisitor):
 		self.visit(node.location)
 		loc_name = node.location.name
 
-		if loc_name in self.symbols:
-			if isinstance(self.symbols[loc_name], ArrayDeclaration):
-				if node.location.size.value >= self.symbols[node.location.name].size.value or node.location.size.value < 0:
-					error(node.lineno, f" '{loc_name}' Fuera de rango del arreglo.")
-
-		if loc_name in self.temp_symbols:
-			if isinstance(self.temp_symbols[loc_name], ArrayLocalDeclaration):
-				if node.location.size.value >= self.temp_symbols[node.location.name].size.value or node.location.size.value < 0:
-					error(node.lineno, f" '{loc_name}'Fuera del rango del arreglo. ")
+		if loc_name in self.symbols and isinstance(node.location, ArraySimpleLocation):
+			self.check_array_index(node.location, self.symbols[loc_name])
 	
 
 		node.type = node.location.type
@@ -338,6 +342,11 @@ class CheckProgramVisitor(NodeVisitor):
 			error(node.lineno, f"Nombre '{node.name}' no fue definido")
 
 	def visit_ArraySimpleLocation(self,node):
+		self.visit(node.size)
+		index_type = getattr(node.size, 'type', None)
+		if index_type and index_type != IntType:
+			error(node.lineno, f"Indice de arreglo debe ser de tipo 'int' pero es de tipo '{index_type.name}'")
+			
 		if node.name not in self.symbols:
 			node.type = None
 			error(node.lineno, f" Nombre '{node.name}' no fue definido ")
@@ -400,6 +409,10 @@ class CheckProgramVisitor(NodeVisitor):
 			# Set the expected return value to observe
 			self.expected_ret_type = node.datatype.type
 			
+			# The function is visible inside its own body, so that it
+			# can be called recursively
+			self.functions.setdefault(node.name, node)
+			
 			self.visit(node.body)
 			
 			if not self.current_ret_type:
@@ -0,0 +1,207 @@
+# minic/constfold.py
+'''
+Plegado y propagación de constantes
+===================================
+
+GenerateCode produce un MOV por cada literal y una operación aunque sus
+dos operandos sean constantes.  Este pase calcula, para cada punto del
+programa, qué registros y variables tienen un valor constante conocido
+y con eso:
+
+  * Cambia por un MOV del resultado toda operación (ADD, SUB, MUL, DIV,
+    AND, OR, XOR, CMP, COPY, NEG, NOT) cuyos operandos son constantes, y
+    todo LOAD de una variable cuyo valor se conoce.
+
+  * Cambia un CBRANCH con condición constante por un BRANCH.
+
+El análisis es un flujo de datos hacia adelante sobre el CFG que solo
+sigue las aristas ejecutables (como la propagación condicional de
+constantes): si una condición es constante, la rama que nunca se toma
+no contamina los valores en el punto de unión.  Los bloques que quedan
+inalcanzables los elimina deadcode.py.
+
+Las variables globales y los parámetros no se conocen al entrar a una
+función, y cualquier CALL puede cambiar las globales.  Las divisiones
+por cero no se pliegan: siguen fallando al ejecutarse.
+
+'''
+import operator
+
+from ircode import get_base_op_code, get_registers
+from cfg import ControlFlowGraph
+from interp import CMP_OPERATORS, ARITHM_OPERATORS
+
+# Valor que no es constante
+NAC = object()
+
+FOLD_OPERATORS = {
+	**ARITHM_OPERATORS,
+	'ANDI': operator.and_,
+	'ORI': operator.or_,
+	'XOR': operator.xor,
+}
+
+# Igual que Interpreter.run_NEGI y run_NOT
+UNARY_OPERATORS = {
+	'NEG': lambda value: 0 - value,
+	'NOT': lambda value: 1 ^ value,
+}
+
+ZERO = {'I': 0, 'F': 0.0, 'B': 0}
+
+def same_constant(a, b):
+	return a is not NAC and b is not NAC and type(a) is type(b) and a == b
+
+def merge(into, state):
+	'''
+	Junta state en el estado into.  Retorna True si into cambió.
+	'''
+	changed = False
+	for name, value in state.items():
+		if name not in into:
+			into[name] = value
+			changed = True
+		elif into[name] is not NAC and not same_constant(into[name], value):
+			into[name] = NAC
+			changed = True
+	return changed
+
+class ConstantFolder(object):
+	'''
+	Analiza y transforma una ircode.Function
+	'''
+	def __init__(self, function):
+		self.function = function
+		self.graph = ControlFlowGraph(function)
+
+		# Variables que no se asignan con ALLOC: globales y parámetros
+		self.locals = {args[0] for op_code, *args in function.code if op_code.startswith('ALLOC')}
+		self.globals = set()
+		for op_code, *args in function.code:
+			base = get_base_op_code(op_code)
+			if base in ('LOAD', 'ALOAD', 'ASIZE', 'VAR'):
+				self.globals.add(args[0])
+			elif base in ('STORE', 'ASTORE'):
+				self.globals.add(args[1])
+		self.globals -= self.locals
+		self.globals |= {pname for pname, _ in function.parameters}
+
+		self.folded = 0
+		self.branches = 0
+
+	def evaluate(self, inst, state):
+		'''
+		Aplica inst al estado.  Si inst define un registro, retorna su
+		valor (constante o NAC); si es un CBRANCH, el de su condición.
+		'''
+		op_code, *args = inst
+		base = get_base_op_code(op_code)
+		if base == 'MOV':
+			state[args[1]] = args[0]
+			return args[0]
+		if base == 'COPY':
+			value = state.get(args[0], NAC)
+		elif base in UNARY_OPERATORS:
+			value = state.get(args[0], NAC)
+			if value is not NAC:
+				value = UNARY_OPERATORS[base](value)
+		elif op_code in FOLD_OPERATORS:
+			left, right = state.get(args[0], NAC), state.get(args[1], NAC)
+			value = NAC
+			if left is not NAC and right is not NAC and not (base == 'DIV' and right == 0):
+				value = FOLD_OPERATORS[op_code](left, right)
+		elif base == 'CMP':
+			left, right = state.get(args[1], NAC), state.get(args[2], NAC)
+			value = NAC
+			if left is not NAC and right is not NAC:
+				value = CMP_OPERATORS[args[0]](left, right)
+		elif base == 'LOAD':
+			value = state.get(args[0], NAC)
+		elif base == 'STORE':
+			state[args[1]] = state.get(args[0], NAC)
+			return None
+		elif base in ('ALLOC', 'VAR'):
+			state[args[0]] = ZERO[op_code[-1]]
+			return None
+		elif base == 'CBRANCH':
+			return state.get(args[0], NAC)
+		elif base == 'CALL':
+			for name in self.globals:
+				state[name] = NAC
+			state[args[-1]] = NAC
+			return NAC
+		elif base in ('NEW', 'ALOAD', 'ASIZE'):
+			value = NAC
+		else:
+			# Cualquier otro registro definido deja de ser constante
+			for reg in get_registers(inst)[0]:
+				state[reg] = NAC
+			return None
+		state[args[-1]] = value
+		return value
+
+	def successors(self, block, state):
+		'''
+		Sucesores ejecutables de block, dado el estado a su salida
+		'''
+		term = block.terminator()
+		if term and term[0] == 'CBRANCH':
+			test = state.get(term[1], NAC)
+			if test is not NAC:
+				return [self.graph.labels[term[2] if test else term[3]]]
+		return block.succs
+
+	def analyze(self):
+		'''
+		Calcula el estado a la entrada de cada bloque ejecutable
+		'''
+		entry = {name: NAC for name in self.globals}
+		self.states = {self.graph.entry: entry}
+		work = [self.graph.entry]
+		while work:
+			block = work.pop()
+			state = dict(self.states[block])
+			for inst in block.code:
+				self.evaluate(inst, state)
+			for succ in self.successors(block, state):
+				if succ not in self.states:
+					self.states[succ] = dict(state)
+					work.append(succ)
+				elif merge(self.states[succ], state):
+					work.append(succ)
+
+	def transform(self):
+		for block, state in self.states.items():
+			state = dict(state)
+			code = [ ]
+			for inst in block.code:
+				value = self.evaluate(inst, state)
+				op_code, *args = inst
+				base = get_base_op_code(op_code)
+				if value is None or value is NAC or base == 'MOV':
+					code.append(inst)
+				elif base == 'CBRANCH':
+					code.append(('BRANCH', args[1] if value else args[2]))
+					self.branches += 1
+				elif base in ('CALL', 'NEW', 'ALOAD', 'ASIZE'):
+					code.append(inst)
+				else:
+					suffix = 'I' if base == 'CMP' or op_code in ('ANDI', 'ORI', 'XOR', 'NOT') else op_code[-1]
+					code.append((f'MOV{suffix}', value, args[-1]))
+					self.folded += 1
+			block.code = code
+
+	def run(self):
+		self.analyze()
+		self.transform()
+		self.graph.link()
+		self.graph.update_function()
+		return self.folded, self.branches
+
+def fold_constants(function):
+	'''
+	Pliega y propaga constantes en function.  Retorna un diccionario con
+	las instrucciones plegadas y los CBRANCH resueltos.
+	'''
+	folded, branches = ConstantFolder(function).run()
+	return {'folded': folded, 'branches': branches}
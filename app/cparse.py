@@ -11,7 +11,8 @@ class Parser(sly.Parser):
 	tokens = Tokenizer.tokens
 	
 	precedence = (
-	    ('left', IF, ELSE),
+	    ('nonassoc', IF),
+	    ('nonassoc', ELSE),
 		('right','='),
 		('left',OR),
 		('left',AND),
@@ -185,7 +186,7 @@ class Parser(sly.Parser):
 	def while_stmt(self,p):
 		return WhileStatement(p.expr,p.compound_stmt, lineno= p.lineno)
 		
-	@_("IF '(' expr ')' stmt")
+	@_("IF '(' expr ')' stmt %prec IF")
 	def if_stmt(self,p):
 		return IfStatement(p.expr, p.stmt, None, lineno= p.lineno)
 		
@@ -292,8 +293,7 @@ class Parser(sly.Parser):
 		
 	@_("IDENT '.' SIZE")
 	def expr(self,p):
-		pass
-		#return (p.IDENT, p[1], p.SIZE)
+		return ArraySize(p.IDENT, lineno = p.lineno)
 		
 	@_ ("BOOL_LIT")
 	def expr(sel,p):
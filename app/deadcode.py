@@ -0,0 +1,187 @@
+# minic/deadcode.py
+'''
+Eliminación de código muerto
+============================
+
+Dos pases sobre el CFG de cada función (ver cfg.py):
+
+  * Bloques inalcanzables.  Primero los saltos que llevan a un bloque
+    que solo contiene un BRANCH (por ejemplo, el bloque else vacío de
+    visit_IfStatement) se redirigen a su destino final, y un CBRANCH
+    cuyos dos destinos coinciden se vuelve un BRANCH.  Luego se eliminan
+    los bloques a los que no se llega desde la entrada: el código
+    después de un return o un break, las ramas que constfold.py resolvió
+    y esos bloques de paso.
+
+  * Instrucciones muertas.  Un análisis de vida (liveness) hacia atrás
+    sobre registros y variables locales elimina las instrucciones sin
+    efectos cuyo resultado nadie lee: MOV, COPY, aritmética, CMP, LOAD y
+    ASIZE, y los STORE a variables locales que no se vuelven a leer.  Se
+    repite hasta que no cambia nada.  DIV, ALOAD y NEW se conservan
+    porque pueden fallar al ejecutarse.  Al final se quitan los ALLOC
+    de variables que ya no se usan.
+
+Cada pase reporta cuántas instrucciones eliminó.
+
+'''
+from ircode import get_base_op_code, get_registers
+from cfg import ControlFlowGraph
+
+# Instrucciones sin efectos: se eliminan si su resultado no se usa
+REMOVABLE = {'MOV', 'COPY', 'NEG', 'NOT', 'ADD', 'SUB', 'MUL', 'AND', 'OR', 'XOR', 'CMP', 'LOAD', 'ASIZE'}
+
+def forward_target(graph, label):
+	'''
+	Sigue la cadena de bloques que solo contienen un BRANCH
+	'''
+	seen = set()
+	while label not in seen:
+		seen.add(label)
+		block = graph.labels[label]
+		if block is graph.entry or len(block.code) != 1 or block.code[0][0] != 'BRANCH':
+			break
+		label = block.code[0][1]
+	return label
+
+def prune_unreachable(graph):
+	'''
+	Redirige los saltos a bloques de paso y elimina los bloques
+	inalcanzables.  Retorna cuántas instrucciones se eliminaron.
+	'''
+	for block in graph.blocks:
+		term = block.terminator()
+		if term is None or term[0] not in ('BRANCH', 'CBRANCH'):
+			continue
+		if term[0] == 'BRANCH':
+			term = ('BRANCH', forward_target(graph, term[1]))
+		else:
+			t_label, f_label = forward_target(graph, term[2]), forward_target(graph, term[3])
+			term = ('BRANCH', t_label) if t_label == f_label else ('CBRANCH', term[1], t_label, f_label)
+		block.code[-1] = term
+	graph.link()
+	return graph.remove_unreachable()
+
+def local_variables(function):
+	return {pname for pname, _ in function.parameters} | {args[0]
+		for op_code, *args in function.code if op_code.startswith('ALLOC')}
+
+def variable_operands(inst):
+	'''
+	Variables que inst escribe y lee, como dos listas (defs, uses)
+	'''
+	op_code, *args = inst
+	base = get_base_op_code(op_code)
+	if base in ('STORE', 'ALLOC'):
+		return [args[-1] if base == 'STORE' else args[0]], []
+	if base in ('LOAD', 'ALOAD', 'ASIZE'):
+		return [], [args[0]]
+	if base == 'ASTORE':
+		return [], [args[1]]
+	return [], []
+
+class DeadCodeEliminator(object):
+	'''
+	Elimina las instrucciones muertas de un CFG
+	'''
+	def __init__(self, graph):
+		self.graph = graph
+		self.locals = local_variables(graph.function)
+		self.removed = 0
+
+	def operands(self, inst):
+		'''
+		Registros y variables locales (como ('var', nombre)) que inst
+		escribe y lee
+		'''
+		defs, uses = get_registers(inst)
+		var_defs, var_uses = variable_operands(inst)
+		defs = set(defs) | {('var', name) for name in var_defs if name in self.locals}
+		uses = set(uses) | {('var', name) for name in var_uses if name in self.locals}
+		return defs, uses
+
+	def is_dead(self, inst, defs, live):
+		base = get_base_op_code(inst[0])
+		if base == 'STORE':
+			return bool(defs) and not defs & live
+		return base in REMOVABLE and not defs & live
+
+	def liveness(self):
+		'''
+		Retorna el conjunto de valores vivos a la salida de cada bloque
+		'''
+		summary = { }
+		for block in self.graph.blocks:
+			gen, kill = set(), set()
+			for inst in reversed(block.code):
+				defs, uses = self.operands(inst)
+				gen -= defs
+				kill |= defs
+				gen |= uses
+			summary[block] = (gen, kill)
+
+		live_in = {block: set() for block in self.graph.blocks}
+		live_out = {block: set() for block in self.graph.blocks}
+		changed = True
+		while changed:
+			changed = False
+			for block in reversed(self.graph.blocks):
+				out = set().union(*(live_in[succ] for succ in block.succs))
+				gen, kill = summary[block]
+				new = gen | (out - kill)
+				if out != live_out[block] or new != live_in[block]:
+					live_out[block] = out
+					live_in[block] = new
+					changed = True
+		return live_out
+
+	def sweep(self):
+		'''
+		Una pasada de eliminación.  Retorna cuántas instrucciones eliminó.
+		'''
+		removed = 0
+		live_out = self.liveness()
+		for block in self.graph.blocks:
+			live = set(live_out[block])
+			code = [ ]
+			for inst in reversed(block.code):
+				defs, uses = self.operands(inst)
+				if self.is_dead(inst, defs, live):
+					removed += 1
+					continue
+				live -= defs
+				live |= uses
+				code.append(inst)
+			block.code = code[::-1]
+		return removed
+
+	def run(self):
+		while True:
+			removed = self.sweep()
+			if not removed:
+				break
+			self.removed += removed
+
+		# ALLOC de variables que ya nadie usa
+		used = set()
+		for block in self.graph.blocks:
+			for inst in block.code:
+				if not inst[0].startswith('ALLOC'):
+					defs, uses = variable_operands(inst)
+					used.update(defs, uses)
+		for block in self.graph.blocks:
+			code = [inst for inst in block.code if not (inst[0].startswith('ALLOC') and inst[1] not in used)]
+			self.removed += len(block.code) - len(code)
+			block.code = code
+		return self.removed
+
+def eliminate_dead_code(function):
+	'''
+	Elimina los bloques inalcanzables y las instrucciones muertas de
+	function.  Retorna cuántas instrucciones eliminó cada parte.
+	'''
+	graph = ControlFlowGraph(function)
+	unreachable = prune_unreachable(graph)
+	dead = DeadCodeEliminator(graph).run()
+	graph.link()
+	graph.update_function()
+	return {'unreachable': unreachable, 'dead': dead}
@@ -0,0 +1,257 @@
+# minic/inline.py
+'''
+Expansión en línea (inlining)
+=============================
+
+Cada llamada de MiniC se convierte en un CALL, y una función auxiliar
+pequeña paga la creación de su frame en cada llamada.  Este pase copia
+el cuerpo de las funciones pequeñas y no recursivas en el lugar de sus
+llamadas.  A diferencia de los demás pases (ver optimize.py) trabaja
+sobre el programa completo, la lista de ircode.Function.
+
+Una llamada a f se expande si:
+
+  * f no es recursiva, directa ni indirectamente (según el grafo de
+    llamadas del programa).
+
+  * f tiene a lo sumo max_size instrucciones (sin contar los LABEL).
+
+  * la llamada está a profundidad max_depth o menos: las llamadas del
+    código original de la función son profundidad 1, las que aparecen
+    dentro del cuerpo de una función expandida profundidad 2, etc.
+
+  * todos los RET de f retornan un valor y f no puede terminar sin RET.
+
+  * f no usa una variable global que una variable local de la función
+    que llama oculta.
+
+Al expandir, los registros de f pasan a ser registros nuevos de la
+función que llama, y sus rotulos y variables locales (parámetros y
+ALLOC) reciben nombres nuevos.  Cada parámetro se vuelve un ALLOC más
+un STORE del argumento, y cada RET un COPY al registro destino del CALL
+más un salto al final del cuerpo.  Los STORE/LOAD y saltos que sobran
+los limpian peephole.py y deadcode.py.
+
+El pase no es parte de optimize.DEFAULT_PASSES; se pide con
+--passes=inline,constfold,... en optimize.py o en interp.py.  Sus
+estadísticas incluyen la decisión tomada en cada llamada, que
+optimize.format_report (y --stats de interp.py) muestra una por línea.
+
+Para ver las decisiones y el código resultante utiliza:
+
+    bash % python3 -m minic.inline [--max-size=n] [--max-depth=n] someprogram.c
+
+'''
+from ircode import get_base_op_code, get_operand_kinds
+from cfg import new_register
+
+# Tamaño máximo (instrucciones) de una función que se expande
+MAX_SIZE = 20
+
+# Profundidad máxima de expansiones anidadas
+MAX_DEPTH = 2
+
+def call_graph(functions):
+	'''
+	Retorna las funciones que llama cada función
+	'''
+	return {function.name: {args[0] for op_code, *args in function.code if op_code == 'CALL'}
+		for function in functions}
+
+def recursive_functions(graph):
+	'''
+	Funciones que pueden llamarse a sí mismas (están en un ciclo del
+	grafo de llamadas)
+	'''
+	recursive = set()
+	for name in graph:
+		seen = set()
+		work = list(graph[name])
+		while work:
+			callee = work.pop()
+			if callee == name:
+				recursive.add(name)
+				break
+			if callee not in seen:
+				seen.add(callee)
+				work.extend(graph.get(callee, ()))
+	return recursive
+
+def function_size(function):
+	return sum(1 for inst in function.code if inst[0] != 'LABEL')
+
+def local_names(function):
+	'''
+	Parámetros y variables locales (ALLOC) de function
+	'''
+	names = {pname for pname, _ in function.parameters}
+	names.update(args[0] for op_code, *args in function.code if op_code.startswith('ALLOC'))
+	return names
+
+def variable_names(function):
+	'''
+	Variables (locales o globales) que usa function
+	'''
+	return {arg for inst in function.code
+		for kind, arg in zip(get_operand_kinds(inst), inst[1:]) if kind == 'v'}
+
+class Inliner(object):
+	'''
+	Expande las llamadas de una lista de ircode.Function.  decisions
+	guarda una tupla (función, llamada, profundidad, decisión) por cada
+	CALL considerado.
+	'''
+	def __init__(self, functions, max_size=MAX_SIZE, max_depth=MAX_DEPTH):
+		self.max_size = max_size
+		self.max_depth = max_depth
+		self.decisions = [ ]
+
+		# Se expande siempre el código original de cada función
+		self.originals = {function.name: (function, list(function.code)) for function in functions}
+		self.sizes = {function.name: function_size(function) for function in functions}
+		self.locals = {function.name: local_names(function) for function in functions}
+		self.globals = {function.name: variable_names(function) - self.locals[function.name]
+			for function in functions}
+		self.functions = functions
+		self.recursive = recursive_functions(call_graph(functions))
+
+	def reason(self, caller, callee, depth):
+		'''
+		Retorna None si la llamada de caller a callee se puede expandir, o
+		el motivo por el que no
+		'''
+		if callee not in self.originals:
+			return 'funcion desconocida'
+		if callee in self.recursive:
+			return 'recursiva'
+		if self.sizes[callee] > self.max_size:
+			return f'muy grande ({self.sizes[callee]} > {self.max_size})'
+		if depth > self.max_depth:
+			return f'profundidad {depth} > {self.max_depth}'
+		function, code = self.originals[callee]
+		if any(inst == ('RET',) for inst in code) or not code or code[-1][0] not in ('RET', 'BRANCH'):
+			return 'puede retornar sin valor'
+		if self.globals[callee] & self.locals[caller.name]:
+			return 'usa una global oculta por una local'
+		return None
+
+	def expand(self, caller, code, depth, names):
+		'''
+		Retorna code con sus llamadas expandidas.  names son los rotulos y
+		variables que ya usa caller.
+		'''
+		expanded = [ ]
+		for inst in code:
+			if inst[0] != 'CALL':
+				expanded.append(inst)
+				continue
+			callee = inst[1]
+			reason = self.reason(caller, callee, depth)
+			self.decisions.append((caller.name, callee, depth, reason or 'expandida'))
+			if reason:
+				expanded.append(inst)
+			else:
+				body = self.instantiate(caller, callee, inst[2:-1], inst[-1], names)
+				expanded.extend(self.expand(caller, body, depth + 1, names))
+		return expanded
+
+	@staticmethod
+	def fresh(name, names):
+		n = 1
+		while f'{name}_i{n}' in names:
+			n += 1
+		names.add(f'{name}_i{n}')
+		return f'{name}_i{n}'
+
+	def instantiate(self, caller, callee, arguments, target, names):
+		'''
+		Retorna una copia del cuerpo de callee para una llamada de caller
+		'''
+		function, code = self.originals[callee]
+		registers = { }
+		renamed = { }
+		for pname, _ in function.parameters:
+			renamed[pname] = self.fresh(pname, names)
+		for op_code, *args in code:
+			if op_code == 'LABEL' or op_code.startswith('ALLOC'):
+				renamed[args[0]] = self.fresh(args[0], names)
+		exit_label = self.fresh(f'{callee}_fin', names)
+
+		def rename(kind, arg):
+			if kind == 'r':
+				if arg not in registers:
+					registers[arg] = new_register(caller)
+				return registers[arg]
+			if kind in ('v', 'l'):
+				return renamed.get(arg, arg)
+			return arg
+
+		body = [ ]
+		for (pname, ptype), argument in zip(function.parameters, arguments):
+			body.append((f'ALLOC{ptype}', renamed[pname]))
+			body.append((f'STORE{ptype}', argument, renamed[pname]))
+		for inst in code:
+			inst = (inst[0], *[rename(kind, arg) for kind, arg in zip(get_operand_kinds(inst), inst[1:])])
+			if get_base_op_code(inst[0]) == 'RET':
+				body.append((f'COPY{function.return_type}', inst[1], target))
+				body.append(('BRANCH', exit_label))
+			else:
+				body.append(inst)
+		body.append(('LABEL', exit_label))
+		return body
+
+	def run(self):
+		# Los nombres nuevos no deben coincidir con ninguna variable
+		variables = set().union(*self.locals.values(), *self.globals.values())
+		for function in self.functions:
+			names = variables | {args[0] for op_code, *args in function.code if op_code == 'LABEL'}
+			function.code = self.expand(function, self.originals[function.name][1], 1, names)
+		return self.decisions
+
+def format_decisions(decisions):
+	'''
+	Retorna el reporte de decisiones del Inliner como texto
+	'''
+	return '\n'.join(f'{caller:<16} -> {callee:<16} profundidad {depth}: {decision}'
+		for caller, callee, depth, decision in decisions)
+
+def inline_functions(functions, max_size=MAX_SIZE, max_depth=MAX_DEPTH):
+	'''
+	Expande las llamadas a funciones pequeñas de la lista functions.
+	Retorna cuántas llamadas se expandieron y cuántas no, y en
+	'decisions' la lista de decisiones de Inliner.run.
+	'''
+	decisions = Inliner(functions, max_size, max_depth).run()
+	inlined = sum(1 for *_, decision in decisions if decision == 'expandida')
+	return {'inlined': inlined, 'kept': len(decisions) - inlined, 'decisions': decisions}
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write('Usage: python3 -m minic.inline [--max-size=n] [--max-depth=n] filename\n')
+		raise SystemExit(1)
+
+	max_size, max_depth = MAX_SIZE, MAX_DEPTH
+	for arg in sys.argv[1:]:
+		if arg.startswith('--max-size='):
+			max_size = int(arg.split('=', 1)[1])
+		elif arg.startswith('--max-depth='):
+			max_depth = int(arg.split('=', 1)[1])
+
+	code = compile_ircode(open(args[0]).read(), optimize=False)
+	if not errors_reported():
+		inliner = Inliner(code, max_size, max_depth)
+		inliner.run()
+		for function in code:
+			print(f'{"::"*5} {function} {"::"*5}')
+			for inst in function.code:
+				print(inst)
+			print()
+		print(format_decisions(inliner.decisions))
+
+if __name__ == '__main__':
+	main()
@@ -10,10 +10,184 @@ resultados sin requerir una dependencia de JVM.
 Para ejecutar un programa utiliza:
 
     bash % python3 -m minic.interp someprogram.c
+    
+La opción --tier=python ejecuta el programa compilado a funciones 
+Python (ver pycompile.py) en lugar de interpretarlo instrucción por 
+instrucción, y --tier=tiered empieza interpretando y compila solo las 
+funciones y ciclos calientes (ver tiered.py):
+
+    bash % python3 -m minic.interp --tier=python someprogram.c
+
+El código IR se optimiza antes de ejecutarse (ver optimize.py); la 
+opción --no-optimize ejecuta el código tal como sale de GenerateCode.
+
+Para programas que no son de confianza, execute() acepta límites de 
+instrucciones ejecutadas, de tiempo, de profundidad de llamadas y de 
+bytes de arreglos creados en total (no se descuentan los arreglos que 
+ya no se usan):
+
+    bash % python3 -m minic.interp --max-instructions=1000000 --time-limit=2 someprogram.c
 
 '''
 import sys
+import time
+import operator
+from array import array
+
+from ircode import Function, get_base_op_code, get_operand_kinds, register_index
+from superinst import fuse_code
+from output import BufferedSink
+
+CMP_OPERATORS = {
+	'<': operator.lt,
+	'<=': operator.le,
+	'>': operator.gt,
+	'>=': operator.ge,
+	'==': operator.eq,
+	'!=': operator.ne,
+}
+
+ARITHM_OPERATORS = {
+	'ADDI': operator.add, 'ADDF': operator.add,
+	'SUBI': operator.sub, 'SUBF': operator.sub,
+	'MULI': operator.mul, 'MULF': operator.mul,
+	'DIVI': operator.floordiv, 'DIVF': operator.truediv,
+}
+
+# Tipo de los elementos de los arreglos según el sufijo de tipo del IR.
+# Los arreglos de char usan un bytearray.
+ARRAY_TYPECODES = {
+	'I': 'q',
+	'F': 'd',
+}
+
+def array_nbytes(type_code, size):
+	'''
+	Bytes que ocupa un arreglo de size elementos del sufijo type_code
+	'''
+	if type_code == 'B':
+		return size
+	return size * array(ARRAY_TYPECODES[type_code]).itemsize
+	
+def new_array(type_code, size):
+	'''
+	Crea un arreglo contiguo de size elementos en cero para el sufijo de
+	tipo type_code: array('q') para int y bool, array('d') para float y 
+	bytearray para char
+	'''
+	if type_code == 'B':
+		return bytearray(size)
+	typecode = ARRAY_TYPECODES[type_code]
+	return array(typecode, bytes(size * array(typecode).itemsize))
+	
+def bad_index(index):
+	'''
+	Un índice negativo no debe contar desde el final como en Python
+	(los índices muy grandes ya fallan al indexar el arreglo)
+	'''
+	raise IndexError(f'Indice de arreglo fuera de rango: {index}')
+	
+# Limite de recursion de Python usado por main() para programas
+# MiniC con recursion profunda
+RECURSION_LIMIT = 100000
+
+# Valor de pc que termina el ciclo de ejecución de una función (RET)
+HALT = sys.maxsize
 
+# Con límites activos, cada cuántas instrucciones ejecutadas (como 
+# máximo) se revisan el presupuesto de instrucciones y el reloj
+CHECK_INTERVAL = 10000
+
+# Frames libres que guarda cada función.  Una recursión más profunda 
+# crea frames nuevos para los niveles que sobran.
+MAX_FREE_FRAMES = 32
+
+class ExecutionLimitExceeded(RuntimeError):
+	'''
+	Un programa superó uno de los límites de execute().  limit es 
+	'instructions', 'time', 'allocated' o 'depth'; los demás atributos 
+	son lo consumido hasta ese momento.
+	'''
+	def __init__(self, limit, instructions, elapsed, allocated):
+		super().__init__(f'Limite de ejecucion excedido ({limit}): {instructions} instrucciones, '
+			f'{elapsed:.3f} s, {allocated} bytes de arreglos creados')
+		self.limit = limit
+		self.instructions = instructions
+		self.elapsed = elapsed
+		self.allocated = allocated
+		
+	def as_dict(self):
+		return {'limit': self.limit, 'instructions': self.instructions, 
+			'elapsed': self.elapsed, 'allocated': self.allocated}
+
+class Frame(object):
+	'''
+	Registro de activación de una función: su banco de registros y el 
+	almacenamiento de sus variables locales (parámetros y ALLOC).  Los 
+	frames se reciclan a través de DecodedFunction.frames, de modo que 
+	una llamada recursiva no reserva memoria nueva en cada invocación.  
+	Un frame libre se guarda vacío, para no mantener vivos los valores 
+	(y arreglos) de la llamada que lo usó.
+	'''
+	__slots__ = ('registers', 'vars')
+	
+	def __init__(self, register_count, var_count):
+		self.registers = [None] * register_count
+		self.vars = [None] * var_count
+		
+class DecodedFunction(object):
+	'''
+	Una ircode.Function ya decodificada y lista para ejecutarse.  code 
+	es la secuencia de instrucciones que se decodificó en program.
+	'''
+	def __init__(self, function, code, program, register_count):
+		self.function = function
+		self.name = function.name
+		self.parameters = function.parameters
+		self.program = program
+		self.register_count = register_count
+		
+		# Opcode de cada posición del programa y rotulo de las posiciones 
+		# donde empieza un bloque, para reportes y perfiles
+		self.opcodes = [ ]
+		self.labels = { }
+		for op_code, *args in code:
+			if op_code == 'LABEL':
+				self.labels.setdefault(len(self.opcodes), args[0])
+			else:
+				self.opcodes.append(op_code)
+				
+		# Posición de cada variable local dentro de Frame.vars.  Los 
+		# parámetros ocupan las primeras posiciones, en orden.
+		self.slots = { }
+		for pname, _ in function.parameters:
+			self.slots.setdefault(pname, len(self.slots))
+		for op_code, *args in function.code:
+			if op_code.startswith('ALLOC'):
+				self.slots.setdefault(args[0], len(self.slots))
+				
+		# Frames libres para reutilizar (a lo más MAX_FREE_FRAMES)
+		self.frames = [ ]
+		self.empty_registers = [None] * register_count
+		self.empty_vars = [None] * len(self.slots)
+		
+	def new_frame(self):
+		if self.frames:
+			return self.frames.pop()
+		return Frame(self.register_count, len(self.slots))
+		
+	def release_frame(self, frame):
+		'''
+		Devuelve un frame que ya no se usa, vaciado, a los frames libres
+		'''
+		if len(self.frames) < MAX_FREE_FRAMES:
+			frame.registers[:] = self.empty_registers
+			frame.vars[:] = self.empty_vars
+			self.frames.append(frame)
+		
+	def __repr__(self):
+		return f'DecodedFunction({self.name}, {len(self.program)} instrucciones)'
+		
 class Interpreter(object):
 	'''
 	Ejecuta un intérprete en el código intermedio SSA generado 
@@ -34,25 +208,330 @@ class Interpreter(object):
 		self.run_MOVI(2, 'R2')
 		self.run_ADDI('R1','R2','R3')
 		self.run_PRINTI('R3')
+		
+	Un programa completo es la lista de ircode.Function producida por
+	compile_ircode().  Primero se ejecuta __minic_init (declaraciones 
+	globales) y luego __minic_main, si existe.  Cada llamada usa su 
+	propio Frame.
+	
+	Quickening: las instrucciones que tienen un método quicken_OPCODE 
+	se decodifican como un llamado a self.quicken.  La primera vez que 
+	se ejecutan, quicken reemplaza esa posición del programa por un 
+	handler especializado con sus operandos ya resueltos (posición de 
+	la variable, función invocada, operador de comparación), de modo 
+	que las siguientes ejecuciones no buscan nada en diccionarios.
+	
+	Límites: si execute() recibe algún límite, self.run y self.allocate 
+	se reemplazan por run_limited y allocate_limited.  run_limited 
+	controla la profundidad y ejecuta el ciclo de run_metered, que 
+	cuenta las instrucciones por bloque, solo cuando hay un salto, y 
+	revisa presupuesto y reloj cada CHECK_INTERVAL instrucciones.  Sin 
+	límites se usa el ciclo normal, que no paga nada por esto.  Una 
+	subclase que cambia el ciclo de run (ver profiler.py) debe cambiar 
+	también el de run_metered.
 	'''
 	
-	def __init__(self):
-		# Variable storage
-		self.vars = { }
+	def __init__(self, superinstructions=True, quickening=True, output=None):
+		# Destino de PRINTI/PRINTF/PRINTB (ver output.py).  Se vacía una 
+		# sola vez al terminar execute()
+		self.output = output or BufferedSink()
+		self.write = self.output.write
+		
+		# Fusionar secuencias frecuentes en superinstrucciones
+		self.superinstructions = superinstructions
+		
+		# Especializar instrucciones en su primera ejecución
+		self.quickening = quickening
+		
+		# Estadísticas de quickening: instrucciones decodificadas y 
+		# cuántas de ellas fueron reemplazadas por su versión especializada
+		self.decoded_count = 0
+		self.quickened_count = 0
+		
+		# Variables globales: lista indexada por la posición que se 
+		# asigna a cada nombre en global_slots
+		self.globals = [ ]
+		self.global_slots = { }
+		
+		# Tabla de funciones decodificadas, por nombre
+		self.functions = { }
+		
+		# Estado del frame actual: función, registros, variables locales
+		# y la posición de cada nombre local
+		self.function = None
+		self.registers = [ ]
+		self.vars = [ ]
+		self.slots = { }
+		
+		# Valor dejado por la última instrucción RET
+		self.retval = None
+		
+		# Límites de ejecución (ver execute) y lo consumido: instrucciones
+		# contadas hasta la última revisión y bytes de arreglos creados.
+		# fuel son las instrucciones que faltan para la próxima revisión 
+		# y chunk el valor que tenía al empezar ese tramo.
+		self.max_instructions = None
+		self.deadline = None
+		self.max_allocated = None
+		self.max_depth = None
+		self.depth = 0
+		self.started = None
+		self.instructions = 0
+		self.allocated = 0
+		self.fuel = self.chunk = CHECK_INTERVAL
+		
+	def decode(self, code):
+		'''
+		Decodifica una sola vez la secuencia de instrucciones.  Cada tupla 
+		(opcode, *args) se convierte en un par (handler, args) donde handler 
+		es el método run_opcode ya enlazado a la instancia.  De esta forma 
+		el ciclo de ejecución no construye nombres ni busca atributos por 
+		cada instrucción ejecutada.
 		
-		# Registers
-		self.registers = { }
+		Los operandos de tipo registro ('R7') se traducen a su posición 
+		entera (7).  Las instrucciones LABEL no se conservan: cada rotulo 
+		se resuelve una sola vez al índice de la instrucción que le sigue, 
+		de modo que los saltos no buscan nada durante la ejecución.
 		
-	def execute(self, code):
-		for inst, *args in code:
-			getattr(self, f'run_{inst}')(*args)
+		Retorna el programa decodificado y el tamaño del banco de 
+		registros que necesita.
+		'''
+		# Primera pasada: tabla de rotulos
+		labels = { }
+		index = 0
+		for op_code, *args in code:
+			if op_code == 'LABEL':
+				labels[args[0]] = index
+			else:
+				index += 1
+				
+		# Segunda pasada: handlers y operandos resueltos
+		program = []
+		register_count = 0
+		for inst in code:
+			op_code, *args = inst
+			if op_code == 'LABEL':
+				continue
+				
+			handler = getattr(self, f'run_{op_code}', None)
+			if handler is None:
+				raise RuntimeError(f'Instruccion IR desconocida {op_code!r}')
+				
+			for n, kind in enumerate(get_operand_kinds(inst)):
+				if kind == 'r':
+					args[n] = register_index(args[n])
+					register_count = max(register_count, args[n])
+				elif kind == 'l':
+					args[n] = labels[args[n]]
+					
+			quickener = getattr(self, f'quicken_{get_base_op_code(op_code)}', None)
+			if self.quickening and quickener:
+				args = (program, len(program), handler, quickener, op_code, tuple(args))
+				handler = self.quicken
+				
+			program.append((handler, tuple(args)))
+		self.decoded_count += len(program)
+		return program, register_count + 1
+		
+	def load(self, functions):
+		'''
+		Decodifica todas las funciones del programa, construye la tabla 
+		de funciones y asigna una posición a cada variable global.
+		'''
+		for function in functions:
+			for op_code, *args in function.code:
+				if op_code.startswith('VAR'):
+					self.global_slots.setdefault(args[0], len(self.global_slots))
+		self.globals = [None] * len(self.global_slots)
+		
+		for function in functions:
+			code = function.code
+			if self.superinstructions:
+				code = fuse_code(code)
+			program, register_count = self.decode(code)
+			register_count = max(register_count, function.register_count + 1)
+			self.functions[function.name] = DecodedFunction(function, code, program, register_count)
 			
+	def execute(self, code, max_instructions=None, time_limit=None, max_allocated=None, max_depth=None):
+		'''
+		Ejecuta un programa: una lista de ircode.Function (o un 
+		irencode.EncodedProgram) o, para pruebas rápidas, una lista de 
+		instrucciones sueltas.  Retorna el valor retornado por 
+		__minic_main.
+		
+		max_instructions, time_limit (segundos), max_allocated (bytes de 
+		todos los arreglos creados, aunque ya no se usen) y max_depth 
+		(llamadas anidadas) limitan la ejecución.  Al superar uno se 
+		lanza ExecutionLimitExceeded.  El presupuesto de instrucciones 
+		puede excederse en lo que dura un bloque básico.
+		'''
+		if code and isinstance(code[0], tuple):
+			function = Function('__minic_main', [], 'I')
+			function.code = list(code)
+			code = [function]
+			
+		limits = (max_instructions, time_limit, max_allocated, max_depth)
+		if limits != (None, None, None, None):
+			self.set_limits(*limits)
+		self.load(code)
+		
+		try:
+			if '__minic_init' in self.functions:
+				self.call(self.functions['__minic_init'], ())
+			if '__minic_main' in self.functions:
+				return self.call(self.functions['__minic_main'], ())
+		finally:
+			self.output.flush()
+			
+	def set_limits(self, max_instructions, time_limit, max_allocated, max_depth):
+		'''
+		Activa los límites de ejecución y cambia el ciclo de ejecución y
+		la creación de arreglos por sus versiones con control
+		'''
+		self.max_instructions = max_instructions
+		self.max_allocated = max_allocated
+		self.max_depth = max_depth
+		self.started = time.perf_counter()
+		if time_limit is not None:
+			self.deadline = self.started + time_limit
+		self.refuel()
+		self.run = self.run_limited
+		self.allocate = self.allocate_limited
+		
+	def refuel(self):
+		self.chunk = CHECK_INTERVAL
+		if self.max_instructions is not None:
+			self.chunk = max(1, min(self.chunk, self.max_instructions - self.instructions + 1))
+		self.fuel = self.chunk
+		
+	def executed_instructions(self):
+		'''
+		Instrucciones ejecutadas (solo se cuentan con límites activos)
+		'''
+		return self.instructions + self.chunk - self.fuel
+		
+	def elapsed(self):
+		return time.perf_counter() - self.started if self.started is not None else 0.0
+		
+	def limit_exceeded(self, limit):
+		return ExecutionLimitExceeded(limit, self.executed_instructions(), self.elapsed(), self.allocated)
+		
+	def check_limits(self):
+		'''
+		Revisión periódica del presupuesto de instrucciones y del reloj
+		'''
+		if self.max_instructions is not None and self.executed_instructions() > self.max_instructions:
+			raise self.limit_exceeded('instructions')
+		if self.deadline is not None and time.perf_counter() > self.deadline:
+			raise self.limit_exceeded('time')
+		self.instructions = self.executed_instructions()
+		self.refuel()
+		
+	def call(self, function, arguments):
+		'''
+		Invoca una función decodificada con los valores dados para sus 
+		parámetros y retorna su resultado.
+		'''
+		frame = function.new_frame()
+		frame.vars[:len(arguments)] = arguments
+		
+		saved = self.function, self.registers, self.vars, self.slots
+		self.function = function
+		self.registers = frame.registers
+		self.vars = frame.vars
+		self.slots = function.slots
+		try:
+			self.run(function.program)
+		finally:
+			self.function, self.registers, self.vars, self.slots = saved
+			function.release_frame(frame)
+			
+		result = self.retval
+		self.retval = None
+		return result
+		
+	def quicken(self, program, index, handler, quickener, op_code, args):
+		'''
+		Reemplaza program[index] por la versión especializada que retorna 
+		quickener (o por el handler genérico si no hay especialización) y 
+		la ejecuta.
+		'''
+		specialized = quickener(op_code, *args)
+		if specialized:
+			handler, args = specialized
+			self.quickened_count += 1
+		program[index] = (handler, args)
+		return handler(*args)
+		
+	def quickening_stats(self):
+		'''
+		Retorna un texto con la fracción de instrucciones especializadas
+		'''
+		fraction = self.quickened_count / (self.decoded_count or 1)
+		return f'quickening: {self.quickened_count} de {self.decoded_count} instrucciones ({100 * fraction:.1f}%)'
+		
+	def run(self, program):
+		# Ciclo caliente: solo indexar y llamar.  Los handlers de salto 
+		# retornan el índice de la siguiente instrucción; el resto 
+		# retorna None y la ejecución continúa en secuencia.
+		pc = 0
+		end = len(program)
+		while pc < end:
+			handler, args = program[pc]
+			pc += 1
+			target = handler(*args)
+			if target is not None:
+				pc = target
+				
+	def run_limited(self, program):
+		# Cada llamada cuesta una instrucción, para cortar también 
+		# recursiones sin saltos
+		self.fuel -= 1
+		if self.fuel <= 0:
+			self.check_limits()
+		if self.max_depth is not None and self.depth >= self.max_depth:
+			raise self.limit_exceeded('depth')
+		self.depth += 1
+		try:
+			self.run_metered(program)
+		finally:
+			self.depth -= 1
+			
+	def run_metered(self, program):
+		# Igual que run, pero en cada salto descuenta del combustible las
+		# instrucciones del bloque recién ejecutado
+		pc = start = 0
+		end = len(program)
+		while pc < end:
+			handler, args = program[pc]
+			pc += 1
+			target = handler(*args)
+			if target is not None:
+				self.fuel -= pc - start
+				if self.fuel <= 0:
+					self.check_limits()
+				pc = start = target
+		self.fuel -= pc - start
+		
 	# Interpreter opcodes
 	def run_MOVI(self, value, target):
 		self.registers[target] = value
 	run_MOVF = run_MOVI
 	run_MOVB = run_MOVI
 	
+	def run_COPYI(self, source, target):
+		self.registers[target] = self.registers[source]
+	run_COPYF = run_COPYI
+	run_COPYB = run_COPYI
+	
+	# NEG es 0 - x y no -x: con 0.0 el resultado no es -0.0
+	def run_NEGI(self, source, target):
+		self.registers[target] = 0 - self.registers[source]
+	run_NEGF = run_NEGI
+	
+	def run_NOT(self, source, target):
+		self.registers[target] = 1 ^ self.registers[source]
+		
 	def run_ADDI(self, left, right, target):
 		self.registers[target] = self.registers[left] + self.registers[right]
 	run_ADDF = run_ADDI
@@ -71,32 +550,360 @@ class Interpreter(object):
 	def run_DIVF(self, left, right, target):
 		self.registers[target] = self.registers[left] / self.registers[right]
 		
+	def run_ANDI(self, left, right, target):
+		self.registers[target] = self.registers[left] & self.registers[right]
+		
+	def run_ORI(self, left, right, target):
+		self.registers[target] = self.registers[left] | self.registers[right]
+		
+	def run_XOR(self, left, right, target):
+		self.registers[target] = self.registers[left] ^ self.registers[right]
+		
+	def run_CMPI(self, op, left, right, target):
+		self.registers[target] = CMP_OPERATORS[op](self.registers[left], self.registers[right])
+	run_CMPF = run_CMPI
+	run_CMPB = run_CMPI
+	
+	# Control de flujo.  Los rotulos ya fueron resueltos a índices
+	def run_BRANCH(self, label):
+		return label
+		
+	def run_CBRANCH(self, test, t_label, f_label):
+		return t_label if self.registers[test] else f_label
+		
+	# Llamadas.  La función invocada se busca en la tabla de funciones
+	def run_CALL(self, name, *registers):
+		*arguments, target = registers
+		values = [self.registers[r] for r in arguments]
+		self.registers[target] = self.call(self.functions[name], values)
+		
+	def run_RET(self, *value):
+		if value:
+			self.retval = self.registers[value[0]]
+		return HALT
+		
 	def run_PRINTI(self, value):
-		print(self.registers[value])
+		self.write(f'{self.registers[value]}\n')
 	run_PRINTF = run_PRINTI
 	
 	def run_PRINTB(self, value):
-		print(chr(self.registers[value]),end='')
-		sys.stdout.flush()
+		self.write(chr(self.registers[value]))
 		
+	# Variables.  Los nombres locales se buscan primero en self.slots; 
+	# si no estan ahi, son globales.
 	def run_VARI(self, name):
-		self.vars[name] = 0
+		self.globals[self.global_slots[name]] = 0
 		
 	def run_VARF(self, name):
-		self.vars[name] = 0.0
+		self.globals[self.global_slots[name]] = 0.0
 		
 	run_VARB = run_VARI
 	
+	def run_ALLOCI(self, name):
+		self.vars[self.slots[name]] = 0
+		
+	def run_ALLOCF(self, name):
+		self.vars[self.slots[name]] = 0.0
+		
+	run_ALLOCB = run_ALLOCI
+	
 	def run_LOADI(self, name, target):
-		self.registers[target] = self.vars[name]
+		slot = self.slots.get(name)
+		if slot is None:
+			self.registers[target] = self.globals[self.global_slots[name]]
+		else:
+			self.registers[target] = self.vars[slot]
 	run_LOADF = run_LOADI
 	run_LOADB = run_LOADI
 	
 	def run_STOREI(self, target, name):
-		self.vars[name] = self.registers[target]
+		slot = self.slots.get(name)
+		if slot is None:
+			self.globals[self.global_slots[name]] = self.registers[target]
+		else:
+			self.vars[slot] = self.registers[target]
 	run_STOREF = run_STOREI
 	run_STOREB = run_STOREI
 	
+	# Arreglos.  El registro o variable del arreglo guarda una referencia
+	# al objeto array/bytearray.
+	def allocate(self, type_code, size):
+		return new_array(type_code, size)
+		
+	def allocate_limited(self, type_code, size):
+		nbytes = array_nbytes(type_code, size)
+		if self.max_allocated is not None and self.allocated + nbytes > self.max_allocated:
+			raise self.limit_exceeded('allocated')
+		self.allocated += nbytes
+		return new_array(type_code, size)
+		
+	def run_NEWI(self, size, target):
+		self.registers[target] = self.allocate('I', self.registers[size])
+		
+	def run_NEWF(self, size, target):
+		self.registers[target] = self.allocate('F', self.registers[size])
+		
+	def run_NEWB(self, size, target):
+		self.registers[target] = self.allocate('B', self.registers[size])
+		
+	def run_ALOADI(self, name, index, target):
+		index = self.registers[index]
+		if index < 0:
+			bad_index(index)
+		self.registers[target] = self.read_var(name)[index]
+	run_ALOADF = run_ALOADI
+	run_ALOADB = run_ALOADI
+	
+	def run_ASTOREI(self, source, name, index):
+		index = self.registers[index]
+		if index < 0:
+			bad_index(index)
+		self.read_var(name)[index] = self.registers[source]
+	run_ASTOREF = run_ASTOREI
+	run_ASTOREB = run_ASTOREI
+	
+	def run_ASIZE(self, name, target):
+		self.registers[target] = len(self.read_var(name))
+		
+	def read_var(self, name):
+		slot = self.slots.get(name)
+		if slot is None:
+			return self.globals[self.global_slots[name]]
+		return self.vars[slot]
+		
+	def write_var(self, name, value):
+		slot = self.slots.get(name)
+		if slot is None:
+			self.globals[self.global_slots[name]] = value
+		else:
+			self.vars[slot] = value
+			
+	# Versiones especializadas (quickening) de las instrucciones de 
+	# variables, llamadas y comparaciones
+	def local_slot(self, name):
+		return self.slots.get(name)
+		
+	def quicken_LOAD(self, op_code, name, target):
+		slot = self.local_slot(name)
+		if slot is None:
+			return self.run_LOADG, (self.global_slots[name], target)
+		return self.run_LOADL, (slot, target)
+		
+	def quicken_STORE(self, op_code, source, name):
+		slot = self.local_slot(name)
+		if slot is None:
+			return self.run_STOREG, (source, self.global_slots[name])
+		return self.run_STOREL, (source, slot)
+		
+	def quicken_ALLOC(self, op_code, name):
+		return self.run_ALLOCL, (self.slots[name], 0.0 if op_code == 'ALLOCF' else 0)
+		
+	def quicken_VAR(self, op_code, name):
+		return self.run_VARG, (self.global_slots[name], 0.0 if op_code == 'VARF' else 0)
+		
+	def quicken_CALL(self, op_code, name, *registers):
+		*arguments, target = registers
+		return self.run_CALLQ, (self.functions[name], tuple(arguments), target)
+		
+	def quicken_CMP(self, op_code, op, left, right, target):
+		return self.run_CMPQ, (CMP_OPERATORS[op], left, right, target)
+		
+	def quicken_CMPBR(self, op_code, op, left, right, t_label, f_label):
+		return self.run_CMPBRQ, (CMP_OPERATORS[op], left, right, t_label, f_label)
+		
+	def quicken_binop_vars(self, op_code, left, right, name):
+		# Solo se especializa si todas las variables son locales
+		slots = [self.local_slot(left), self.local_slot(right), self.local_slot(name)]
+		if None not in slots:
+			return self.run_BINVVL, (ARITHM_OPERATORS[op_code[:3] + op_code[-1]], *slots)
+	quicken_ADDVV = quicken_binop_vars
+	quicken_SUBVV = quicken_binop_vars
+	quicken_MULVV = quicken_binop_vars
+	quicken_DIVVV = quicken_binop_vars
+	
+	def quicken_binop_const(self, op_code, left, value, name):
+		slots = [self.local_slot(left), self.local_slot(name)]
+		if None not in slots:
+			return self.run_BINVCL, (ARITHM_OPERATORS[op_code[:3] + op_code[-1]], slots[0], value, slots[1])
+	quicken_ADDVC = quicken_binop_const
+	quicken_SUBVC = quicken_binop_const
+	quicken_MULVC = quicken_binop_const
+	quicken_DIVVC = quicken_binop_const
+	
+	def quicken_STOREC(self, op_code, value, name):
+		slot = self.local_slot(name)
+		if slot is None:
+			return self.run_VARG, (self.global_slots[name], value)
+		return self.run_ALLOCL, (slot, value)
+		
+	def quicken_CMPVVBR(self, op_code, op, left, right, t_label, f_label):
+		slots = [self.local_slot(left), self.local_slot(right)]
+		if None not in slots:
+			return self.run_CMPVVBRL, (CMP_OPERATORS[op], *slots, t_label, f_label)
+			
+	def quicken_CMPVCBR(self, op_code, op, left, value, t_label, f_label):
+		slot = self.local_slot(left)
+		if slot is not None:
+			return self.run_CMPVCBRL, (CMP_OPERATORS[op], slot, value, t_label, f_label)
+			
+	def quicken_ALOAD(self, op_code, name, index, target):
+		slot = self.local_slot(name)
+		if slot is None:
+			return self.run_ALOADG, (self.global_slots[name], index, target)
+		return self.run_ALOADL, (slot, index, target)
+		
+	def quicken_ASTORE(self, op_code, source, name, index):
+		slot = self.local_slot(name)
+		if slot is None:
+			return self.run_ASTOREG, (source, self.global_slots[name], index)
+		return self.run_ASTOREL, (source, slot, index)
+		
+	def quicken_ASIZE(self, op_code, name, target):
+		slot = self.local_slot(name)
+		if slot is None:
+			return self.run_ASIZEG, (self.global_slots[name], target)
+		return self.run_ASIZEL, (slot, target)
+		
+	def run_ALOADL(self, slot, index, target):
+		registers = self.registers
+		index = registers[index]
+		if index < 0:
+			bad_index(index)
+		registers[target] = self.vars[slot][index]
+		
+	def run_ALOADG(self, slot, index, target):
+		registers = self.registers
+		index = registers[index]
+		if index < 0:
+			bad_index(index)
+		registers[target] = self.globals[slot][index]
+		
+	def run_ASTOREL(self, source, slot, index):
+		registers = self.registers
+		index = registers[index]
+		if index < 0:
+			bad_index(index)
+		self.vars[slot][index] = registers[source]
+		
+	def run_ASTOREG(self, source, slot, index):
+		registers = self.registers
+		index = registers[index]
+		if index < 0:
+			bad_index(index)
+		self.globals[slot][index] = registers[source]
+		
+	def run_ASIZEL(self, slot, target):
+		self.registers[target] = len(self.vars[slot])
+		
+	def run_ASIZEG(self, slot, target):
+		self.registers[target] = len(self.globals[slot])
+		
+	def run_LOADL(self, slot, target):
+		self.registers[target] = self.vars[slot]
+		
+	def run_LOADG(self, slot, target):
+		self.registers[target] = self.globals[slot]
+		
+	def run_STOREL(self, source, slot):
+		self.vars[slot] = self.registers[source]
+		
+	def run_STOREG(self, source, slot):
+		self.globals[slot] = self.registers[source]
+		
+	def run_ALLOCL(self, slot, value):
+		self.vars[slot] = value
+		
+	def run_VARG(self, slot, value):
+		self.globals[slot] = value
+		
+	def run_CALLQ(self, function, arguments, target):
+		registers = self.registers
+		registers[target] = self.call(function, [registers[r] for r in arguments])
+		
+	def run_CMPQ(self, op, left, right, target):
+		self.registers[target] = op(self.registers[left], self.registers[right])
+		
+	def run_CMPBRQ(self, op, left, right, t_label, f_label):
+		return t_label if op(self.registers[left], self.registers[right]) else f_label
+		
+	def run_BINVVL(self, op, left, right, slot):
+		vars = self.vars
+		vars[slot] = op(vars[left], vars[right])
+		
+	def run_BINVCL(self, op, left, value, slot):
+		vars = self.vars
+		vars[slot] = op(vars[left], value)
+		
+	def run_CMPVVBRL(self, op, left, right, t_label, f_label):
+		vars = self.vars
+		return t_label if op(vars[left], vars[right]) else f_label
+		
+	def run_CMPVCBRL(self, op, left, value, t_label, f_label):
+		return t_label if op(self.vars[left], value) else f_label
+		
+	# Superinstrucciones (ver superinst.py)
+	def run_ADDVVI(self, left, right, name):
+		self.write_var(name, self.read_var(left) + self.read_var(right))
+	run_ADDVVF = run_ADDVVI
+	
+	def run_SUBVVI(self, left, right, name):
+		self.write_var(name, self.read_var(left) - self.read_var(right))
+	run_SUBVVF = run_SUBVVI
+	
+	def run_MULVVI(self, left, right, name):
+		self.write_var(name, self.read_var(left) * self.read_var(right))
+	run_MULVVF = run_MULVVI
+	
+	def run_DIVVVI(self, left, right, name):
+		self.write_var(name, self.read_var(left) // self.read_var(right))
+		
+	def run_DIVVVF(self, left, right, name):
+		self.write_var(name, self.read_var(left) / self.read_var(right))
+		
+	def run_ADDVCI(self, left, value, name):
+		self.write_var(name, self.read_var(left) + value)
+	run_ADDVCF = run_ADDVCI
+	
+	def run_SUBVCI(self, left, value, name):
+		self.write_var(name, self.read_var(left) - value)
+	run_SUBVCF = run_SUBVCI
+	
+	def run_MULVCI(self, left, value, name):
+		self.write_var(name, self.read_var(left) * value)
+	run_MULVCF = run_MULVCI
+	
+	def run_DIVVCI(self, left, value, name):
+		self.write_var(name, self.read_var(left) // value)
+		
+	def run_DIVVCF(self, left, value, name):
+		self.write_var(name, self.read_var(left) / value)
+		
+	def run_STORECI(self, value, name):
+		self.write_var(name, value)
+	run_STORECF = run_STORECI
+	run_STORECB = run_STORECI
+	
+	def run_CMPBRI(self, op, left, right, t_label, f_label):
+		if CMP_OPERATORS[op](self.registers[left], self.registers[right]):
+			return t_label
+		return f_label
+	run_CMPBRF = run_CMPBRI
+	run_CMPBRB = run_CMPBRI
+	
+	def run_CMPVVBRI(self, op, left, right, t_label, f_label):
+		if CMP_OPERATORS[op](self.read_var(left), self.read_var(right)):
+			return t_label
+		return f_label
+	run_CMPVVBRF = run_CMPVVBRI
+	run_CMPVVBRB = run_CMPVVBRI
+	
+	def run_CMPVCBRI(self, op, left, value, t_label, f_label):
+		if CMP_OPERATORS[op](self.read_var(left), value):
+			return t_label
+		return f_label
+	run_CMPVCBRF = run_CMPVCBRI
+	run_CMPVCBRB = run_CMPVCBRI
+	
 # ----------------------------------------------------------------------
 #                       NO MODIFIQUE NADA DESDE AQUI
 # ----------------------------------------------------------------------
@@ -106,17 +913,109 @@ def main():
 	from ircode import compile_ircode
 	from errores import errors_reported
 	
-	if len(sys.argv) != 2:
-		sys.stderr.write('Usage: python3 -m minic.interp filename\n')
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write('Usage: python3 -m minic.interp [--tier=interp|python|tiered] [--no-optimize | --passes=name,...] [--stats] [--profile | --profile-json=file] '
+			'[--max-instructions=n] [--time-limit=seconds] [--max-allocated=bytes] [--max-depth=n] filename\n')
+		raise SystemExit(1)
+		
+	tier = 'interp'
+	profile = '--profile' in sys.argv
+	profile_json = None
+	passes = None
+	for arg in sys.argv[1:]:
+		if arg.startswith('--tier='):
+			tier = arg[len('--tier='):]
+		elif arg.startswith('--profile-json='):
+			profile_json = arg[len('--profile-json='):]
+		elif arg.startswith('--passes='):
+			passes = arg[len('--passes='):].split(',')
+	if tier not in ('interp', 'python', 'tiered'):
+		sys.stderr.write(f'Tier desconocido {tier!r}\n')
+		raise SystemExit(1)
+	if passes is not None:
+		from optimize import PASSES, PROGRAM_PASSES
+		unknown = [name for name in passes if name not in PASSES and name not in PROGRAM_PASSES]
+		if unknown:
+			sys.stderr.write(f'Pases desconocidos: {", ".join(unknown)}\n')
+			raise SystemExit(1)
+		if '--no-optimize' in sys.argv:
+			sys.stderr.write('--passes no aplica con --no-optimize\n')
+			raise SystemExit(1)
+	if tier == 'python' and (profile or profile_json or '--stats' in sys.argv):
+		sys.stderr.write('--profile y --stats no aplican a --tier=python\n')
+		raise SystemExit(1)
+	if tier == 'tiered' and (profile or profile_json):
+		sys.stderr.write('--profile no aplica a --tier=tiered\n')
+		raise SystemExit(1)
+			
+	limits = { }
+	for arg in sys.argv[1:]:
+		if arg.startswith('--max-instructions='):
+			limits['max_instructions'] = int(arg.split('=', 1)[1])
+		elif arg.startswith('--time-limit='):
+			limits['time_limit'] = float(arg.split('=', 1)[1])
+		elif arg.startswith('--max-allocated='):
+			limits['max_allocated'] = int(arg.split('=', 1)[1])
+		elif arg.startswith('--max-depth='):
+			limits['max_depth'] = int(arg.split('=', 1)[1])
+	if limits and tier == 'python':
+		sys.stderr.write('Los limites de ejecucion no aplican a --tier=python\n')
 		raise SystemExit(1)
 		
-	source = open(sys.argv[1]).read()
-	code = compile_ircode(source)
-	print(code)
+	report = { }
+	if args[0].endswith('.mir'):
+		# Programa ya compilado (ver mir.py): no se analiza nada
+		from mir import load_mir
+		code = load_mir(args[0])
+	else:
+		# Se optimiza aquí (y no en compile_ircode) para conservar el 
+		# reporte de los pases para --stats
+		from optimize import optimize_program
+		source = open(args[0]).read()
+		code = compile_ircode(source, optimize=False)
+		if '--no-optimize' not in sys.argv and not errors_reported():
+			report = optimize_program(code, passes)
+	print(list(code))
 	if not errors_reported():
-		interpreter = Interpreter()
-		interpreter.execute(code)
+		# Cada llamada de MiniC anida unas pocas llamadas de Python
+		sys.setrecursionlimit(RECURSION_LIMIT)
 		
+		# Se usan las clases del módulo interp (no las de __main__) para 
+		# que la excepción sea la misma que lanzan tiered y profiler
+		from interp import Interpreter, ExecutionLimitExceeded
+		if tier == 'python':
+			from pycompile import CompiledProgram
+			CompiledProgram(code).execute()
+			return
+			
+		if tier == 'tiered':
+			from tiered import TieredInterpreter
+			interpreter = TieredInterpreter()
+		elif profile or profile_json:
+			from profiler import ProfilingInterpreter
+			interpreter = ProfilingInterpreter()
+		else:
+			interpreter = Interpreter()
+			
+		try:
+			interpreter.execute(code, **limits)
+		except ExecutionLimitExceeded as e:
+			sys.stderr.write(f'{e}\n')
+			raise SystemExit(2)
+			
+		if profile_json:
+			import json
+			with open(profile_json, 'w') as file:
+				json.dump(interpreter.as_dict(), file, indent=2)
+		elif profile:
+			sys.stderr.write(interpreter.report() + '\n')
+		if '--stats' in sys.argv:
+			if report:
+				from optimize import format_report
+				sys.stderr.write(format_report(report) + '\n')
+			sys.stderr.write(interpreter.quickening_stats() + '\n')
+			
 if __name__ == '__main__':
 	main()
 
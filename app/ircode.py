@@ -26,16 +26,109 @@ OP_CODES = ChainMap({
 	'cbranch': 'CBRANCH', # Conditional branch
 	'branch': 'BRANCH',   # Unconditional branch,
 	'call': 'CALL',
-	'ret': 'RET'},
+	'ret': 'RET',
+	'new': 'NEW',         # Nuevo arreglo
+	'aload': 'ALOAD',     # Lectura de un elemento de arreglo
+	'astore': 'ASTORE',   # Escritura de un elemento de arreglo
+	'asize': 'ASIZE'},    # Tamaño de arreglo
 	dict.fromkeys(['<', '>', '<=', '>=', '==', '!='], "CMP")
 )
 
+# Clase de cada operando de una instruccion, indexada por el codigo de 
+# operacion sin sufijo de tipo:
+#
+#   'c' constante       'r' registro        'v' variable
+#   'l' rotulo          'o' operador        'f' nombre de funcion
+#   '*' cero o mas registros
+IR_OPERANDS = {
+	'MOV': 'cr',
+	'ADD': 'rrr',
+	'SUB': 'rrr',
+	'MUL': 'rrr',
+	'DIV': 'rrr',
+	'AND': 'rrr',
+	'OR': 'rrr',
+	'XOR': 'rrr',
+	'CMP': 'orrr',
+	'PRINT': 'r',
+	'VAR': 'v',
+	'ALLOC': 'v',
+	'LOAD': 'vr',
+	'STORE': 'rv',
+	'LABEL': 'l',
+	'BRANCH': 'l',
+	'CBRANCH': 'rll',
+	'CALL': 'f*',
+	'RET': '*',
+	'NEW': 'rr',
+	'ALOAD': 'vrr',
+	'ASTORE': 'rvr',
+	'ASIZE': 'vr',
+	'COPY': 'rr',         # Copia de registro (ver ssa.py)
+	'NEG': 'rr',          # 0 - x y 1 ^ x (ver peephole.py)
+	'NOT': 'rr',
+	
+	# Superinstrucciones (ver superinst.py)
+	'ADDVV': 'vvv',
+	'SUBVV': 'vvv',
+	'MULVV': 'vvv',
+	'DIVVV': 'vvv',
+	'ADDVC': 'vcv',
+	'SUBVC': 'vcv',
+	'MULVC': 'vcv',
+	'DIVVC': 'vcv',
+	'STOREC': 'cv',
+	'CMPBR': 'orrll',
+	'CMPVVBR': 'ovvll',
+	'CMPVCBR': 'ovcll',
+}
+
+# Codigos de operacion cuyo ultimo registro es el destino de la instruccion
+IR_DEFINES = {'MOV', 'ADD', 'SUB', 'MUL', 'DIV', 'AND', 'OR', 'XOR', 'CMP', 'LOAD', 'CALL',
+	'NEW', 'ALOAD', 'ASIZE', 'COPY', 'NEG', 'NOT'}
+
 def get_op_code(operation, type_name=None):
 	op_code = OP_CODES[operation]
 	suffix = "" if not type_name else IR_TYPE_MAPPING[type_name]
 	
 	return f"{op_code}{suffix}"
 	
+def get_base_op_code(op_code):
+	'''
+	Retorna el codigo de operacion sin su sufijo de tipo ('ADDI' -> 'ADD')
+	'''
+	if op_code in IR_OPERANDS:
+		return op_code
+	return op_code[:-1]
+	
+def get_operand_kinds(inst):
+	'''
+	Retorna la clase de cada operando de la instruccion inst, 
+	con un caracter por operando (ver IR_OPERANDS)
+	'''
+	op_code, *args = inst
+	kinds = IR_OPERANDS[get_base_op_code(op_code)]
+	if kinds.endswith('*'):
+		kinds = kinds[:-1]
+		kinds += 'r' * (len(args) - len(kinds))
+	return kinds
+	
+def get_registers(inst):
+	'''
+	Retorna dos listas (defs, uses) con los registros escritos y leidos 
+	por la instruccion inst
+	'''
+	registers = [arg for kind, arg in zip(get_operand_kinds(inst), inst[1:]) if kind == 'r']
+	if registers and get_base_op_code(inst[0]) in IR_DEFINES:
+		return registers[-1:], registers[:-1]
+	return [], registers
+	
+def register_index(register):
+	'''
+	Retorna la posicion entera de un registro ('R7' -> 7)
+	'''
+	return int(register[1:])
+	
 	
 class Function():
 	'''
@@ -47,6 +140,11 @@ class Function():
 		self.parameters = parameters
 		self.return_type = return_type
 		
+		# Los registros se numeran de forma densa dentro de cada funcion
+		# (R1 .. Rn), asi el tamaño del banco de registros se conoce antes
+		# de ejecutar.
+		self.register_count = 0
+		
 		self.code = []
 		
 	def append(self, ir_instruction):
@@ -67,9 +165,6 @@ class GenerateCode(cast.NodeVisitor):
 	'''
 	
 	def __init__(self):
-		# contador de registros
-		self.register_count = 0
-		
 		# contador rotulos de bloque
 		self.label_count = 0
 		
@@ -78,19 +173,23 @@ class GenerateCode(cast.NodeVisitor):
 		
 		self.functions = [ init_function ]
 		
-		# El código generado (lista de tuplas)
+		# La función actual y su código generado (lista de tuplas)
+		self.function = init_function
 		self.code = init_function.code
 		
 		# Esta bandera indica si el código actual que se está visitando 
 		# está en alcance global, o no
 		self.global_scope = True
 		
+		# Pila con los rotulos de salida de los ciclos while anidados
+		self.loop_exits = []
+		
 	def new_register(self):
 		'''
-		Crea un nuevo registro temporal
+		Crea un nuevo registro temporal en la función actual
 		'''
-		self.register_count += 1
-		return f'R{self.register_count}'
+		self.function.register_count += 1
+		return f'R{self.function.register_count}'
 		
 	def new_label(self):
 		self.label_count += 1
@@ -189,29 +288,44 @@ class GenerateCode(cast.NodeVisitor):
 			node.register = node.right.register			
 		
 	def visit_ReadLocation(self, node):
-		op_code = get_op_code('load', node.location.type.name)
-		register = self.new_register()
-		inst = (op_code, node.location.name, register)
+		if isinstance(node.location, cast.ArraySimpleLocation):
+			# Lectura de un elemento: a[i]
+			self.visit(node.location.size)
+			op_code = get_op_code('aload', node.location.type.name)
+			register = self.new_register()
+			inst = (op_code, node.location.name, node.location.size.register, register)
+		else:
+			op_code = get_op_code('load', node.location.type.name)
+			register = self.new_register()
+			inst = (op_code, node.location.name, register)
 		self.code.append(inst)
 		node.register = register
 		
 	def visit_WriteLocation(self, node):
 		self.visit(node.value)
-		if hasattr(node.value,'expr'):
-			pass
+		if isinstance(node.location, cast.ArraySimpleLocation):
+			# Escritura de un elemento: a[i] = value
+			self.visit(node.location.size)
+			op_code = get_op_code('astore', node.location.type.name)
+			inst = (op_code, node.value.register, node.location.name, node.location.size.register)
 		else:
-			if hasattr(node.location,'size'):
-				op_code = get_op_code('store', node.location.type.name)
-				inst = (op_code, node.value.register, node.location.name + '[' + str(node.location.size.value) + ']')
-				self.code.append(inst)
-			else:
-				op_code = get_op_code('store', node.location.type.name)
-				inst = (op_code, node.value.register, node.location.name)
-				self.code.append(inst)
+			op_code = get_op_code('store', node.location.type.name)
+			inst = (op_code, node.value.register, node.location.name)
+		self.code.append(inst)
 
 	def visit_NewArrayExpression(self,node):
 		self.visit(node.datatype)
-		#self.visit(node.expr)
+		self.visit(node.expr)
+		op_code = get_op_code('new', node.datatype.name)
+		target = self.new_register()
+		self.code.append((op_code, node.expr.register, target))
+		node.register = target
+		
+	def visit_ArraySize(self, node):
+		op_code = get_op_code('asize')
+		target = self.new_register()
+		self.code.append((op_code, node.name, target))
+		node.register = target
 		
 	def visit_VarDeclaration(self, node):
 		self.visit(node.datatype)
@@ -274,27 +388,37 @@ class GenerateCode(cast.NodeVisitor):
 		self.code.append((lbl_op_code, merge_label))
 
 	def visit_WhileStatement(self,node):
-		self.visit(node.condition)
-
-		# Genera etiquetas para ambas ramas 
-		f_label = self.new_label()
+		# Genera etiquetas para la condicion, el cuerpo y la salida
+		top_label = self.new_label()
 		t_label = self.new_label()
-		merge_label = self.new_label()
+		f_label = self.new_label()
 		lbl_op_code = get_op_code('label')
 		
+		# La condicion se evalua al inicio de cada iteracion
+		self.code.append((lbl_op_code, top_label))
+		self.visit(node.condition)
+		
 		# Inserta la instruccion CBRANCH
 		cbranch_op_code = get_op_code('cbranch')
 		self.code.append((cbranch_op_code, node.condition.register, t_label, f_label))
 		
-		# Ahora, el codigo para la rama true
+		# Ahora, el codigo para el cuerpo del ciclo
 		self.code.append((lbl_op_code, t_label))
+		self.loop_exits.append(f_label)
 		self.visit(node.body)
-		# Y debemos mezclar la etiqueta
+		self.loop_exits.pop()
+		
+		# Y regresamos a evaluar la condicion
 		branch_op_code = get_op_code('branch')
-		self.code.append((branch_op_code, merge_label))
+		self.code.append((branch_op_code, top_label))
 
-		# Ahora insertamos la etiqueta mezclada
-		self.code.append((lbl_op_code, merge_label))
+		# Ahora insertamos la etiqueta de salida
+		self.code.append((lbl_op_code, f_label))
+		
+	def visit_BreakStatement(self, node):
+		# Salta a la etiqueta de salida del ciclo mas interno
+		branch_op_code = get_op_code('branch')
+		self.code.append((branch_op_code, self.loop_exits[-1]))
 
 		
 	def visit_FuncDeclaration(self, node):
@@ -308,7 +432,9 @@ class GenerateCode(cast.NodeVisitor):
 			func.name = "__minic_main"
 			
 		# Y cambiar la función actual a la nueva.
+		old_function = self.function
 		old_code = self.code
+		self.function = func
 		self.code = func.code
 		
 		# Ahora, genera el nuevo código de función.
@@ -317,6 +443,7 @@ class GenerateCode(cast.NodeVisitor):
 		self.global_scope = True # Turn back on global scope
 		
 		# Y, finalmente, volver a la función original en la que estábamos
+		self.function = old_function
 		self.code = old_code
 		
 	def visit_FuncCall(self, node):
@@ -333,13 +460,15 @@ class GenerateCode(cast.NodeVisitor):
 		if hasattr(node.value, 'register'):
 			self.code.append((op_code, node.value.register))
 			node.register = node.value.register
+		else:
+			self.code.append((op_code,))
 
 	def visit_ArrayDeclaration(self, node):
 		self.visit(node.datatype)
 
 		# La declaracion de variable depende del alcance
 		op_code = get_op_code('var' if self.global_scope else 'alloc', node.type.name)
-		def_inst = (op_code, node.name+'[]')
+		def_inst = (op_code, node.name)
 		self.code.append(def_inst)
 
 	def visit_ArrayLocalDeclaration(self, node):
@@ -347,7 +476,7 @@ class GenerateCode(cast.NodeVisitor):
 
 		# La declaracion de variable depende del alcance
 		op_code = get_op_code('var' if self.global_scope else 'alloc', node.type.name)
-		def_inst = (op_code, node.name+'[]')
+		def_inst = (op_code, node.name)
 		self.code.append(def_inst)
 		
 # ----------------------------------------------------------------------
@@ -356,9 +485,10 @@ class GenerateCode(cast.NodeVisitor):
 # Nota: Algunos cambios serán necesarios en proyectos posteriores.
 # ----------------------------------------------------------------------
 
-def compile_ircode(source):
+def compile_ircode(source, optimize=True):
 	'''
-	Genera codigo intermedio desde el fuente.
+	Genera codigo intermedio desde el fuente.  Si optimize es verdadero
+	se aplican los pases por defecto de optimize.py.
 	'''
 	from cparse import parse
 	from checkers import check_program
@@ -371,6 +501,9 @@ def compile_ircode(source):
 	if not errors_reported():
 		gen = GenerateCode()
 		gen.visit(cast)
+		if optimize:
+			from optimize import optimize_program
+			optimize_program(gen.functions)
 		return gen.functions
 	else:
 		return []
@@ -378,12 +511,13 @@ def compile_ircode(source):
 def main():
 	import sys
 	
-	if len(sys.argv) != 2:
-		sys.stderr.write("Usage: python3 -m minic.ircode filename\n")
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write("Usage: python3 -m minic.ircode [--no-optimize] filename\n")
 		raise SystemExit(1)
 		
-	source = open(sys.argv[1]).read()
-	code = compile_ircode(source)
+	source = open(args[0]).read()
+	code = compile_ircode(source, optimize='--no-optimize' not in sys.argv)
 	
 	for f in code :
 		print(f'{"::"*5} {f} {"::"*5}')
@@ -0,0 +1,250 @@
+# minic/irencode.py
+'''
+IR codificado
+=============
+
+Cada instrucción IR es una tupla de strings, como
+('ADDI', 'R1', 'R2', 'R3'), dentro de la lista Function.code.  Un
+programa grande son muchos objetos pequeños repartidos en memoria.
+
+Este módulo guarda el programa completo en forma compacta: un solo
+array('i') con los números de opcode y los operandos, más tablas
+auxiliares para las constantes, los nombres (variables, funciones y
+operadores de comparación) y los rotulos.  Cada operando se codifica
+según su clase en IR_OPERANDS (ver ircode.py):
+
+	c  posición en la tabla de constantes
+	r  número del registro ('R7' -> 7)
+	v  posición en la tabla de nombres (también f y o)
+	l  posición en la tabla de rotulos
+	*  cantidad de registros, seguida de cada uno
+
+Así, ('ADDI', 'R1', 'R2', 'R3') ocupa cuatro enteros:
+OPCODES.index('ADDI'), 1, 2, 3.
+
+	encode(functions)     lista de ircode.Function -> EncodedProgram
+	decode(program)       EncodedProgram -> lista de ircode.Function
+
+Un EncodedProgram se comporta como la lista de funciones: el intérprete
+lo ejecuta directamente (Interpreter.execute(program)) y cada
+EncodedFunction entrega sus instrucciones (code) decodificándolas del
+arreglo al vuelo.
+
+Para ver un programa codificado y cuánto ocupa utiliza:
+
+    bash % python3 -m minic.irencode someprogram.c
+
+'''
+from array import array
+
+from ircode import IR_OPERANDS, Function, get_base_op_code, get_operand_kinds, register_index
+
+# Tabla de opcodes: cada operación base con cada sufijo de tipo
+OPCODES = tuple(f'{base}{suffix}' for base in IR_OPERANDS for suffix in ('', 'I', 'F', 'B'))
+OPCODE_NUMBERS = {op_code: n for n, op_code in enumerate(OPCODES)}
+assert len(OPCODE_NUMBERS) == len(OPCODES)
+
+class EncodedFunction(object):
+	'''
+	Una función dentro de un EncodedProgram.  Sus instrucciones son
+	program.code[start:end]; code las decodifica la primera vez que se
+	piden y retorna siempre la misma tupla.
+	'''
+	def __init__(self, program, name, parameters, return_type, register_count, start, end):
+		self.program = program
+		self.name = name
+		self.parameters = parameters
+		self.return_type = return_type
+		self.register_count = register_count
+		self.start = start
+		self.end = end
+		self.decoded = None
+
+	@property
+	def code(self):
+		if self.decoded is None:
+			self.decoded = tuple(self)
+		return self.decoded
+
+	def __iter__(self):
+		return self.program.instructions(self.start, self.end)
+
+	def decode(self):
+		'''
+		Retorna la ircode.Function equivalente
+		'''
+		function = Function(self.name, list(self.parameters), self.return_type)
+		function.register_count = self.register_count
+		function.code = list(self.code)
+		return function
+
+	def __repr__(self):
+		params = [f"{pname}:{ptype}" for pname, ptype in self.parameters]
+		return f"{self.name}({params}) -> {self.return_type}"
+
+class EncodedProgram(object):
+	'''
+	Un programa completo: el arreglo de instrucciones, las tablas de
+	constantes, nombres y rotulos, y la tabla de funciones
+	'''
+	def __init__(self, code=None, constants=None, names=None, labels=None):
+		self.code = code if code is not None else array('i')
+		self.constants = constants if constants is not None else [ ]
+		self.names = names if names is not None else [ ]
+		self.labels = labels if labels is not None else [ ]
+		self.functions = [ ]
+
+		# Posición de cada valor en su tabla (solo para codificar)
+		self.constant_index = {(type(value), repr(value)): n for n, value in enumerate(self.constants)}
+		self.name_index = {name: n for n, name in enumerate(self.names)}
+		self.label_index = {label: n for n, label in enumerate(self.labels)}
+
+	@staticmethod
+	def intern(table, index, key, value):
+		if key not in index:
+			index[key] = len(table)
+			table.append(value)
+		return index[key]
+
+	def add_function(self, function):
+		'''
+		Codifica una ircode.Function al final del arreglo
+		'''
+		start = len(self.code)
+		for inst in function.code:
+			self.add_instruction(inst)
+		self.functions.append(EncodedFunction(self, function.name, list(function.parameters),
+			function.return_type, function.register_count, start, len(self.code)))
+
+	def add_instruction(self, inst):
+		op_code, *args = inst
+		if op_code not in OPCODE_NUMBERS:
+			raise ValueError(f'Instruccion IR desconocida {op_code!r}')
+		words = [OPCODE_NUMBERS[op_code]]
+		kinds = IR_OPERANDS[get_base_op_code(op_code)]
+		if kinds.endswith('*'):
+			fixed = len(kinds) - 1
+			words += [self.operand(kind, arg) for kind, arg in zip(kinds[:-1], args[:fixed])]
+			words.append(len(args) - fixed)
+			words += [register_index(arg) for arg in args[fixed:]]
+		else:
+			words += [self.operand(kind, arg) for kind, arg in zip(kinds, args)]
+		self.code.extend(words)
+
+	def operand(self, kind, arg):
+		if kind == 'r':
+			return register_index(arg)
+		if kind == 'c':
+			# 0.0 == -0.0 y 1 == 1.0: la llave incluye tipo y repr
+			return self.intern(self.constants, self.constant_index, (type(arg), repr(arg)), arg)
+		if kind == 'l':
+			return self.intern(self.labels, self.label_index, arg, arg)
+		return self.intern(self.names, self.name_index, arg, arg)
+
+	def value(self, kind, word):
+		if kind == 'r':
+			return f'R{word}'
+		if kind == 'c':
+			return self.constants[word]
+		if kind == 'l':
+			return self.labels[word]
+		return self.names[word]
+
+	def instructions(self, start=0, end=None):
+		'''
+		Genera las tuplas de instrucción de code[start:end]
+		'''
+		code = self.code
+		end = len(code) if end is None else end
+		n = start
+		while n < end:
+			op_code = OPCODES[code[n]]
+			kinds = IR_OPERANDS[get_base_op_code(op_code)]
+			n += 1
+			args = [ ]
+			for kind in kinds:
+				if kind == '*':
+					count = code[n]
+					args += [f'R{word}' for word in code[n+1:n+1+count]]
+					n += 1 + count
+				else:
+					args.append(self.value(kind, code[n]))
+					n += 1
+			yield (op_code, *args)
+
+	def decode(self):
+		'''
+		Retorna la lista de ircode.Function equivalente
+		'''
+		return [function.decode() for function in self.functions]
+
+	def nbytes(self):
+		'''
+		Bytes que ocupa el arreglo de instrucciones
+		'''
+		return len(self.code) * self.code.itemsize
+
+	# El programa se usa como la lista de sus funciones
+	def __iter__(self):
+		return iter(self.functions)
+
+	def __len__(self):
+		return len(self.functions)
+
+	def __getitem__(self, index):
+		return self.functions[index]
+
+	def __repr__(self):
+		lines = [f'; {len(self.code)} palabras, {len(self.constants)} constantes, '
+			f'{len(self.names)} nombres, {len(self.labels)} rotulos']
+		for function in self.functions:
+			lines.append(f'{"::"*5} {function} {"::"*5}')
+			lines.extend(f'    {inst}' for inst in function)
+		return '\n'.join(lines)
+
+def encode(functions):
+	'''
+	Codifica una lista de ircode.Function en un EncodedProgram
+	'''
+	program = EncodedProgram()
+	for function in functions:
+		program.add_function(function)
+	return program
+
+def decode(program):
+	'''
+	Retorna la lista de ircode.Function de un EncodedProgram
+	'''
+	return program.decode()
+
+def tuple_nbytes(functions):
+	'''
+	Bytes aproximados de las listas de tuplas (listas, tuplas y strings
+	de registros; las constantes y los nombres se comparten)
+	'''
+	import sys
+	total = 0
+	for function in functions:
+		total += sys.getsizeof(function.code)
+		for inst in function.code:
+			total += sys.getsizeof(inst)
+			total += sum(sys.getsizeof(arg) for kind, arg in zip(get_operand_kinds(inst), inst[1:]) if kind == 'r')
+	return total
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	if len(sys.argv) != 2:
+		sys.stderr.write('Usage: python3 -m minic.irencode filename\n')
+		raise SystemExit(1)
+
+	code = compile_ircode(open(sys.argv[1]).read())
+	if not errors_reported():
+		program = encode(code)
+		print(program)
+		print(f'; tuplas: {tuple_nbytes(code)} bytes, codificado: {program.nbytes()} bytes')
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,260 @@
+# minic/lanes.py
+'''
+Ejecución vectorial por carriles
+================================
+
+Ejecuta una misma función MiniC sobre muchas entradas a la vez.  Cada
+registro y cada variable local guarda un vector de NumPy con un carril
+(lane) por entrada, y cada instrucción IR se ejecuta una sola vez por
+lote como una operación vectorial.  Evaluar la función sobre un millón
+de entradas es una pasada de operaciones vectoriales en vez de un
+millón de ejecuciones del intérprete.
+
+Los saltos se manejan con máscaras.  Cada bloque básico tiene una
+máscara de carriles pendientes; siempre se ejecuta el bloque pendiente
+de menor posición, solo para sus carriles activos, y los saltos reparten
+la máscara entre los bloques destino:
+
+	BRANCH L          pendientes[L] |= activos
+	CBRANCH t, A, B   pendientes[A] |= activos & t
+	                  pendientes[B] |= activos & ~t
+
+Las escrituras en registros y variables son predicadas (numpy.where), así
+los carriles inactivos no cambian.  Los ciclos funcionan igual: el salto
+hacia atrás vuelve a marcar el encabezado del ciclo y los carriles que ya
+salieron esperan en el bloque de salida hasta que terminan los demás.
+
+Solo se admiten funciones numéricas: MOV, COPY, ADD, SUB, MUL, DIV, AND,
+OR, XOR, NEG, NOT, CMP, variables locales (LOAD/STORE/ALLOC), BRANCH, CBRANCH y
+RET.  Los enteros son int64 de NumPy, por lo que pueden desbordar donde
+Python no lo haría.
+
+NumPy es opcional: solo se necesita para usar este módulo.
+
+    bash % python3 -m minic.lanes someprogram.c function inputs.txt
+
+inputs.txt tiene una entrada por línea, con un valor por parámetro.
+
+'''
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+from ircode import get_base_op_code
+
+# Tipo de NumPy de los valores según el sufijo de tipo del IR
+LANE_DTYPES = {
+	'I': 'int64',
+	'F': 'float64',
+	'B': 'int64',
+}
+
+LANE_OPERATORS = {
+	'ADDI': 'add', 'ADDF': 'add',
+	'SUBI': 'subtract', 'SUBF': 'subtract',
+	'MULI': 'multiply', 'MULF': 'multiply',
+	'DIVI': 'floor_divide', 'DIVF': 'true_divide',
+	'ANDI': 'bitwise_and',
+	'ORI': 'bitwise_or',
+	'XOR': 'bitwise_xor',
+}
+
+LANE_COMPARISONS = {
+	'<': 'less',
+	'<=': 'less_equal',
+	'>': 'greater',
+	'>=': 'greater_equal',
+	'==': 'equal',
+	'!=': 'not_equal',
+}
+
+class LaneExecutor(object):
+	'''
+	Ejecuta una ircode.Function sobre vectores de entradas.  Se invoca
+	con un arreglo por parámetro y retorna el arreglo de resultados:
+
+		poly = LaneExecutor(function)
+		results = poly(xs, ks)
+	'''
+	def __init__(self, function):
+		if np is None:
+			raise RuntimeError('La ejecucion vectorial requiere NumPy')
+		self.function = function
+		self.blocks, self.labels = self.split_blocks(function.code)
+		for block in self.blocks:
+			for op_code, *args in block:
+				if not hasattr(self, f'run_{get_base_op_code(op_code)}'):
+					raise RuntimeError(f'Instruccion IR no soportada en modo vectorial {op_code!r}')
+
+		self.locals = {pname for pname, _ in function.parameters}
+		for op_code, *args in function.code:
+			if op_code.startswith('ALLOC'):
+				self.locals.add(args[0])
+
+	@staticmethod
+	def split_blocks(code):
+		'''
+		Parte el código en bloques básicos.  Retorna la lista de bloques
+		y el índice de bloque de cada rotulo.
+		'''
+		blocks = [[]]
+		labels = { }
+		for inst in code:
+			if inst[0] == 'LABEL':
+				if blocks[-1]:
+					blocks.append([])
+				labels[inst[1]] = len(blocks) - 1
+			else:
+				blocks[-1].append(inst)
+		return blocks, labels
+
+	def __call__(self, *arguments):
+		if len(arguments) != len(self.function.parameters):
+			raise TypeError(f'{self.function.name} espera {len(self.function.parameters)} argumentos')
+		arrays = np.broadcast_arrays(*[np.asarray(arg, dtype=LANE_DTYPES[ptype])
+			for arg, (_, ptype) in zip(arguments, self.function.parameters)])
+		self.size = arrays[0].size if arrays else 1
+
+		self.vars = {pname: array.copy() for (pname, _), array in zip(self.function.parameters, arrays)}
+		self.registers = { }
+		self.result = None
+
+		pending = [None] * len(self.blocks)
+		pending[0] = np.ones(self.size, dtype=bool)
+		with np.errstate(all='ignore'):
+			while True:
+				index = next((n for n, mask in enumerate(pending) if mask is not None), None)
+				if index is None:
+					break
+				self.mask = pending[index]
+				pending[index] = None
+				self.full = bool(self.mask.all())
+				self.successors = []
+				inst = None
+				for inst in self.blocks[index]:
+					op_code, *args = inst
+					getattr(self, f'run_{get_base_op_code(op_code)}')(op_code, *args)
+					if op_code == 'RET':
+						# Como en el intérprete, lo que sigue a un RET
+						# dentro del bloque no se ejecuta
+						break
+				if inst is None or inst[0] not in ('BRANCH', 'CBRANCH', 'RET'):
+					if index + 1 < len(self.blocks):
+						self.successors.append((index + 1, self.mask))
+
+				for target, mask in self.successors:
+					if not mask.any():
+						continue
+					pending[target] = mask if pending[target] is None else pending[target] | mask
+
+		if self.result is None:
+			return np.zeros(self.size, dtype=LANE_DTYPES[self.function.return_type])
+		return self.result
+
+	def assign(self, store, name, value):
+		'''
+		Escritura predicada: solo cambian los carriles activos
+		'''
+		if self.full or name not in store:
+			store[name] = np.broadcast_to(value, (self.size,)).copy()
+		else:
+			# Un registro reutilizado (ver regalloc.py) puede cambiar de tipo
+			value = np.asarray(value)
+			store[name] = np.where(self.mask, value, store[name]).astype(value.dtype, copy=False)
+
+	def check_division(self, divisor):
+		if (self.mask & (divisor == 0)).any():
+			raise ZeroDivisionError('division por cero')
+
+	def run_MOV(self, op_code, value, target):
+		self.assign(self.registers, target, np.asarray(value, dtype=LANE_DTYPES[op_code[-1]]))
+
+	def run_COPY(self, op_code, source, target):
+		self.assign(self.registers, target, self.registers[source])
+
+	def run_binary(self, op_code, left, right, target):
+		right = self.registers[right]
+		if op_code.startswith('DIV'):
+			self.check_division(right)
+		value = getattr(np, LANE_OPERATORS[op_code])(self.registers[left], right)
+		self.assign(self.registers, target, value)
+	run_ADD = run_binary
+	run_SUB = run_binary
+	run_MUL = run_binary
+	run_DIV = run_binary
+	run_AND = run_binary
+	run_OR = run_binary
+	run_XOR = run_binary
+
+	def run_NEG(self, op_code, source, target):
+		self.assign(self.registers, target, np.subtract(0, self.registers[source]))
+
+	def run_NOT(self, op_code, source, target):
+		self.assign(self.registers, target, np.bitwise_xor(1, self.registers[source]))
+
+	def run_CMP(self, op_code, op, left, right, target):
+		value = getattr(np, LANE_COMPARISONS[op])(self.registers[left], self.registers[right])
+		self.assign(self.registers, target, value)
+
+	def local(self, name):
+		if name not in self.locals:
+			raise RuntimeError(f'Variable global {name!r} no soportada en modo vectorial')
+		return name
+
+	def run_ALLOC(self, op_code, name):
+		self.assign(self.vars, self.local(name), np.zeros(1, dtype=LANE_DTYPES[op_code[-1]]))
+
+	def run_LOAD(self, op_code, name, target):
+		self.assign(self.registers, target, self.vars[self.local(name)])
+
+	def run_STORE(self, op_code, source, name):
+		self.assign(self.vars, self.local(name), self.registers[source])
+
+	def run_BRANCH(self, op_code, label):
+		self.successors.append((self.labels[label], self.mask))
+
+	def run_CBRANCH(self, op_code, test, t_label, f_label):
+		test = self.registers[test].astype(bool)
+		self.successors.append((self.labels[t_label], self.mask & test))
+		self.successors.append((self.labels[f_label], self.mask & ~test))
+
+	def run_RET(self, op_code, *value):
+		if value:
+			value = self.registers[value[0]]
+			if self.result is None:
+				self.result = np.zeros(self.size, dtype=value.dtype)
+			self.result = np.where(self.mask, value, self.result)
+
+def run_lanes(functions, name, *arguments):
+	'''
+	Ejecuta la función name (de una lista de ircode.Function) sobre los
+	arreglos de arguments y retorna el arreglo de resultados
+	'''
+	for function in functions:
+		if function.name == name:
+			return LaneExecutor(function)(*arguments)
+	raise KeyError(f'Funcion {name!r} no encontrada')
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	if len(sys.argv) != 4:
+		sys.stderr.write('Usage: python3 -m minic.lanes filename function inputs\n')
+		raise SystemExit(1)
+
+	if np is None:
+		sys.stderr.write('La ejecucion vectorial requiere NumPy\n')
+		raise SystemExit(1)
+
+	code = compile_ircode(open(sys.argv[1]).read())
+	if not errors_reported():
+		inputs = np.loadtxt(sys.argv[3], ndmin=2)
+		results = run_lanes(code, sys.argv[2], *inputs.T)
+		for value in results:
+			print(value)
+
+if __name__ == '__main__':
+	main()
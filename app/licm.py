@@ -0,0 +1,184 @@
+# minic/licm.py
+'''
+Movimiento de código invariante en ciclos
+=========================================
+
+visit_WhileStatement emite el cuerpo del ciclo tal como está, así que
+los LOAD y las operaciones que no cambian entre iteraciones (límites,
+pasos, a.size) se ejecutan en cada vuelta.  Este pase los saca a un
+bloque previo al ciclo (preheader) que se ejecuta una sola vez.
+
+Los ciclos se toman del CFG (ver cfg.py), de los más internos a los
+más externos.  El preheader queda justo antes del encabezado y recibe
+los saltos que llegan al ciclo desde afuera; el salto hacia atrás
+sigue yendo al encabezado.  Lo que se saca de un ciclo interno queda en
+el cuerpo del ciclo externo y puede salir también de él.
+
+Una instrucción es invariante si su registro se define una sola vez en
+la función y todos los registros que lee se definen fuera del ciclo o
+en instrucciones invariantes.  Se consideran:
+
+  * ADD, SUB, MUL, AND, OR, XOR, NEG, NOT, CMP y COPY.
+
+  * LOAD de una variable que el ciclo no escribe (STORE o ALLOC).  Si
+    el ciclo tiene un CALL, solo variables locales.
+
+  * DIV, ASIZE y ALOAD, que pueden fallar, solo desde el encabezado
+    (que siempre se ejecuta al entrar al ciclo) y si antes de ellas el
+    encabezado no hace nada visible.  Un ALOAD, además, solo si el
+    ciclo no tiene ASTORE ni CALL.
+
+  * MOV de una constante, solo si lo lee otra instrucción invariante:
+    repetir un MOV no cuesta más que leer un registro, y el intérprete
+    lo fusiona con quien lo usa (ver superinst.py).
+
+'''
+from collections import Counter
+
+from ircode import get_base_op_code, get_registers
+from cfg import ControlFlowGraph
+
+# Instrucciones sin efectos que no pueden fallar
+SAFE = {'NEG', 'NOT', 'ADD', 'SUB', 'MUL', 'AND', 'OR', 'XOR', 'CMP', 'COPY', 'MOV', 'LOAD'}
+
+# Instrucciones sin efectos que pueden fallar al ejecutarse
+TRAPPING = {'DIV', 'ASIZE', 'ALOAD'}
+
+class LoopInvariantMotion(object):
+	'''
+	Saca el código invariante de los ciclos de una ircode.Function
+	'''
+	def __init__(self, function):
+		self.function = function
+		self.graph = ControlFlowGraph(function)
+		self.graph.remove_unreachable()
+		self.locals = {pname for pname, _ in function.parameters} | {args[0]
+			for op_code, *args in function.code if op_code.startswith('ALLOC')}
+		self.hoisted = 0
+		self.loops = 0
+
+	def definitions(self):
+		counts = Counter()
+		for block in self.graph.blocks:
+			for inst in block.code:
+				counts.update(get_registers(inst)[0])
+		return counts
+
+	def invariants(self, header, body):
+		'''
+		Retorna las instrucciones invariantes del ciclo, en orden
+		'''
+		blocks = [block for block in self.graph.blocks if block in body]
+		code = [inst for block in blocks for inst in block.code]
+		definitions = self.definitions()
+
+		stored = set()
+		calls = astores = False
+		defined = set()
+		for inst in code:
+			op_code, *args = inst
+			base = get_base_op_code(op_code)
+			if base == 'STORE':
+				stored.add(args[1])
+			elif base == 'ALLOC':
+				stored.add(args[0])
+			elif base == 'CALL':
+				calls = True
+			elif base == 'ASTORE':
+				astores = True
+			defined.update(get_registers(inst)[0])
+
+		def memory_invariant(base, name):
+			if name in stored or (calls and name not in self.locals):
+				return False
+			return base != 'ALOAD' or not (calls or astores)
+
+		# Instrucciones del encabezado antes de la primera con efectos
+		guarded = set()
+		for inst in header.code:
+			base = get_base_op_code(inst[0])
+			if base not in SAFE and base not in TRAPPING:
+				break
+			guarded.add(id(inst))
+
+		chosen = set()
+		registers = set()
+		changed = True
+		while changed:
+			changed = False
+			for inst in code:
+				if id(inst) in chosen:
+					continue
+				op_code, *args = inst
+				base = get_base_op_code(op_code)
+				if base in TRAPPING and id(inst) not in guarded:
+					continue
+				if base not in SAFE and base not in TRAPPING:
+					continue
+				defs, uses = get_registers(inst)
+				if any(definitions[reg] != 1 for reg in defs):
+					continue
+				if any(reg in defined and reg not in registers for reg in uses):
+					continue
+				if base in ('LOAD', 'ASIZE', 'ALOAD') and not memory_invariant(base, args[0]):
+					continue
+				chosen.add(id(inst))
+				registers.update(defs)
+				changed = True
+
+		hoisted = [inst for inst in code if id(inst) in chosen]
+		used = {reg for inst in hoisted for reg in get_registers(inst)[1]}
+		return [inst for inst in hoisted if get_base_op_code(inst[0]) != 'MOV' or inst[-1] in used]
+
+	def preheader(self, header, body):
+		'''
+		Crea el preheader del ciclo y le manda los saltos que llegan al
+		encabezado desde afuera
+		'''
+		index = self.graph.blocks.index(header)
+		previous = self.graph.blocks[index - 1] if index else None
+		if previous in body and previous.fallthrough is header:
+			previous.code.append(('BRANCH', header.label))
+
+		block = self.graph.insert_block_before(header)
+		for pred in header.preds:
+			if pred in body or pred is block:
+				continue
+			term = pred.terminator()
+			if term:
+				pred.code[-1] = tuple(block.label if arg == header.label else arg for arg in term)
+		self.graph.link()
+		return block
+
+	def hoist(self, header, body):
+		hoisted = self.invariants(header, body)
+		if not hoisted:
+			return
+		moved = {id(inst) for inst in hoisted}
+		for block in body:
+			block.code = [inst for inst in block.code if id(inst) not in moved]
+		self.preheader(header, body).code.extend(hoisted)
+		self.hoisted += len(hoisted)
+		self.loops += 1
+
+	def run(self):
+		done = set()
+		while True:
+			pending = [(header, body) for header, body in self.graph.loops()
+				if header.label not in done]
+			if not pending:
+				break
+			header, body = pending[0]
+			done.add(header.label)
+			self.hoist(header, body)
+		if self.hoisted:
+			self.graph.update_function()
+		return self.hoisted, self.loops
+
+def hoist_invariants(function):
+	'''
+	Saca el código invariante de los ciclos de function.  Retorna
+	cuántas instrucciones se movieron y de cuántos ciclos.
+	'''
+	hoisted, loops = LoopInvariantMotion(function).run()
+	return {'hoisted': hoisted, 'loops': loops}
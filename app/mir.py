@@ -0,0 +1,236 @@
+# minic/mir.py
+'''
+Formato binario .mir
+====================
+
+Guarda en disco un programa ya compilado (la lista de ircode.Function,
+en la forma de irencode.py) para ejecutarlo sin volver a analizar,
+revisar ni generar código.  Todos los enteros van en little-endian.
+
+	encabezado            HEADER: magia b'MIR\\0', versión, cantidad de
+	                      opcodes y CRC-32 de sus nombres (deben
+	                      coincidir con irencode.OPCODES), cantidad y
+	                      posición de cada sección
+	tabla de funciones    por función FUNCTION (nombre, tipo de retorno,
+	                      registros, rango de instrucciones, cantidad
+	                      de parámetros) y un PARAMETER por parámetro
+	constantes            por constante un byte de tipo ('i' entero de
+	                      64 bits, 'n' entero grande, 'f' float, 'b'
+	                      bool) y su valor
+	nombres y rotulos     por string su largo (u32) y sus bytes UTF-8
+	instrucciones         el array('i') de irencode.py, alineado a 4
+
+load_mir() abre el archivo con mmap: las tablas se leen (son pequeñas)
+y el arreglo de instrucciones es una vista (memoryview) sobre el mismo
+mmap, sin copiarlo ni recorrerlo.  El resultado es un
+irencode.EncodedProgram que cualquier intérprete ejecuta directamente.
+
+    bash % python3 -m minic.mir [--no-optimize] [--output=file.mir] someprogram.c
+    bash % python3 -m minic.mir someprogram.mir
+
+El segundo comando ejecuta el programa.  python3 -m minic.interp también
+acepta un archivo .mir, con todas sus opciones.
+
+'''
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+
+from irencode import OPCODES, EncodedFunction, EncodedProgram, encode
+
+MAGIC = b'MIR\0'
+VERSION = 2
+
+# Un archivo solo se puede ejecutar con la misma tabla de opcodes con
+# la que se escribió: si se agrega, quita, renombra o reordena un
+# opcode, cambia la suma
+OPCODES_CHECKSUM = zlib.crc32(' '.join(OPCODES).encode('ascii'))
+
+# magia, versión, opcodes, suma de la tabla de opcodes y (cantidad,
+# posición) de funciones, constantes, nombres, rotulos e instrucciones
+HEADER = struct.Struct('<4sHHI10I')
+FUNCTION = struct.Struct('<IcxxxIIIH')
+PARAMETER = struct.Struct('<Ic')
+LENGTH = struct.Struct('<I')
+INTEGER = struct.Struct('<q')
+FLOAT = struct.Struct('<d')
+
+def pack_constant(value):
+	if isinstance(value, bool):
+		return b'b' + bytes([value])
+	if isinstance(value, float):
+		return b'f' + FLOAT.pack(value)
+	if -2**63 <= value < 2**63:
+		return b'i' + INTEGER.pack(value)
+	data = value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+	return b'n' + LENGTH.pack(len(data)) + data
+
+def pack_string(text):
+	data = text.encode('utf-8')
+	return LENGTH.pack(len(data)) + data
+
+def dump_mir(functions):
+	'''
+	Retorna los bytes del archivo .mir de una lista de ircode.Function
+	(o de un EncodedProgram)
+	'''
+	program = functions if isinstance(functions, EncodedProgram) else encode(functions)
+	names = list(program.names)
+	name_index = {name: n for n, name in enumerate(names)}
+	for function in program.functions:
+		for name in [function.name] + [pname for pname, _ in function.parameters]:
+			if name not in name_index:
+				name_index[name] = len(names)
+				names.append(name)
+
+	sections = [ ]
+	table = bytearray()
+	for function in program.functions:
+		table += FUNCTION.pack(name_index[function.name], function.return_type.encode('ascii'),
+			function.register_count, function.start, function.end, len(function.parameters))
+		for pname, ptype in function.parameters:
+			table += PARAMETER.pack(name_index[pname], ptype.encode('ascii'))
+	sections.append((len(program.functions), table))
+	sections.append((len(program.constants), b''.join(pack_constant(value) for value in program.constants)))
+	sections.append((len(names), b''.join(pack_string(name) for name in names)))
+	sections.append((len(program.labels), b''.join(pack_string(label) for label in program.labels)))
+
+	code = array('i', program.code)
+	if sys.byteorder == 'big':
+		code.byteswap()
+	sections.append((len(code), code.tobytes()))
+
+	# Cada sección empieza alineada a 4 bytes
+	offsets = [ ]
+	body = bytearray()
+	position = HEADER.size
+	for _, data in sections:
+		padding = -(position + len(body)) % 4
+		body += bytes(padding)
+		offsets.append(position + len(body))
+		body += data
+	fields = [value for (count, _), offset in zip(sections, offsets) for value in (count, offset)]
+	return HEADER.pack(MAGIC, VERSION, len(OPCODES), OPCODES_CHECKSUM, *fields) + bytes(body)
+
+def write_mir(functions, path):
+	'''
+	Escribe el archivo .mir de una lista de ircode.Function
+	'''
+	with open(path, 'wb') as file:
+		file.write(dump_mir(functions))
+
+def read_strings(data, offset, count):
+	strings = [ ]
+	for _ in range(count):
+		size, = LENGTH.unpack_from(data, offset)
+		offset += LENGTH.size
+		strings.append(bytes(data[offset:offset+size]).decode('utf-8'))
+		offset += size
+	return strings
+
+def read_constants(data, offset, count):
+	constants = [ ]
+	for _ in range(count):
+		tag = bytes(data[offset:offset+1])
+		offset += 1
+		if tag == b'i':
+			value, = INTEGER.unpack_from(data, offset)
+			offset += INTEGER.size
+		elif tag == b'f':
+			value, = FLOAT.unpack_from(data, offset)
+			offset += FLOAT.size
+		elif tag == b'b':
+			value = bool(data[offset])
+			offset += 1
+		elif tag == b'n':
+			size, = LENGTH.unpack_from(data, offset)
+			offset += LENGTH.size
+			value = int.from_bytes(data[offset:offset+size], 'little', signed=True)
+			offset += size
+		else:
+			raise ValueError(f'Constante con tipo desconocido {tag!r}')
+		constants.append(value)
+	return constants
+
+def parse_mir(data):
+	'''
+	Construye un EncodedProgram sobre data (bytes, mmap o memoryview).
+	Las instrucciones no se copian si el orden de bytes es el nativo.
+	'''
+	if len(data) < HEADER.size:
+		raise ValueError('Archivo .mir truncado')
+	magic, version, opcode_count, checksum, *fields = HEADER.unpack_from(data, 0)
+	if magic != MAGIC:
+		raise ValueError('No es un archivo .mir')
+	if version != VERSION:
+		raise ValueError(f'Archivo .mir de otra version ({version})')
+	if opcode_count != len(OPCODES) or checksum != OPCODES_CHECKSUM:
+		raise ValueError(f'Archivo .mir con otra tabla de opcodes ({opcode_count} opcodes, suma {checksum:08x})')
+	(function_count, function_offset, constant_count, constant_offset, name_count, name_offset,
+		label_count, label_offset, code_count, code_offset) = fields
+
+	view = memoryview(data)
+	code = view[code_offset:code_offset + 4 * code_count]
+	if sys.byteorder == 'big':
+		code = array('i', code.tobytes())
+		code.byteswap()
+	else:
+		code = code.cast('i')
+
+	names = read_strings(view, name_offset, name_count)
+	program = EncodedProgram(code, read_constants(view, constant_offset, constant_count),
+		names, read_strings(view, label_offset, label_count))
+
+	offset = function_offset
+	for _ in range(function_count):
+		name, return_type, register_count, start, end, param_count = FUNCTION.unpack_from(view, offset)
+		offset += FUNCTION.size
+		parameters = [ ]
+		for _ in range(param_count):
+			pname, ptype = PARAMETER.unpack_from(view, offset)
+			offset += PARAMETER.size
+			parameters.append((names[pname], ptype.decode('ascii')))
+		program.functions.append(EncodedFunction(program, names[name], parameters,
+			return_type.decode('ascii'), register_count, start, end))
+	return program
+
+def load_mir(path):
+	'''
+	Abre un archivo .mir con mmap y retorna su EncodedProgram
+	'''
+	with open(path, 'rb') as file:
+		data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+	program = parse_mir(data)
+	program.mmap = data
+	return program
+
+def main():
+	from errores import errors_reported
+
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write('Usage: python3 -m minic.mir [--no-optimize] [--output=file.mir] filename.c\n'
+			'       python3 -m minic.mir filename.mir\n')
+		raise SystemExit(1)
+
+	if args[0].endswith('.mir'):
+		from interp import Interpreter, RECURSION_LIMIT
+		sys.setrecursionlimit(RECURSION_LIMIT)
+		Interpreter().execute(load_mir(args[0]))
+		return
+
+	from ircode import compile_ircode
+	output = args[0].rsplit('.', 1)[0] + '.mir'
+	for arg in sys.argv[1:]:
+		if arg.startswith('--output='):
+			output = arg[len('--output='):]
+
+	code = compile_ircode(open(args[0]).read(), optimize='--no-optimize' not in sys.argv)
+	if not errors_reported():
+		write_mir(code, output)
+		print(f'{output}: {len(code)} funciones')
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,114 @@
+# minic/optimize.py
+'''
+Optimizador
+===========
+
+Aplica una secuencia de pases de optimización a la lista de
+ircode.Function que produce GenerateCode.  Cada pase es una función que
+recibe una ircode.Function, la modifica en su lugar y retorna un
+diccionario con sus estadísticas.  Los pases de PROGRAM_PASSES (como
+inline) reciben en cambio la lista completa de funciones.
+
+compile_ircode() aplica DEFAULT_PASSES a menos que se llame con
+optimize=False (en la línea de comandos, --no-optimize).
+
+Para ver el código optimizado y lo que hizo cada pase utiliza:
+
+    bash % python3 -m minic.optimize [--passes=constfold,deadcode,...] someprogram.c
+
+'''
+from collections import Counter
+
+from constfold import fold_constants
+from deadcode import eliminate_dead_code
+from valnum import number_values
+from licm import hoist_invariants
+from peephole import optimize_peephole
+from regalloc import allocate_registers
+from inline import format_decisions, inline_functions
+
+# Pases disponibles, por nombre
+PASSES = {
+	'constfold': fold_constants,
+	'valnum': number_values,
+	'licm': hoist_invariants,
+	'peephole': optimize_peephole,
+	'regalloc': allocate_registers,
+	'deadcode': eliminate_dead_code,
+}
+
+# Pases que trabajan sobre el programa completo
+PROGRAM_PASSES = {
+	'inline': inline_functions,
+}
+
+# Pases que aplica compile_ircode(), en orden.  valnum queda fuera: al
+# reutilizar registros impide que el intérprete fusione superinstrucciones
+# y el ciclo típico termina más lento.  regalloc va al final: los demás
+# pases solo tratan los registros que se definen una sola vez, y reducir
+# el banco de registros achica cada frame sin cambiar el tiempo de
+# ejecución.  inline queda fuera: acelera al intérprete, pero alarga el
+# ciclo de despacho del código compilado y --tier=tiered se vuelve más
+# lento.  Si se usa, debe ir primero para que los demás pases vean el
+# cuerpo expandido.
+DEFAULT_PASSES = ['constfold', 'licm', 'deadcode', 'peephole', 'regalloc']
+
+def optimize_program(functions, passes=None):
+	'''
+	Aplica los pases (nombres de PASSES o PROGRAM_PASSES) a cada
+	función.  Retorna las estadísticas totales de cada pase.
+	'''
+	report = { }
+	for name in passes or DEFAULT_PASSES:
+		if name in PROGRAM_PASSES:
+			report[name] = PROGRAM_PASSES[name](functions)
+			continue
+		stats = Counter()
+		for function in functions:
+			stats.update(PASSES[name](function))
+		report[name] = dict(stats)
+	return report
+
+def format_report(report):
+	'''
+	Retorna el reporte de optimize_program como texto
+	'''
+	lines = [ ]
+	for name, stats in report.items():
+		items = ', '.join(f'{key}={value}' for key, value in stats.items() if key != 'decisions')
+		lines.append(f'{name:<12} {items}')
+		# Las decisiones de inline, una por llamada
+		if 'decisions' in stats:
+			lines.extend(f'    {line}' for line in format_decisions(stats['decisions']).splitlines())
+	return '\n'.join(lines)
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write('Usage: python3 -m minic.optimize [--passes=name,...] filename\n')
+		raise SystemExit(1)
+
+	passes = None
+	for arg in sys.argv[1:]:
+		if arg.startswith('--passes='):
+			passes = arg[len('--passes='):].split(',')
+
+	code = compile_ircode(open(args[0]).read(), optimize=False)
+	if not errors_reported():
+		before = sum(len(function.code) for function in code)
+		report = optimize_program(code, passes)
+		after = sum(len(function.code) for function in code)
+		for function in code:
+			print(f'{"::"*5} {function} {"::"*5}')
+			for inst in function.code:
+				print(inst)
+			print()
+		print(format_report(report))
+		print(f'instrucciones: {before} -> {after}')
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,141 @@
+# minic/output.py
+'''
+Salida de los programas
+=======================
+
+Las instrucciones PRINTI/PRINTF/PRINTB no escriben directamente en
+sys.stdout: escriben a través de un "sink" configurable.  Todos los
+sinks tienen la misma interfaz:
+
+	sink.write(text)     agrega texto a la salida
+	sink.flush()         entrega el texto pendiente
+
+Hay tres sinks:
+
+  * BufferedSink: acumula el texto en memoria y lo escribe en un
+    stream (sys.stdout por defecto) cuando el buffer se llena o al
+    llamar flush().
+
+  * FileDescriptorSink: igual, pero escribe bytes directamente en un
+    descriptor de archivo con os.write().
+
+  * CaptureSink: guarda toda la salida en memoria, útil para pruebas
+    y servicios.  getvalue() retorna el texto capturado.
+
+El intérprete llama flush() una sola vez al terminar la ejecución.
+
+Para el intérprete asíncrono hay además AsyncSink y AsyncStreamSink, 
+que entregan la salida con una corrutina drain().
+'''
+import os
+import sys
+
+# Tamaño por defecto del buffer, en caracteres
+BUFFER_SIZE = 8192
+
+class BufferedSink(object):
+	'''
+	Acumula la salida y la escribe en stream en bloques de al menos
+	buffer_size caracteres.
+	'''
+	def __init__(self, stream=None, buffer_size=BUFFER_SIZE):
+		self.stream = stream
+		self.buffer_size = buffer_size
+		self.buffer = []
+		self.pending = 0
+
+	def write(self, text):
+		self.buffer.append(text)
+		self.pending += len(text)
+		if self.pending >= self.buffer_size:
+			self.flush()
+
+	def flush(self):
+		if self.buffer:
+			self.emit(''.join(self.buffer))
+			self.buffer.clear()
+			self.pending = 0
+
+	def emit(self, text):
+		stream = self.stream or sys.stdout
+		stream.write(text)
+		stream.flush()
+
+class FileDescriptorSink(BufferedSink):
+	'''
+	Escribe la salida en el descriptor de archivo fd.
+	'''
+	def __init__(self, fd, buffer_size=BUFFER_SIZE, encoding='utf-8'):
+		super().__init__(None, buffer_size)
+		self.fd = fd
+		self.encoding = encoding
+
+	def emit(self, text):
+		data = text.encode(self.encoding)
+		while data:
+			written = os.write(self.fd, data)
+			data = data[written:]
+
+class CaptureSink(object):
+	'''
+	Captura toda la salida en memoria.
+	'''
+	def __init__(self):
+		self.buffer = []
+
+	def write(self, text):
+		self.buffer.append(text)
+
+	def flush(self):
+		pass
+
+	def getvalue(self):
+		return ''.join(self.buffer)
+
+class AsyncSink(object):
+	'''
+	Sink para el intérprete asíncrono (ver aiointerp.py).  write() solo 
+	acumula; el intérprete llama await drain() cada vez que cede el 
+	control al event loop y al terminar.  drain() entrega el texto 
+	pendiente a la corrutina emit(text) dada, o lo guarda en memoria si 
+	no se dio ninguna.
+	'''
+	def __init__(self, emit=None):
+		self.buffer = []
+		self.callback = emit
+		self.captured = []
+
+	def write(self, text):
+		self.buffer.append(text)
+
+	def flush(self):
+		pass
+
+	async def drain(self):
+		if self.buffer:
+			text = ''.join(self.buffer)
+			self.buffer.clear()
+			await self.emit(text)
+
+	async def emit(self, text):
+		if self.callback:
+			await self.callback(text)
+		else:
+			self.captured.append(text)
+
+	def getvalue(self):
+		return ''.join(self.captured)
+
+class AsyncStreamSink(AsyncSink):
+	'''
+	Entrega la salida a un asyncio.StreamWriter (por ejemplo, la 
+	conexión de un cliente), respetando su control de flujo.
+	'''
+	def __init__(self, writer, encoding='utf-8'):
+		super().__init__()
+		self.writer = writer
+		self.encoding = encoding
+
+	async def emit(self, text):
+		self.writer.write(text.encode(self.encoding))
+		await self.writer.drain()
@@ -0,0 +1,198 @@
+# minic/peephole.py
+'''
+Optimizador de mirilla (peephole)
+=================================
+
+Recorre la lista de instrucciones de cada función buscando secuencias
+cortas que se pueden escribir mejor, según una tabla de reglas
+patrón -> reemplazo.  Las reglas se aplican hasta llegar a un punto
+fijo: un reemplazo puede dejar a la vista otra secuencia.
+
+Reglas de RULES, en orden:
+
+	branch-next   BRANCH L / LABEL L         ->  LABEL L
+	store-load    STORE r, x / LOAD x, s     ->  STORE r, x  (s pasa a ser r)
+	neg           MOV 0, a / SUB a, b, c     ->  NEG b, c
+	not           MOV 1, a / XOR a, b, c     ->  NOT b, c
+	add-zero      MOV 0, a / ADDI b, a, c    ->  (c pasa a ser b)
+
+neg y not son las secuencias que emite visit_UnaryOp para -x y !x.  NEG
+calcula 0 - x (y no -x, que con 0.0 da -0.0).  add-zero solo se aplica
+a enteros: -0.0 + 0 es 0.0.
+
+Cada regla es una función que recibe la ventana de instrucciones que
+empieza en la posición actual y un objeto PeepholeInfo con las
+definiciones y lecturas de cada registro en la función.  Retorna None,
+o una tupla (instrucciones consumidas, reemplazo, renombres), donde
+renombres es un diccionario de registros cuyos usos deben pasar a leer
+otro registro.  Para que renombrar sea correcto, ambos registros deben
+definirse una sola vez en la función.
+
+Para ver el código y lo que hizo cada regla utiliza:
+
+    bash % python3 -m minic.peephole [--rules=neg,not,...] someprogram.c
+
+'''
+from collections import Counter
+
+from ircode import get_base_op_code, get_registers
+from cfg import replace_uses
+
+class PeepholeInfo(object):
+	'''
+	Definiciones y lecturas de cada registro en el código
+	'''
+	def __init__(self, code):
+		self.defs = Counter()
+		self.uses = Counter()
+		for inst in code:
+			defs, uses = get_registers(inst)
+			self.defs.update(defs)
+			self.uses.update(uses)
+
+	def single(self, *registers):
+		'''
+		True si cada registro se define una sola vez
+		'''
+		return all(self.defs[reg] == 1 for reg in registers)
+
+	def temporary(self, register):
+		'''
+		True si el registro se define y se lee una sola vez
+		'''
+		return self.defs[register] == 1 and self.uses[register] == 1
+
+def branch_next(window, info):
+	if len(window) >= 2 and window[0][0] == 'BRANCH' and window[1] == ('LABEL', window[0][1]):
+		return 2, [window[1]], { }
+
+def store_load(window, info):
+	if len(window) < 2:
+		return None
+	store, load = window[:2]
+	if not (get_base_op_code(store[0]) == 'STORE' and get_base_op_code(load[0]) == 'LOAD'):
+		return None
+	if store[0][-1] != load[0][-1] or store[2] != load[1] or not info.single(store[1], load[2]):
+		return None
+	return 2, [store], {load[2]: store[1]}
+
+def is_constant(inst, value):
+	return (get_base_op_code(inst[0]) == 'MOV' and not isinstance(inst[1], bool)
+		and inst[1] == value)
+
+def negate(window, info):
+	if len(window) < 2:
+		return None
+	mov, sub = window[:2]
+	if not (is_constant(mov, 0) and get_base_op_code(sub[0]) == 'SUB'):
+		return None
+	if sub[1] != mov[2] or sub[2] == mov[2] or not info.temporary(mov[2]):
+		return None
+	return 2, [(f'NEG{sub[0][-1]}', sub[2], sub[3])], { }
+
+def logical_not(window, info):
+	if len(window) < 2:
+		return None
+	mov, xor = window[:2]
+	if not (is_constant(mov, 1) and xor[0] == 'XOR'):
+		return None
+	if xor[1] != mov[2] or xor[2] == mov[2] or not info.temporary(mov[2]):
+		return None
+	return 2, [('NOT', xor[2], xor[3])], { }
+
+def add_zero(window, info):
+	if len(window) < 2:
+		return None
+	mov, add = window[:2]
+	if not (mov[0] == 'MOVI' and is_constant(mov, 0) and add[0] == 'ADDI'):
+		return None
+	if not info.temporary(mov[2]):
+		return None
+	if add[1] == mov[2]:
+		other = add[2]
+	elif add[2] == mov[2]:
+		other = add[1]
+	else:
+		return None
+	if other == mov[2] or not info.single(other, add[3]):
+		return None
+	return 2, [ ], {add[3]: other}
+
+# Tabla de reglas, en orden de prioridad
+RULES = {
+	'branch-next': branch_next,
+	'store-load': store_load,
+	'neg': negate,
+	'not': logical_not,
+	'add-zero': add_zero,
+}
+
+def peephole_pass(code, rules):
+	'''
+	Una pasada sobre el código.  Retorna el nuevo código y cuántas
+	instrucciones eliminó cada regla.
+	'''
+	info = PeepholeInfo(code)
+	removed = Counter()
+	renames = { }
+	new_code = [ ]
+	n = 0
+	while n < len(code):
+		window = [replace_uses(inst, renames) for inst in code[n:n+4]]
+		for name in rules:
+			match = RULES[name](window, info)
+			if match:
+				consumed, replacement, rename = match
+				new_code.extend(replacement)
+				renames.update(rename)
+				removed[name] += consumed - len(replacement)
+				n += consumed
+				break
+		else:
+			new_code.append(window[0])
+			n += 1
+	return [replace_uses(inst, renames) for inst in new_code], removed
+
+def optimize_peephole(function, rules=None):
+	'''
+	Aplica las reglas (nombres de RULES) a function hasta que no cambie.
+	Retorna cuántas instrucciones eliminó cada regla.
+	'''
+	rules = rules or list(RULES)
+	removed = Counter()
+	while True:
+		function.code, pass_removed = peephole_pass(function.code, rules)
+		if not pass_removed:
+			break
+		removed.update(pass_removed)
+	return {name: removed[name] for name in rules}
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write('Usage: python3 -m minic.peephole [--rules=name,...] filename\n')
+		raise SystemExit(1)
+
+	rules = None
+	for arg in sys.argv[1:]:
+		if arg.startswith('--rules='):
+			rules = arg[len('--rules='):].split(',')
+
+	code = compile_ircode(open(args[0]).read())
+	if not errors_reported():
+		removed = Counter()
+		for function in code:
+			removed.update(optimize_peephole(function, rules))
+			print(f'{"::"*5} {function} {"::"*5}')
+			for inst in function.code:
+				print(inst)
+			print()
+		for name, count in removed.items():
+			print(f'{name:<12} {count}')
+
+if __name__ == '__main__':
+	main()
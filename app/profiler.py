@@ -0,0 +1,166 @@
+# minic/profiler.py
+'''
+Perfil de ejecución
+===================
+
+ProfilingInterpreter es un Interpreter que reemplaza el ciclo de
+ejecución (run) y las llamadas (call) por versiones que miden:
+
+  * Por opcode: cuántas veces se ejecutó y el tiempo acumulado de su
+    handler.  El tiempo de CALL incluye el de la función invocada.
+
+  * Por función: número de llamadas, tiempo inclusivo (con las
+    funciones que invoca) y exclusivo (sin ellas).
+
+  * Por bloque básico: cuántas veces se entró a cada rotulo.  El bloque
+    de entrada de cada función aparece como '<entrada>'.
+
+El intérprete normal no cambia: su ciclo no paga nada por el perfil.
+Con límites de ejecución (ver Interpreter.execute) el perfil se toma
+igual, con run_metered en lugar de run.
+El resultado se obtiene como texto con report() o como un diccionario
+serializable a JSON con as_dict().
+
+    bash % python3 -m minic.interp --profile someprogram.c
+    bash % python3 -m minic.interp --profile-json=perfil.json someprogram.c
+
+'''
+from collections import defaultdict
+from time import perf_counter
+
+from interp import Interpreter
+
+ENTRY_BLOCK = '<entrada>'
+
+class FunctionStats(object):
+	'''
+	Estadísticas de una función
+	'''
+	def __init__(self):
+		self.calls = 0
+		self.inclusive = 0.0
+		self.exclusive = 0.0
+
+		# Llamadas activas, para no contar dos veces el tiempo inclusivo
+		# de una función recursiva
+		self.active = 0
+
+class ProfilingInterpreter(Interpreter):
+	'''
+	Intérprete que registra un perfil de la ejecución.
+	'''
+	def __init__(self, **kwargs):
+		super().__init__(**kwargs)
+		self.function_stats = defaultdict(FunctionStats)
+
+		# Ejecuciones y tiempo por posición del programa de cada función
+		self.pc_counts = { }
+		self.pc_times = { }
+
+		# Tiempo de las funciones invocadas desde la llamada en curso
+		self.child_times = [ ]
+
+	def load(self, functions):
+		super().load(functions)
+		for function in self.functions.values():
+			self.pc_counts[function.name] = [0] * len(function.program)
+			self.pc_times[function.name] = [0.0] * len(function.program)
+
+	def call(self, function, arguments):
+		stats = self.function_stats[function.name]
+		stats.calls += 1
+		stats.active += 1
+		self.child_times.append(0.0)
+		start = perf_counter()
+		try:
+			return super().call(function, arguments)
+		finally:
+			elapsed = perf_counter() - start
+			stats.active -= 1
+			if not stats.active:
+				stats.inclusive += elapsed
+			stats.exclusive += elapsed - self.child_times.pop()
+			if self.child_times:
+				self.child_times[-1] += elapsed
+
+	def run(self, program):
+		counts = self.pc_counts[self.function.name]
+		times = self.pc_times[self.function.name]
+		clock = perf_counter
+		pc = 0
+		end = len(program)
+		while pc < end:
+			handler, args = program[pc]
+			start = clock()
+			target = handler(*args)
+			times[pc] += clock() - start
+			counts[pc] += 1
+			pc = pc + 1 if target is None else target
+
+	def run_metered(self, program):
+		# El ciclo de run con la cuenta de combustible de
+		# Interpreter.run_metered
+		counts = self.pc_counts[self.function.name]
+		times = self.pc_times[self.function.name]
+		clock = perf_counter
+		pc = block = 0
+		end = len(program)
+		while pc < end:
+			handler, args = program[pc]
+			start = clock()
+			target = handler(*args)
+			times[pc] += clock() - start
+			counts[pc] += 1
+			pc += 1
+			if target is not None:
+				self.fuel -= pc - block
+				if self.fuel <= 0:
+					self.check_limits()
+				pc = block = target
+		self.fuel -= pc - block
+
+	def as_dict(self):
+		'''
+		Retorna el perfil como un diccionario (serializable a JSON)
+		'''
+		opcodes = defaultdict(lambda: {'count': 0, 'time': 0.0})
+		blocks = { }
+		for name, function in self.functions.items():
+			counts = self.pc_counts[name]
+			times = self.pc_times[name]
+			for pc, op_code in enumerate(function.opcodes):
+				opcodes[op_code]['count'] += counts[pc]
+				opcodes[op_code]['time'] += times[pc]
+
+			hits = { }
+			if counts:
+				hits[ENTRY_BLOCK] = counts[0]
+			for pc, label in function.labels.items():
+				if pc < len(counts):
+					hits[label] = counts[pc]
+			blocks[name] = hits
+
+		functions = {name: {'calls': stats.calls, 'inclusive': stats.inclusive, 'exclusive': stats.exclusive}
+			for name, stats in self.function_stats.items()}
+		return {'opcodes': dict(opcodes), 'functions': functions, 'blocks': blocks}
+
+	def report(self):
+		'''
+		Retorna el perfil como texto
+		'''
+		profile = self.as_dict()
+		total = sum(op['time'] for op in profile['opcodes'].values()) or 1.0
+
+		lines = ['Opcodes', f'{"opcode":<12} {"cuenta":>12} {"tiempo (ms)":>12} {"%":>7}']
+		for op_code, op in sorted(profile['opcodes'].items(), key=lambda item: -item[1]['time']):
+			lines.append(f'{op_code:<12} {op["count"]:>12} {1000 * op["time"]:>12.3f} {100 * op["time"] / total:>6.2f}%')
+
+		lines += ['', 'Funciones', f'{"funcion":<20} {"llamadas":>10} {"inclusivo (ms)":>15} {"exclusivo (ms)":>15}']
+		for name, stats in sorted(profile['functions'].items(), key=lambda item: -item[1]['exclusive']):
+			lines.append(f'{name:<20} {stats["calls"]:>10} {1000 * stats["inclusive"]:>15.3f} {1000 * stats["exclusive"]:>15.3f}')
+
+		lines += ['', 'Bloques', f'{"funcion":<20} {"rotulo":<10} {"entradas":>12}']
+		for name, hits in profile['blocks'].items():
+			for label, count in hits.items():
+				lines.append(f'{name:<20} {label:<10} {count:>12}')
+		return '\n'.join(lines)
@@ -0,0 +1,543 @@
+# minic/pycompile.py
+'''
+Compilador de IR a Python
+=========================
+
+Traduce cada ircode.Function a código fuente Python y lo compila con
+compile()/exec() en una función real.  Los registros y las variables
+locales se vuelven variables locales de Python, las globales viven en la
+lista G (compartida con el intérprete) y las llamadas son llamadas de
+Python, así el programa corre a la velocidad del bytecode de CPython en
+vez de pasar por Interpreter.run_* en cada instrucción.
+
+Si la función no tiene rotulos se genera código lineal.  Si los tiene,
+se arma su CFG (ver cfg.py) y se escribe con if/else y while True: cada
+ciclo natural es un while True que empieza en su encabezado, el salto
+hacia atrás es un continue y la salida del ciclo un break.
+
+	while True:
+		R1 = v_i
+		...
+		if R1:
+			...
+			continue
+		else:
+			break
+
+Un salto no cuesta más que una comparación, sin importar cuántos
+bloques tenga la función.  El código de MiniC siempre se puede escribir
+así; si un CFG no (por ejemplo IR escrito a mano con un ciclo de dos
+entradas), cada bloque se vuelve una función anidada que retorna el
+número del bloque siguiente y un ciclo de despacho las llama:
+
+	blocks = (b0, b1, ...)
+	pc = 0
+	while pc is not None:
+		pc = blocks[pc]()
+
+Para ver el código Python generado utiliza:
+
+    bash % python3 -m minic.pycompile someprogram.c
+
+También se puede generar una entrada "on stack replacement" (OSR) que
+empieza a ejecutar la función en un rotulo dado, con el estado de los
+registros y variables locales que tenía el intérprete en ese punto (ver
+tiered.py).
+
+'''
+from ircode import get_base_op_code, get_registers, register_index
+from cfg import ControlFlowGraph
+from interp import new_array, bad_index
+from output import BufferedSink
+
+BINARY_OPERATORS = {
+	'ADDI': '+', 'ADDF': '+',
+	'SUBI': '-', 'SUBF': '-',
+	'MULI': '*', 'MULF': '*',
+	'DIVI': '//', 'DIVF': '/',
+	'ANDI': '&',
+	'ORI': '|',
+	'XOR': '^',
+}
+
+def function_name(name):
+	'''
+	Nombre de la función Python que implementa la función MiniC name
+	'''
+	return f'f_{name}'
+
+def var_name(name):
+	'''
+	Nombre de la variable Python para la variable local MiniC name
+	'''
+	return f'v_{name}'
+
+def osr_name(name, label):
+	'''
+	Nombre de la entrada OSR de la función MiniC name en el rotulo label
+	'''
+	return f'osr_{name}_{label}'
+
+class UnstructuredFlow(Exception):
+	'''
+	El CFG de una función no se puede escribir con if/while de Python
+	(ver FunctionTranslator.structured)
+	'''
+
+class FunctionTranslator(object):
+	'''
+	Genera el código fuente Python de una ircode.Function.  global_slots
+	da la posición de cada variable global dentro de la lista G.
+	'''
+	def __init__(self, function, global_slots):
+		self.function = function
+		self.global_slots = global_slots
+
+		# Variables locales: parámetros y ALLOC
+		self.locals = {pname for pname, _ in function.parameters}
+		for op_code, *args in function.code:
+			if op_code.startswith('ALLOC'):
+				self.locals.add(args[0])
+
+		self.lines = []
+		self.indent = 1
+		self.in_blocks = False
+
+	def emit(self, line):
+		self.lines.append('\t' * self.indent + line)
+
+	def capture(self, emit, *args):
+		'''
+		Llama a emit(*args) un nivel más adentro y retorna las líneas que
+		generó, sin agregarlas
+		'''
+		lines, self.lines = self.lines, []
+		self.indent += 1
+		try:
+			emit(*args)
+			return self.lines
+		finally:
+			self.indent -= 1
+			self.lines = lines
+
+	def variable(self, name):
+		if name in self.locals:
+			return var_name(name)
+		return f'G[{self.global_slots[name]}]'
+
+	def translate(self, entry=None, local_slots=None):
+		'''
+		Retorna el código fuente de la función.  Si se da el rotulo entry,
+		genera en su lugar una entrada OSR osr_name(R, V) que carga los
+		registros desde la lista R, las variables locales desde la lista
+		V (con las posiciones de local_slots) y empieza en ese rotulo.
+		'''
+		func = self.function
+		if entry is None:
+			params = [var_name(pname) for pname, _ in func.parameters]
+			self.lines.append(f'def {function_name(func.name)}({", ".join(params)}):')
+			bound = set(params)
+		else:
+			self.lines.append(f'def {osr_name(func.name, entry)}(R, V):')
+			registers = set()
+			for inst in func.code:
+				for regs in get_registers(inst):
+					registers.update(regs)
+			for register in sorted(registers, key=register_index):
+				self.emit(f'{register} = R[{register_index(register)}]')
+			for name, slot in local_slots.items():
+				self.emit(f'{var_name(name)} = V[{slot}]')
+			bound = registers | {var_name(name) for name in local_slots}
+
+		if entry is None and not any(inst[0] == 'LABEL' for inst in func.code):
+			for inst in func.code:
+				self.translate_inst(inst)
+			self.emit('return None')
+			return '\n'.join(self.lines) + '\n'
+
+		graph = ControlFlowGraph(func)
+		if entry is not None:
+			# La entrada OSR pasa a ser la entrada del grafo.  Los sucesores
+			# ya están enlazados y no dependen del orden de los bloques.
+			block = graph.labels[entry]
+			graph.blocks.remove(block)
+			graph.blocks.insert(0, block)
+		lines = list(self.lines)
+		try:
+			self.structured(graph)
+		except UnstructuredFlow:
+			self.lines = lines
+			self.indent = 1
+			self.dispatched(graph, bound)
+		return '\n'.join(self.lines) + '\n'
+
+	# ------------------------------------------------------------------
+	# Código estructurado
+	# ------------------------------------------------------------------
+
+	def structured(self, graph):
+		'''
+		Genera la función con if/else y while True, sin ciclo de despacho.
+		Cada ciclo natural es un while True cuyo encabezado va al inicio;
+		el salto hacia atrás es un continue y la salida un break.  Cada
+		CBRANCH es un if/else; si las dos ramas se juntan en un bloque (un
+		hijo del CBRANCH en el árbol de dominadores con dos o más
+		predecesores), ese bloque va a continuación del if.  Todo bloque
+		se genera una sola vez.  Si el grafo no es reducible, un ciclo
+		sale a más de un bloque o un salto no cae en ninguno de estos
+		casos, lanza UnstructuredFlow.
+		'''
+		idom = graph.dominators()
+		order = graph.postorder()
+		number = {block: n for n, block in enumerate(order)}
+		for block in order:
+			for succ in block.succs:
+				if number[succ] >= number[block] and not graph.dominates(succ, block, idom):
+					raise UnstructuredFlow(f'{succ.label} no domina a {block.label}')
+
+		self.children = graph.dominator_tree(idom)
+		self.forward_preds = {block: [pred for pred in block.preds
+			if pred in idom and not graph.dominates(block, pred, idom)] for block in idom}
+
+		# Cada ciclo con sus bloques y el bloque donde continúa al salir
+		self.loops = { }
+		for header, body in graph.loops(idom):
+			body = self.loop_body(header, body)
+			exits = {succ for block in body for succ in block.succs if succ not in body}
+			if len(exits) > 1:
+				raise UnstructuredFlow(f'El ciclo {header.label} sale a {len(exits)} bloques')
+			self.loops[header] = (body, exits.pop() if exits else None)
+
+		self.emitted = set()
+		self.emit_region(graph.entry, None, None)
+
+	def loop_body(self, header, body):
+		'''
+		Agrega al cuerpo de un ciclo natural los bloques que solo se
+		alcanzan desde el ciclo y que van a otra salida o terminan la
+		función: los de un break o un return dentro del ciclo.  Así la
+		salida que queda es el bloque que sigue al ciclo, normalmente la
+		del encabezado (la condición del while), que nunca se agrega.
+		'''
+		body = set(body)
+		while True:
+			exits = {succ for block in body for succ in block.succs if succ not in body}
+			inside = [block for block in exits if block not in header.succs
+				and all(pred in body for pred in self.forward_preds[block])
+				and all(succ in exits or succ in body for succ in block.succs)]
+			if len(exits) < 2 or not inside:
+				return body
+			body.update(inside)
+
+	def emit_region(self, block, loop, stop):
+		'''
+		Genera block y lo que le sigue hasta llegar a stop.  loop es el
+		encabezado del ciclo que encierra el código generado.
+		'''
+		if block in self.emitted:
+			raise UnstructuredFlow(f'{block.label} se generaría dos veces')
+		self.emitted.add(block)
+		if block in self.loops:
+			_, follow = self.loops[block]
+			self.emit('while True:')
+			self.indent += 1
+			self.emit_block(block, block, None)
+			self.indent -= 1
+			if follow is not None:
+				self.continue_at(follow, loop, stop)
+		else:
+			self.emit_block(block, loop, stop)
+
+	def emit_block(self, block, loop, stop):
+		for inst in block.code[:-1] if block.terminator() else block.code:
+			self.translate_inst(inst)
+		term = block.terminator()
+		if term is None:
+			if block.succs:
+				self.jump(block, block.succs[0], loop, stop)
+			else:
+				self.emit('return None')
+		elif term[0] == 'RET':
+			self.translate_inst(term)
+		elif term[0] == 'BRANCH' or term[2] == term[3]:
+			self.jump(block, block.succs[0], loop, stop)
+		else:
+			self.emit_if(block, term[1], *block.succs, loop, stop)
+
+	def emit_if(self, block, test, t_block, f_block, loop, stop):
+		body = self.loops[loop][0] if loop else None
+		merges = [child for child in self.children[block] if len(self.forward_preds[child]) > 1
+			and (body is None or child in body)]
+		if len(merges) > 1:
+			raise UnstructuredFlow(f'{block.label} tiene {len(merges)} puntos de unión')
+		merge = merges[0] if merges else None
+
+		inner = merge or stop
+		then_lines = self.capture(self.jump, block, t_block, loop, inner)
+		else_lines = self.capture(self.jump, block, f_block, loop, inner)
+		if then_lines:
+			self.emit(f'if {test}:')
+			self.lines.extend(then_lines)
+			if else_lines:
+				self.emit('else:')
+				self.lines.extend(else_lines)
+		elif else_lines:
+			self.emit(f'if not {test}:')
+			self.lines.extend(else_lines)
+		if merge is not None:
+			self.emit_region(merge, loop, stop)
+
+	def jump(self, block, target, loop, stop):
+		'''
+		Genera el salto de block a target
+		'''
+		if loop is not None and target is loop:
+			self.emit('continue')
+		elif loop is not None and target is self.loops[loop][1]:
+			self.emit('break')
+		elif target is stop:
+			# El código que sigue al if que contiene el salto
+			pass
+		elif self.forward_preds[target] == [block]:
+			self.emit_region(target, loop, stop)
+		else:
+			raise UnstructuredFlow(f'Salto de {block.label} a {target.label}')
+
+	def continue_at(self, block, loop, stop):
+		'''
+		Sigue en block al salir de un ciclo
+		'''
+		if loop is not None and block is loop:
+			self.emit('continue')
+		elif loop is not None and block is self.loops[loop][1]:
+			self.emit('break')
+		elif block is not stop:
+			self.emit_region(block, loop, stop)
+
+	# ------------------------------------------------------------------
+	# Ciclo de despacho
+	# ------------------------------------------------------------------
+
+	def dispatched(self, graph, bound):
+		'''
+		Genera una función anidada por bloque, que retorna el número del
+		bloque siguiente (None al terminar), y un ciclo que las llama
+		desde la tupla blocks.  Sirve para cualquier CFG, pero crear las
+		funciones anidadas en cada llamada es más lento que el código
+		estructurado.
+		'''
+		self.in_blocks = True
+		self.labels = {block.label: n for n, block in enumerate(graph.blocks)}
+		shared = self.shared_names(graph.blocks)
+
+		# nonlocal exige que la función externa asigne cada nombre
+		self.emit(' = '.join(sorted(shared - bound) + ['result']) + ' = None')
+		for n, block in enumerate(graph.blocks):
+			self.emit(f'def b{n}():')
+			self.indent += 1
+			names = self.assigned_names(block, shared)
+			if names:
+				self.emit(f'nonlocal {", ".join(sorted(names))}')
+			for inst in block.code:
+				self.translate_inst(inst)
+			if not block.terminator():
+				next_block = block.fallthrough and self.labels[block.fallthrough.label]
+				self.emit(f'return {next_block}')
+			self.indent -= 1
+		self.emit(f'blocks = ({", ".join(f"b{n}" for n in range(len(graph.blocks)))})')
+		self.emit('pc = 0')
+		self.emit('while pc is not None:')
+		self.emit('\tpc = blocks[pc]()')
+		self.emit('return result')
+
+	def shared_names(self, blocks):
+		'''
+		Retorna los nombres Python que deben vivir en la función externa:
+		las variables locales de MiniC y los registros que algún bloque
+		lee antes de definirlos (los únicos que pueden pasar su valor de
+		un bloque a otro)
+		'''
+		shared = {var_name(name) for name in self.locals}
+		for block in blocks:
+			defined = set()
+			for inst in block.code:
+				defs, uses = get_registers(inst)
+				shared.update(reg for reg in uses if reg not in defined)
+				defined.update(defs)
+		return shared
+
+	def assigned_names(self, block, shared):
+		'''
+		Nombres de la función externa que el bloque asigna (y que por lo
+		tanto debe declarar nonlocal)
+		'''
+		names = set()
+		for inst in block.code:
+			op_code, *args = inst
+			names.update(reg for reg in get_registers(inst)[0] if reg in shared)
+			if op_code.startswith(('STORE', 'ALLOC')) and args[-1] in self.locals:
+				names.add(var_name(args[-1]))
+			elif op_code == 'RET' and args:
+				names.add('result')
+		return names
+
+	# ------------------------------------------------------------------
+	# Instrucciones
+	# ------------------------------------------------------------------
+
+	def translate_inst(self, inst):
+		op_code, *args = inst
+		base = get_base_op_code(op_code)
+		getattr(self, f'translate_{base}')(op_code, *args)
+
+	def translate_MOV(self, op_code, value, target):
+		self.emit(f'{target} = {value!r}')
+
+	def translate_COPY(self, op_code, source, target):
+		self.emit(f'{target} = {source}')
+		
+	def translate_NEG(self, op_code, source, target):
+		self.emit(f'{target} = 0 - {source}')
+
+	def translate_NOT(self, op_code, source, target):
+		self.emit(f'{target} = 1 ^ {source}')
+
+	def translate_binary(self, op_code, left, right, target):
+		self.emit(f'{target} = {left} {BINARY_OPERATORS[op_code]} {right}')
+	translate_ADD = translate_binary
+	translate_SUB = translate_binary
+	translate_MUL = translate_binary
+	translate_DIV = translate_binary
+	translate_AND = translate_binary
+	translate_OR = translate_binary
+	translate_XOR = translate_binary
+
+	def translate_CMP(self, op_code, op, left, right, target):
+		self.emit(f'{target} = {left} {op} {right}')
+
+	def translate_PRINT(self, op_code, value):
+		if op_code == 'PRINTB':
+			self.emit(f'write(chr({value}))')
+		else:
+			self.emit("write(f'{" + value + "}\\n')")
+
+	def translate_VAR(self, op_code, name):
+		self.emit(f'{self.variable(name)} = {0.0 if op_code == "VARF" else 0}')
+
+	def translate_ALLOC(self, op_code, name):
+		self.emit(f'{self.variable(name)} = {0.0 if op_code == "ALLOCF" else 0}')
+
+	def translate_LOAD(self, op_code, name, target):
+		self.emit(f'{target} = {self.variable(name)}')
+
+	def translate_STORE(self, op_code, source, name):
+		self.emit(f'{self.variable(name)} = {source}')
+
+	def translate_NEW(self, op_code, size, target):
+		self.emit(f'{target} = new_array({op_code[-1]!r}, {size})')
+
+	def translate_ALOAD(self, op_code, name, index, target):
+		self.emit(f'if {index} < 0: bad_index({index})')
+		self.emit(f'{target} = {self.variable(name)}[{index}]')
+
+	def translate_ASTORE(self, op_code, source, name, index):
+		self.emit(f'if {index} < 0: bad_index({index})')
+		self.emit(f'{self.variable(name)}[{index}] = {source}')
+
+	def translate_ASIZE(self, op_code, name, target):
+		self.emit(f'{target} = len({self.variable(name)})')
+
+	# BRANCH y CBRANCH solo se traducen así en el ciclo de despacho; el
+	# código estructurado los genera en emit_block
+
+	def translate_BRANCH(self, op_code, label):
+		self.emit(f'return {self.labels[label]}')
+
+	def translate_CBRANCH(self, op_code, test, t_label, f_label):
+		self.emit(f'return {self.labels[t_label]} if {test} else {self.labels[f_label]}')
+
+	def translate_CALL(self, op_code, name, *registers):
+		*arguments, target = registers
+		self.emit(f'{target} = {function_name(name)}({", ".join(arguments)})')
+
+	def translate_RET(self, op_code, *value):
+		if not self.in_blocks:
+			self.emit(f'return {value[0] if value else None}')
+			return
+		if value:
+			self.emit(f'result = {value[0]}')
+		self.emit('return None')
+
+def find_global_slots(functions):
+	'''
+	Asigna una posición a cada variable global (instrucciones VAR)
+	'''
+	global_slots = { }
+	for function in functions:
+		for op_code, *args in function.code:
+			if op_code.startswith('VAR'):
+				global_slots.setdefault(args[0], len(global_slots))
+	return global_slots
+
+def compile_function(function, global_slots, namespace):
+	'''
+	Compila function a una función Python definida dentro de namespace
+	y la retorna
+	'''
+	source = FunctionTranslator(function, global_slots).translate()
+	code = compile(source, f'<minic {function.name}>', 'exec')
+	exec(code, namespace)
+	return namespace[function_name(function.name)]
+
+def compile_osr(function, label, global_slots, local_slots, namespace):
+	'''
+	Compila la entrada OSR de function en el rotulo label y la retorna
+	'''
+	source = FunctionTranslator(function, global_slots).translate(label, local_slots)
+	code = compile(source, f'<minic {function.name} osr {label}>', 'exec')
+	exec(code, namespace)
+	return namespace[osr_name(function.name, label)]
+
+class CompiledProgram(object):
+	'''
+	Un programa (lista de ircode.Function) compilado a funciones Python.
+	'''
+	def __init__(self, functions, output=None):
+		self.output = output or BufferedSink()
+		self.global_slots = find_global_slots(functions)
+		self.globals = [None] * len(self.global_slots)
+		self.namespace = {'G': self.globals, 'new_array': new_array, 'bad_index': bad_index, 'write': self.output.write}
+		self.functions = { }
+		for function in functions:
+			self.functions[function.name] = compile_function(function, self.global_slots, self.namespace)
+
+	def execute(self):
+		'''
+		Ejecuta __minic_init y luego __minic_main.  Retorna el valor
+		retornado por __minic_main.
+		'''
+		try:
+			if '__minic_init' in self.functions:
+				self.functions['__minic_init']()
+			if '__minic_main' in self.functions:
+				return self.functions['__minic_main']()
+		finally:
+			self.output.flush()
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	if len(sys.argv) != 2:
+		sys.stderr.write('Usage: python3 -m minic.pycompile filename\n')
+		raise SystemExit(1)
+
+	code = compile_ircode(open(sys.argv[1]).read())
+	if not errors_reported():
+		global_slots = find_global_slots(code)
+		for function in code:
+			print(FunctionTranslator(function, global_slots).translate())
+
+if __name__ == '__main__':
+	main()
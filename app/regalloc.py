@@ -0,0 +1,166 @@
+# minic/regalloc.py
+'''
+Asignación de registros
+=======================
+
+GenerateCode.new_register siempre crea un registro nuevo, así que una
+función grande usa miles de registros distintos y el intérprete crea un
+banco de registros (Frame.registers) de ese tamaño en cada llamada.
+Este pase reasigna los registros virtuales de cada función a un
+conjunto pequeño de registros físicos (R1 .. Rk) que se reutilizan, y
+deja en function.register_count el nuevo tamaño k.
+
+  1. Liveness: un análisis hacia atrás sobre el CFG (ver cfg.py) da los
+     registros vivos a la entrada y a la salida de cada bloque.
+
+  2. Intervalos: las instrucciones se numeran en el orden del código y
+     cada registro recibe el intervalo [primera, última] de posiciones
+     donde se define o está vivo.  Los usos de una instrucción van antes
+     que su definición, así que una instrucción puede escribir en el
+     mismo registro físico que acaba de leer por última vez.
+
+  3. Linear scan (Poletto y Sarkar): los intervalos se recorren por su
+     comienzo; los que ya terminaron liberan su registro físico y cada
+     intervalo nuevo toma el libre de menor número.  No hay spilling: si
+     no hay uno libre se agrega otro.
+
+Conviene que sea el último pase: valnum.py y licm.py solo tratan los
+registros que se definen una sola vez, y después de este pase casi
+ninguno lo es.
+
+Para ver el código con los registros asignados utiliza:
+
+    bash % python3 -m minic.regalloc someprogram.c
+
+'''
+import heapq
+
+from ircode import get_operand_kinds, get_registers
+from cfg import ControlFlowGraph
+
+def live_registers(graph):
+	'''
+	Retorna los registros vivos a la entrada y a la salida de cada bloque
+	'''
+	summary = { }
+	for block in graph.blocks:
+		gen, kill = set(), set()
+		for inst in reversed(block.code):
+			defs, uses = get_registers(inst)
+			gen.difference_update(defs)
+			kill.update(defs)
+			gen.update(uses)
+		summary[block] = (gen, kill)
+
+	live_in = {block: set() for block in graph.blocks}
+	live_out = {block: set() for block in graph.blocks}
+	changed = True
+	while changed:
+		changed = False
+		for block in reversed(graph.blocks):
+			out = set().union(*(live_in[succ] for succ in block.succs))
+			gen, kill = summary[block]
+			new = gen | (out - kill)
+			if out != live_out[block] or new != live_in[block]:
+				live_out[block] = out
+				live_in[block] = new
+				changed = True
+	return live_in, live_out
+
+def live_intervals(graph):
+	'''
+	Retorna el intervalo (comienzo, fin) de cada registro
+	'''
+	live_in, live_out = live_registers(graph)
+	intervals = { }
+
+	def extend(reg, position):
+		start, end = intervals.get(reg, (position, position))
+		intervals[reg] = (min(start, position), max(end, position))
+
+	position = 0
+	for block in graph.blocks:
+		for reg in live_in[block]:
+			extend(reg, position)
+		position += 1
+		for inst in block.code:
+			defs, uses = get_registers(inst)
+			for reg in uses:
+				extend(reg, position)
+			for reg in defs:
+				extend(reg, position + 1)
+			position += 2
+		for reg in live_out[block]:
+			extend(reg, position)
+		position += 1
+	return intervals
+
+def linear_scan(intervals):
+	'''
+	Asigna un registro físico (desde 1) a cada intervalo.  Retorna la
+	asignación y cuántos registros físicos se usaron.
+	'''
+	assignment = { }
+	active = [ ]
+	free = [ ]
+	count = 0
+	for reg, (start, end) in sorted(intervals.items(), key=lambda item: (item[1], item[0])):
+		while active and active[0][0] < start:
+			_, _, physical = heapq.heappop(active)
+			heapq.heappush(free, physical)
+		if free:
+			physical = heapq.heappop(free)
+		else:
+			count += 1
+			physical = count
+		assignment[reg] = physical
+		heapq.heappush(active, (end, reg, physical))
+	return assignment, count
+
+def rename_registers(inst, mapping):
+	'''
+	Retorna inst con todos sus registros (leídos y escritos) cambiados
+	según mapping
+	'''
+	kinds = get_operand_kinds(inst)
+	return (inst[0], *[mapping[arg] if kind == 'r' else arg for kind, arg in zip(kinds, inst[1:])])
+
+def allocate_registers(function):
+	'''
+	Reasigna los registros de function a registros físicos reutilizables.
+	Retorna cuántos registros usaba y cuántos usa ahora.
+	'''
+	graph = ControlFlowGraph(function)
+	graph.remove_unreachable()
+	intervals = live_intervals(graph)
+	assignment, count = linear_scan(intervals)
+	mapping = {reg: f'R{physical}' for reg, physical in assignment.items()}
+	for block in graph.blocks:
+		block.code = [rename_registers(inst, mapping) for inst in block.code]
+
+	before = len(intervals)
+	graph.update_function()
+	function.register_count = count
+	return {'registers': before, 'slots': count}
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	if len(sys.argv) != 2:
+		sys.stderr.write('Usage: python3 -m minic.regalloc filename\n')
+		raise SystemExit(1)
+
+	code = compile_ircode(open(sys.argv[1]).read())
+	if not errors_reported():
+		for function in code:
+			stats = allocate_registers(function)
+			print(f'{"::"*5} {function} {"::"*5}')
+			print(f'; {stats["registers"]} registros -> {stats["slots"]}')
+			for inst in function.code:
+				print(inst)
+			print()
+
+if __name__ == '__main__':
+	main()
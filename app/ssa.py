@@ -0,0 +1,244 @@
+# minic/ssa.py
+'''
+Forma SSA
+=========
+
+GenerateCode guarda cada variable local en memoria (ALLOC/LOAD/STORE
+sobre nombres).  Este módulo convierte una función a forma SSA real
+sobre su CFG (ver cfg.py): las variables locales escalares se
+promueven a registros y, donde se juntan varias definiciones, se
+colocan nodos phi.
+
+	to_ssa(function)     construye el CFG en forma SSA
+	from_ssa(graph)      baja de SSA: cambia los phi por copias (COPY)
+	                     y actualiza el código de la función
+	promote_locals(f)    las dos cosas: f queda con sus variables
+	                     escalares en registros
+
+Construcción (Cytron et al.):
+
+  1. Se eliminan los bloques inalcanzables y, si la entrada tiene
+     predecesores, se agrega un bloque de entrada nuevo.
+
+  2. Variables promovibles: parámetros y ALLOC que nunca se usan como
+     arreglo (ALOAD/ASTORE/ASIZE).  Cada una recibe un valor inicial al
+     comienzo de la función: LOAD del parámetro o MOV del cero.
+
+  3. Se colocan nodos phi en la frontera de dominancia iterada de los
+     bloques que definen la variable (STORE o ALLOC).
+
+  4. Renombrado en preorden del árbol de dominadores: un STORE cambia
+     el valor actual de la variable y desaparece; un LOAD desaparece y
+     sus usos pasan a leer el valor actual; un ALLOC se vuelve un MOV
+     del cero.
+
+Salida de SSA: cada phi se convierte en una copia al final de cada
+predecesor.  Las aristas críticas se parten primero y, si una copia
+lee el destino de otra del mismo bloque, las copias pasan por
+registros temporales (copia paralela).
+
+Para ver la forma SSA de un programa utiliza:
+
+    bash % python3 -m minic.ssa [--lower] someprogram.c
+
+'''
+from collections import Counter
+
+from ircode import get_base_op_code, get_registers
+from cfg import ControlFlowGraph, new_register, replace_uses
+
+ZERO = {'I': 0, 'F': 0.0, 'B': 0}
+
+class Phi(object):
+	'''
+	Nodo phi: target toma el valor de args[pred] según el predecesor
+	por el que se llegó al bloque
+	'''
+	def __init__(self, var, type_code, target):
+		self.var = var
+		self.type_code = type_code
+		self.target = target
+		self.args = { }
+
+	def rename_pred(self, old, new):
+		if old in self.args:
+			self.args[new] = self.args.pop(old)
+
+	def __repr__(self):
+		args = ', '.join(f'{pred.label}: {reg}' for pred, reg in self.args.items())
+		return f"('PHI{self.type_code}', '{self.target}', [{args}])    ; {self.var}"
+
+def promotable_variables(function):
+	'''
+	Retorna las variables locales que se pueden promover a registros,
+	con su sufijo de tipo
+	'''
+	variables = {pname: ptype for pname, ptype in function.parameters}
+	arrays = set()
+	for op_code, *args in function.code:
+		base = get_base_op_code(op_code)
+		if base == 'ALLOC':
+			variables.setdefault(args[0], op_code[-1])
+		elif base in ('ALOAD', 'ASIZE'):
+			arrays.add(args[0])
+		elif base == 'ASTORE':
+			arrays.add(args[1])
+	return {name: type_code for name, type_code in variables.items() if name not in arrays}
+
+def to_ssa(function):
+	'''
+	Construye el CFG de function en forma SSA y lo retorna
+	'''
+	graph = ControlFlowGraph(function)
+	graph.remove_unreachable()
+	if graph.entry.preds:
+		graph.insert_block_before(graph.entry)
+
+	variables = promotable_variables(function)
+	parameters = {pname for pname, _ in function.parameters}
+
+	# Registros definidos una sola vez: sus LOAD se pueden eliminar
+	definitions = Counter()
+	for block in graph.blocks:
+		for inst in block.code:
+			definitions.update(get_registers(inst)[0])
+
+	# Valor inicial de cada variable
+	stacks = { }
+	initial = [ ]
+	for name, type_code in variables.items():
+		target = new_register(function)
+		if name in parameters:
+			initial.append((f'LOAD{type_code}', name, target))
+		else:
+			initial.append((f'MOV{type_code}', ZERO[type_code], target))
+		stacks[name] = [target]
+	graph.entry.code[:0] = initial
+
+	# Colocación de los phi
+	idom = graph.dominators()
+	frontiers = graph.dominance_frontiers(idom)
+	order = {block: n for n, block in enumerate(graph.blocks)}
+	for name, type_code in variables.items():
+		defining = {graph.entry}
+		for block in idom:
+			for op_code, *args in block.code:
+				base = get_base_op_code(op_code)
+				if (base == 'STORE' and args[1] == name) or (base == 'ALLOC' and args[0] == name):
+					defining.add(block)
+		placed = set()
+		work = [block for block in graph.blocks if block in defining]
+		while work:
+			for block in sorted(frontiers[work.pop()], key=order.get):
+				if block not in placed:
+					placed.add(block)
+					block.phis.append(Phi(name, type_code, new_register(function)))
+					if block not in defining:
+						defining.add(block)
+						work.append(block)
+
+	# Renombrado
+	children = graph.dominator_tree(idom)
+	mapping = { }
+
+	def rename(block):
+		pushed = [ ]
+		for phi in block.phis:
+			stacks[phi.var].append(phi.target)
+			pushed.append(phi.var)
+
+		code = [ ]
+		for inst in block.code:
+			inst = replace_uses(inst, mapping)
+			op_code, *args = inst
+			base = get_base_op_code(op_code)
+			if base == 'LOAD' and args[0] in variables and inst not in initial:
+				value = stacks[args[0]][-1]
+				if definitions[args[1]] == 1:
+					mapping[args[1]] = value
+				else:
+					code.append((f'COPY{op_code[-1]}', value, args[1]))
+			elif base == 'STORE' and args[1] in variables:
+				stacks[args[1]].append(args[0])
+				pushed.append(args[1])
+			elif base == 'ALLOC' and args[0] in variables:
+				target = new_register(function)
+				code.append((f'MOV{op_code[-1]}', ZERO[op_code[-1]], target))
+				stacks[args[0]].append(target)
+				pushed.append(args[0])
+			else:
+				code.append(inst)
+		block.code = code
+
+		for succ in block.succs:
+			for phi in succ.phis:
+				phi.args[block] = stacks[phi.var][-1]
+		for child in children[block]:
+			rename(child)
+		for name in pushed:
+			stacks[name].pop()
+
+	rename(graph.entry)
+	return graph
+
+def from_ssa(graph):
+	'''
+	Cambia los nodos phi por copias en los predecesores y actualiza el
+	código de la función
+	'''
+	function = graph.function
+	for block in list(graph.blocks):
+		if not block.phis:
+			continue
+		for pred in list(block.preds):
+			if len(pred.succs) > 1:
+				graph.split_edge(pred, block)
+
+		for pred in block.preds:
+			copies = [(phi.args[pred], phi.target, phi.type_code) for phi in block.phis
+				if phi.args[pred] != phi.target]
+			targets = {target for _, target, _ in copies}
+			if any(source in targets for source, _, _ in copies):
+				# Copia paralela: primero se leen todos los valores
+				temporaries = [(source, new_register(function), type_code) for source, _, type_code in copies]
+				code = [(f'COPY{type_code}', source, temp) for source, temp, type_code in temporaries]
+				code += [(f'COPY{type_code}', temp, target)
+					for (_, temp, _), (_, target, type_code) in zip(temporaries, copies)]
+			else:
+				code = [(f'COPY{type_code}', source, target) for source, target, type_code in copies]
+			position = len(pred.code) - (1 if pred.terminator() else 0)
+			pred.code[position:position] = code
+		block.phis = [ ]
+	graph.update_function()
+	return function
+
+def promote_locals(function):
+	'''
+	Promueve las variables locales escalares de function a registros
+	(ida y vuelta por SSA)
+	'''
+	return from_ssa(to_ssa(function))
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write('Usage: python3 -m minic.ssa [--lower] filename\n')
+		raise SystemExit(1)
+
+	code = compile_ircode(open(args[0]).read())
+	if not errors_reported():
+		for function in code:
+			print(f'{"::"*5} {function} {"::"*5}')
+			if '--lower' in sys.argv:
+				for inst in promote_locals(function).code:
+					print(inst)
+			else:
+				print(to_ssa(function))
+			print()
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,326 @@
+# minic/superinst.py
+'''
+Superinstrucciones
+==================
+
+El código que produce GenerateCode es muy regular.  Por ejemplo, la
+sentencia x = y + z siempre se convierte en:
+
+	('LOADI', 'y', 'R1')
+	('LOADI', 'z', 'R2')
+	('ADDI', 'R1', 'R2', 'R3')
+	('STOREI', 'R3', 'x')
+
+Este módulo busca esas secuencias frecuentes y las reemplaza por una
+sola superinstrucción con su propio handler en el intérprete:
+
+	('ADDVVI', 'y', 'z', 'x')
+
+Una secuencia solo se fusiona si los registros intermedios se leen una
+única vez en toda la función (dentro de la misma secuencia), de modo que
+nadie más observa su valor.  Si la función reutiliza registros (ver
+regalloc.py), se cuentan en cambio las lecturas que observan cada
+definición dentro de la secuencia, más una si el registro sigue vivo al
+salir de ella.
+
+Para escoger qué secuencias fusionar, el módulo también reporta la
+frecuencia de pares de opcodes consecutivos, contados sobre el código
+(estático) o sobre una ejecución real del programa (dinámico):
+
+    bash % python3 -m minic.superinst [--static] someprogram.c
+
+'''
+from collections import Counter
+
+from ircode import IR_OPERANDS, get_base_op_code, get_registers
+from cfg import TERMINATORS, branch_targets
+
+ARITHM_OPS = {'ADD', 'SUB', 'MUL', 'DIV'}
+
+def count_uses(code):
+	'''
+	Cuenta cuántas veces se lee cada registro en el código
+	'''
+	uses = Counter()
+	for inst in code:
+		# Un opcode desconocido lo rechaza Interpreter.decode
+		if get_base_op_code(inst[0]) in IR_OPERANDS:
+			uses.update(get_registers(inst)[1])
+	return uses
+
+def live_after(code):
+	'''
+	Retorna, para cada posición del código, el conjunto de registros
+	vivos después de esa instrucción
+	'''
+	# Bloques básicos como rangos [start, end) de posiciones
+	starts = {0}
+	labels = { }
+	for n, inst in enumerate(code):
+		if inst[0] == 'LABEL':
+			starts.add(n)
+			labels[inst[1]] = n
+		elif inst[0] in TERMINATORS:
+			starts.add(n + 1)
+	starts = sorted(start for start in starts if start < len(code))
+	blocks = list(zip(starts, starts[1:] + [len(code)]))
+	index = {start: b for b, (start, _) in enumerate(blocks)}
+
+	succs = [ ]
+	for b, (start, end) in enumerate(blocks):
+		last = code[end - 1]
+		if last[0] in TERMINATORS:
+			succs.append([index[labels[label]] for label in branch_targets(last)])
+		else:
+			succs.append([b + 1] if b + 1 < len(blocks) else [])
+
+	def transfer(start, end, live, after=None):
+		live = set(live)
+		for n in range(end - 1, start - 1, -1):
+			if after is not None:
+				after[n] = set(live)
+			defs, uses = get_registers(code[n])
+			live.difference_update(defs)
+			live.update(uses)
+		return live
+
+	live_in = [set() for _ in blocks]
+	changed = True
+	while changed:
+		changed = False
+		for b in range(len(blocks) - 1, -1, -1):
+			new = transfer(*blocks[b], set().union(*(live_in[s] for s in succs[b])))
+			if new != live_in[b]:
+				live_in[b] = new
+				changed = True
+
+	after = [None] * len(code)
+	for b, (start, end) in enumerate(blocks):
+		transfer(start, end, set().union(*(live_in[s] for s in succs[b])), after)
+	return after
+
+def window_uses(code, n, live):
+	'''
+	Lecturas de los registros definidos en la ventana code[n:n+4], para
+	código que reutiliza registros.  Para cada definición se cuentan las
+	lecturas que la observan, más una si el registro sigue vivo al salir
+	de la ventana.  Un registro vale 1 solo si todas sus definiciones se
+	leen exactamente una vez.
+	'''
+	window = code[n:n+4]
+
+	def observed(i, reg):
+		count = 0
+		for j in range(i + 1, len(window)):
+			if window[j][0] == 'LABEL':
+				return count + (reg in live[n + j - 1])
+			defs, uses = get_registers(window[j])
+			count += uses.count(reg)
+			if reg in defs:
+				return count
+			if window[j][0] in TERMINATORS:
+				return count + (reg in live[n + j])
+		return count + (reg in live[n + len(window) - 1])
+
+	counts = { }
+	for i, inst in enumerate(window):
+		for reg in get_registers(inst)[0]:
+			counts.setdefault(reg, []).append(observed(i, reg))
+	return Counter({reg: next((c for c in values if c != 1), 1) for reg, values in counts.items()})
+
+# ----------------------------------------------------------------------
+# Patrones de fusión.  Cada función recibe la ventana de instrucciones
+# que empieza en la posición actual y el conteo de lecturas de cada
+# registro.  Retorna (superinstrucción, instrucciones consumidas) o None.
+# ----------------------------------------------------------------------
+
+def fuse_binop_store(window, uses):
+	'''
+	LOAD a / LOAD b (o MOV c) / OP / STORE  ->  OPVV o OPVC
+	'''
+	if len(window) < 4:
+		return None
+	first, second, binop, store = window[:4]
+	op = get_base_op_code(binop[0])
+	if not (first[0].startswith('LOAD') and op in ARITHM_OPS and store[0].startswith('STORE')):
+		return None
+	if binop[1:] != (first[2], second[-1], binop[3]) or store[1] != binop[3]:
+		return None
+	if any(uses[r] != 1 for r in binop[1:]):
+		return None
+
+	suffix = binop[0][len(op):]
+	if second[0].startswith('LOAD'):
+		return (f'{op}VV{suffix}', first[1], second[1], store[2]), 4
+	if second[0].startswith('MOV'):
+		return (f'{op}VC{suffix}', first[1], second[1], store[2]), 4
+	return None
+
+def fuse_cmp_branch_vars(window, uses):
+	'''
+	LOAD a / LOAD b (o MOV c) / CMP / CBRANCH  ->  CMPVVBR o CMPVCBR
+	'''
+	if len(window) < 4:
+		return None
+	first, second, cmp, cbranch = window[:4]
+	if not (first[0].startswith('LOAD') and cmp[0].startswith('CMP') and cbranch[0] == 'CBRANCH'):
+		return None
+	if cmp[2:] != (first[2], second[-1], cbranch[1]):
+		return None
+	if any(uses[r] != 1 for r in cmp[2:]):
+		return None
+
+	suffix = cmp[0][3:]
+	if second[0].startswith('LOAD'):
+		return (f'CMPVVBR{suffix}', cmp[1], first[1], second[1], *cbranch[2:]), 4
+	if second[0].startswith('MOV'):
+		return (f'CMPVCBR{suffix}', cmp[1], first[1], second[1], *cbranch[2:]), 4
+	return None
+
+def fuse_cmp_branch(window, uses):
+	'''
+	CMP / CBRANCH  ->  CMPBR
+	'''
+	if len(window) < 2:
+		return None
+	cmp, cbranch = window[:2]
+	if not (cmp[0].startswith('CMP') and cbranch[0] == 'CBRANCH'):
+		return None
+	if cmp[4] != cbranch[1] or uses[cmp[4]] != 1:
+		return None
+	return (f'CMPBR{cmp[0][3:]}', *cmp[1:4], *cbranch[2:]), 2
+
+def fuse_mov_store(window, uses):
+	'''
+	MOV c / STORE  ->  STOREC
+	'''
+	if len(window) < 2:
+		return None
+	mov, store = window[:2]
+	if not (mov[0].startswith('MOV') and store[0].startswith('STORE')):
+		return None
+	if store[1] != mov[2] or uses[mov[2]] != 1:
+		return None
+	return (f'STOREC{store[0][5:]}', mov[1], store[2]), 2
+
+# Patrones en orden de prioridad: los más largos primero
+SUPERINSTRUCTIONS = [
+	fuse_binop_store,
+	fuse_cmp_branch_vars,
+	fuse_cmp_branch,
+	fuse_mov_store,
+]
+
+def fuse_code(code, patterns=SUPERINSTRUCTIONS):
+	'''
+	Retorna una nueva lista de instrucciones donde las secuencias
+	reconocidas por patterns se reemplazan por superinstrucciones
+	'''
+	uses = count_uses(code)
+	definitions = Counter(reg for inst in code if get_base_op_code(inst[0]) in IR_OPERANDS
+		for reg in get_registers(inst)[0])
+	live = live_after(code) if any(count > 1 for count in definitions.values()) else None
+	fused = []
+	n = 0
+	while n < len(code):
+		window = code[n:n+4]
+		if live is not None:
+			uses = window_uses(code, n, live)
+		for pattern in patterns:
+			match = pattern(window, uses)
+			if match:
+				inst, consumed = match
+				fused.append(inst)
+				n += consumed
+				break
+		else:
+			fused.append(code[n])
+			n += 1
+	return fused
+
+# ----------------------------------------------------------------------
+# Reporte de frecuencias de pares de opcodes
+# ----------------------------------------------------------------------
+
+def static_pair_frequencies(functions):
+	'''
+	Cuenta los pares de opcodes consecutivos que aparecen en el código
+	'''
+	pairs = Counter()
+	for func in functions:
+		opcodes = [inst[0] for inst in func.code]
+		pairs.update(zip(opcodes, opcodes[1:]))
+	return pairs
+
+def dynamic_pair_frequencies(functions):
+	'''
+	Ejecuta el programa (sin superinstrucciones) y cuenta los pares
+	de opcodes consecutivos efectivamente ejecutados.  La salida del
+	programa se descarta.  Los pares no cruzan llamadas: la primera
+	instrucción de una función no forma par con el CALL, y al volver el
+	CALL forma par con la instrucción que le sigue en quien llamó.
+	'''
+	from interp import Interpreter
+	from output import CaptureSink
+
+	class PairCountingInterpreter(Interpreter):
+		def __init__(self):
+			super().__init__(output=CaptureSink(), superinstructions=False, quickening=False)
+			self.pairs = Counter()
+			self.last = None
+
+		def decode(self, code):
+			program, register_count = super().decode(code)
+			opcodes = [inst[0] for inst in code if inst[0] != 'LABEL']
+			program = [(self.counting(op_code, handler), args)
+				for op_code, (handler, args) in zip(opcodes, program)]
+			return program, register_count
+
+		def call(self, function, arguments):
+			last, self.last = self.last, None
+			try:
+				return super().call(function, arguments)
+			finally:
+				self.last = last
+
+		def counting(self, op_code, handler):
+			def run(*args):
+				self.pairs[self.last, op_code] += 1
+				self.last = op_code
+				return handler(*args)
+			return run
+
+	interpreter = PairCountingInterpreter()
+	interpreter.execute(functions)
+	return Counter({pair: count for pair, count in interpreter.pairs.items() if pair[0]})
+
+def pair_report(pairs, top=20):
+	'''
+	Retorna un reporte de texto con los pares más frecuentes
+	'''
+	total = sum(pairs.values()) or 1
+	lines = [f'{"par de opcodes":<30} {"cuenta":>10} {"%":>7}']
+	for (first, second), count in pairs.most_common(top):
+		lines.append(f'{first + " " + second:<30} {count:>10} {100 * count / total:>6.2f}%')
+	return '\n'.join(lines)
+
+def main():
+	import sys
+	from ircode import compile_ircode
+	from errores import errors_reported
+
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	if len(args) != 1:
+		sys.stderr.write('Usage: python3 -m minic.superinst [--static] filename\n')
+		raise SystemExit(1)
+
+	code = compile_ircode(open(args[0]).read())
+	if not errors_reported():
+		if '--static' in sys.argv:
+			pairs = static_pair_frequencies(code)
+		else:
+			pairs = dynamic_pair_frequencies(code)
+		print(pair_report(pairs))
+
+if __name__ == '__main__':
+	main()
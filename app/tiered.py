@@ -0,0 +1,124 @@
+# minic/tiered.py
+'''
+Ejecución por niveles
+=====================
+
+Un programa empieza siempre en el intérprete (arranque barato).  El
+intérprete cuenta las llamadas a cada función y las veces que se toma
+cada salto hacia atrás (el BRANCH que cierra un ciclo while).  Cuando un
+contador cruza su umbral, ese código se compila a Python (ver
+pycompile.py) y desde entonces corre en el nivel rápido:
+
+  * Una función caliente se compila completa y las siguientes llamadas
+    (desde el intérprete o desde código compilado) usan la versión
+    compilada.
+
+  * Un ciclo caliente se compila como una entrada OSR de su función que
+    empieza en el rotulo del ciclo.  El intérprete le pasa su banco de
+    registros y sus variables locales, y la versión compilada termina de
+    ejecutar la función; su resultado es el resultado de la llamada.
+
+Para ejecutar un programa por niveles utiliza:
+
+    bash % python3 -m minic.interp --tier=tiered someprogram.c
+
+'''
+from interp import Interpreter, HALT, bad_index
+from pycompile import compile_function, compile_osr, function_name
+
+# Umbrales por defecto para promover código al nivel compilado
+HOT_CALLS = 50
+HOT_LOOPS = 500
+
+class TieredInterpreter(Interpreter):
+	'''
+	Intérprete que promueve funciones y ciclos calientes a código Python
+	compilado.
+	'''
+	def __init__(self, hot_calls=HOT_CALLS, hot_loops=HOT_LOOPS, **kwargs):
+		super().__init__(**kwargs)
+		self.hot_calls = hot_calls
+		self.hot_loops = hot_loops
+
+		# Espacio de nombres del código compilado.  Cada función MiniC
+		# tiene ahí una entrada f_nombre: al inicio es un trampolín hacia
+		# el intérprete y se reemplaza al compilarla.
+		self.namespace = { }
+
+		# Cuántas funciones y entradas OSR se compilaron
+		self.promoted_functions = 0
+		self.promoted_loops = 0
+
+	def load(self, functions):
+		super().load(functions)
+		self.namespace['G'] = self.globals
+		self.namespace['new_array'] = self.allocate
+		self.namespace['bad_index'] = bad_index
+		self.namespace['write'] = self.write
+		for function in self.functions.values():
+			function.calls = 0
+			function.compiled = None
+			function.back_edges = { }
+			function.osr = { }
+			self.namespace[function_name(function.name)] = self.trampoline(function)
+
+	def set_limits(self, *limits):
+		# El código compilado no cuenta instrucciones ni revisa el reloj: 
+		# con límites activos todo se queda en el intérprete
+		super().set_limits(*limits)
+		self.hot_calls = self.hot_loops = HALT
+		
+	def trampoline(self, function):
+		def call(*arguments):
+			return self.call(function, arguments)
+		return call
+
+	def decode(self, code):
+		'''
+		Igual que Interpreter.decode, pero los saltos hacia atrás se
+		cambian por run_LOOP, que cuenta las iteraciones del ciclo.
+		'''
+		program, register_count = super().decode(code)
+
+		labels = { }
+		index = 0
+		for op_code, *args in code:
+			if op_code == 'LABEL':
+				labels[args[0]] = index
+			else:
+				if op_code == 'BRANCH' and labels.get(args[0], index + 1) <= index:
+					program[index] = (self.run_LOOP, (labels[args[0]], args[0]))
+				index += 1
+		return program, register_count
+
+	def call(self, function, arguments):
+		if function.compiled is None:
+			function.calls += 1
+			if function.calls < self.hot_calls:
+				return super().call(function, arguments)
+			self.promote(function)
+		return function.compiled(*arguments)
+
+	def promote(self, function):
+		'''
+		Compila la función completa y la instala en el espacio de nombres
+		'''
+		function.compiled = compile_function(function.function, self.global_slots, self.namespace)
+		self.promoted_functions += 1
+
+	def run_LOOP(self, target, label):
+		function = self.function
+		count = function.back_edges.get(label, 0) + 1
+		function.back_edges[label] = count
+		if count < self.hot_loops:
+			return target
+
+		# Ciclo caliente: se continúa en la entrada OSR compilada con
+		# el estado actual del frame
+		osr = function.osr.get(label)
+		if osr is None:
+			osr = compile_osr(function.function, label, self.global_slots, function.slots, self.namespace)
+			function.osr[label] = osr
+			self.promoted_loops += 1
+		self.retval = osr(self.registers, self.vars)
+		return HALT
@@ -0,0 +1,192 @@
+# minic/valnum.py
+'''
+Numeración de valores
+=====================
+
+GenerateCode emite un LOAD y una operación nuevos cada vez que aparece
+una expresión, así que a[i] + a[i] o x*y repetido en la condición de un
+ciclo se calculan más de una vez.  Este pase encuentra los cálculos
+redundantes y reutiliza el registro del primero: la instrucción
+repetida desaparece y sus usos pasan a leer el registro anterior.
+
+Los MOV de constantes no se reutilizan: repetirlos cuesta lo mismo que
+copiar un registro, y el intérprete los fusiona con la instrucción que
+los lee (ver superinst.py).
+
+Cada instrucción sin efectos se identifica por una llave: su opcode y
+sus operandos (ya renombrados, y ordenados si la operación es
+conmutativa).  Las lecturas de memoria llevan además la etiqueta
+('LOAD', variable) al comienzo de su llave, y solo se invalidan por
+esa etiqueta.  Las llaves se recorren en preorden del árbol de
+dominadores (ver cfg.py), de modo que un bloque ve los valores de los
+bloques que lo dominan (numeración global) y los suyos (numeración
+local).
+
+Las lecturas de memoria necesitan más cuidado:
+
+  * Un LOAD se invalida con un STORE a la misma variable.  Además, el
+    STORE deja disponible su valor: un LOAD posterior de la variable
+    reutiliza el registro guardado.
+
+  * Un ALOAD se invalida con cualquier ASTORE, y ASIZE y ALOAD de una
+    variable con un STORE a ella.
+
+  * Un CALL invalida las lecturas de variables globales y de arreglos.
+
+Una lectura solo pasa a los bloques dominados si la función nunca
+escribe en esa memoria; en otro caso vale solo dentro de su bloque.
+
+Solo participan los registros que se definen una sola vez en la
+función (los que produce GenerateCode); los demás (por ejemplo, los
+COPY de ssa.py) se dejan como están.
+
+'''
+from collections import Counter
+
+from ircode import get_base_op_code, get_registers
+from cfg import ControlFlowGraph, replace_uses
+
+# Operaciones sin efectos que se pueden reutilizar
+PURE = {'NEG', 'NOT', 'ADD', 'SUB', 'MUL', 'DIV', 'AND', 'OR', 'XOR', 'CMP'}
+
+COMMUTATIVE = {'ADD', 'MUL', 'AND', 'OR', 'XOR'}
+
+# Lecturas de memoria: la variable es su primer operando
+MEMORY = {'LOAD', 'ALOAD', 'ASIZE'}
+
+class ValueNumbering(object):
+	'''
+	Elimina los cálculos redundantes de una ircode.Function
+	'''
+	def __init__(self, function):
+		self.function = function
+		self.graph = ControlFlowGraph(function)
+		self.graph.remove_unreachable()
+
+		code = [inst for block in self.graph.blocks for inst in block.code]
+		self.definitions = Counter()
+		for inst in code:
+			self.definitions.update(get_registers(inst)[0])
+
+		self.locals = {pname for pname, _ in function.parameters} | {args[0]
+			for op_code, *args in function.code if op_code.startswith('ALLOC')}
+
+		# Memoria que la función escribe en algún punto
+		self.stored = set()
+		self.astored = False
+		self.calls = False
+		for op_code, *args in code:
+			base = get_base_op_code(op_code)
+			if base in ('STORE', 'ALLOC', 'VAR'):
+				self.stored.add(args[-1] if base == 'STORE' else args[0])
+			elif base == 'ASTORE':
+				self.astored = True
+			elif base == 'CALL':
+				self.calls = True
+
+		self.mapping = { }
+		self.expressions = 0
+		self.loads = 0
+
+	def key(self, inst):
+		'''
+		Llave de valor de inst, o None si inst no se puede reutilizar
+		'''
+		op_code, *args = inst
+		base = get_base_op_code(op_code)
+		if base not in PURE and base not in MEMORY:
+			return None
+		defs, uses = get_registers(inst)
+		if any(self.definitions[reg] != 1 for reg in defs + uses):
+			return None
+		operands = args[:-1]
+		if base in MEMORY:
+			return (('LOAD', operands[0]), op_code, *operands[1:])
+		if base in COMMUTATIVE or (base == 'CMP' and args[0] in ('==', '!=')):
+			operands = operands[:-2] + sorted(operands[-2:])
+		return (op_code, *operands)
+
+	def invariant(self, key):
+		'''
+		True si la lectura de memoria key vale en toda la función
+		'''
+		(_, name), op_code = key[:2]
+		base = get_base_op_code(op_code)
+		if name in self.stored:
+			return False
+		if name not in self.locals and self.calls:
+			return False
+		if base == 'ALOAD' and (self.astored or self.calls):
+			return False
+		return True
+
+	def invalidate(self, inst, local):
+		'''
+		Quita de la tabla local las lecturas que inst puede cambiar
+		'''
+		op_code, *args = inst
+		base = get_base_op_code(op_code)
+		if base in ('STORE', 'ALLOC', 'VAR'):
+			tag = ('LOAD', args[-1] if base == 'STORE' else args[0])
+			for key in [key for key in local if key[0] == tag]:
+				del local[key]
+			if base == 'STORE' and self.definitions[args[0]] == 1:
+				local[(tag, f'LOAD{op_code[-1]}')] = args[0]
+		elif base == 'ASTORE':
+			for key in [key for key in local if get_base_op_code(key[1]) == 'ALOAD']:
+				del local[key]
+		elif base == 'CALL':
+			for key in [key for key in local if key[0][1] not in self.locals
+					or get_base_op_code(key[1]) == 'ALOAD']:
+				del local[key]
+
+	def visit(self, block, available, children):
+		scope = [ ]
+		local = { }
+		code = [ ]
+		for inst in block.code:
+			inst = replace_uses(inst, self.mapping)
+			key = self.key(inst)
+			if key is not None:
+				memory = get_base_op_code(inst[0]) in MEMORY
+				previous = local.get(key) if memory else None
+				if previous is None:
+					previous = available.get(key)
+				if previous is not None:
+					self.mapping[inst[-1]] = previous
+					if memory:
+						self.loads += 1
+					else:
+						self.expressions += 1
+					continue
+				if memory and not self.invariant(key):
+					local[key] = inst[-1]
+				else:
+					available[key] = inst[-1]
+					scope.append(key)
+			else:
+				self.invalidate(inst, local)
+			code.append(inst)
+		block.code = code
+
+		for child in children[block]:
+			self.visit(child, available, children)
+		for key in scope:
+			del available[key]
+
+	def run(self):
+		idom = self.graph.dominators()
+		self.visit(self.graph.entry, { }, self.graph.dominator_tree(idom))
+		for block in self.graph.blocks:
+			block.code = [replace_uses(inst, self.mapping) for inst in block.code]
+		self.graph.link()
+		self.graph.update_function()
+		return self.expressions, self.loads
+
+def number_values(function):
+	'''
+	Elimina las expresiones y lecturas redundantes de function.  Retorna
+	cuántas de cada una se eliminaron.
+	'''
+	expressions, loads = ValueNumbering(function).run()
+	return {'expressions': expressions, 'loads': loads}
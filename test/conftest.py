@@ -0,0 +1,20 @@
+# test/conftest.py
+'''
+Los módulos del compilador se importan sin paquete (from ircode import
+...), igual que cuando se ejecutan desde app/.
+'''
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+@pytest.fixture(autouse=True)
+def clear_compile_errors():
+	'''
+	El contador de errores de errores.py es global: cada prueba empieza
+	sin errores
+	'''
+	from errores import clear_errors
+	clear_errors()
@@ -0,0 +1,464 @@
+# test/support.py
+'''
+Programas y utilidades de las pruebas
+=====================================
+
+PROGRAMS son programas MiniC que cubren llamadas, recursión, ciclos
+anidados, break, floats, bools, arreglos y variables globales.  MiniC
+no tiene una instrucción de salida, así que IR_PROGRAMS agrega
+programas escritos directamente en IR que usan PRINTI/PRINTF/PRINTB.
+
+Las pruebas son diferenciales: el resultado de referencia de cada
+programa es el del intérprete base sin superinstrucciones ni
+quickening.  Cada transformación o tier debe dar el mismo Outcome:
+valor retornado por main, valores finales de las globales y salida.
+'''
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+from ircode import Function, compile_ircode
+from interp import Interpreter, RECURSION_LIMIT
+from output import CaptureSink
+from errores import errors_reported, clear_errors
+
+sys.setrecursionlimit(RECURSION_LIMIT)
+
+PROGRAMS = {
+	'calls': '''
+int g;
+int sq(int x){
+	int y;
+	y = x * x;
+	return y;
+}
+int main(void){
+	int i;
+	int s;
+	i = 0;
+	s = 0;
+	while (i < 10) {
+		s = s + sq(i);
+		i = i + 1;
+	}
+	if (s > 100) { g = s; }
+	return s;
+}
+''',
+	'branches': '''
+int g;
+int h;
+int main(void){
+	int i;
+	int s;
+	i = 0;
+	s = 0;
+	while (i < 10) {
+		s = s + i * i;
+		i = i + 1;
+		if (s > 50) { break; }
+	}
+	if (s > 100) { g = s; } else { g = -s; }
+	h = 0;
+	while (h < 3) { h = h + 1; }
+	return s;
+}
+''',
+	'fib': '''
+int calls;
+int fib(int n){
+	calls = calls + 1;
+	if (n < 2) { return n; }
+	return fib(n - 1) + fib(n - 2);
+}
+int ack(int m, int n){
+	if (m == 0) { return n + 1; }
+	if (n == 0) { return ack(m - 1, 1); }
+	return ack(m - 1, ack(m, n - 1));
+}
+int main(void){
+	return fib(15) + ack(2, 3);
+}
+''',
+	'loops': '''
+int total;
+int main(void){
+	int i;
+	int j;
+	int s;
+	i = 0;
+	s = 0;
+	while (i < 60) {
+		j = 0;
+		while (j < 60) {
+			s = s + j;
+			j = j + 1;
+		}
+		i = i + 1;
+	}
+	total = s;
+	return s;
+}
+''',
+	'floats': '''
+int acc;
+float fg;
+int step(int x, int k){
+	int t;
+	t = x * k + 1;
+	acc = acc + t;
+	return t;
+}
+float poly(float x, int k) {
+	float y;
+	int i;
+	if (x < 0.0) {
+		y = 0.0 - x;
+	} else {
+		y = x * x;
+	}
+	i = 0;
+	while (i < k) {
+		y = y / 2.0;
+		i = i + 1;
+	}
+	return y;
+}
+int main(void){
+	int i;
+	int j;
+	float f;
+	i = 0;
+	f = 1.5;
+	while (i < 500) {
+		j = step(i, 3);
+		if (j > 100) { acc = acc - 1; }
+		f = f * 1.0001;
+		i = i + 1;
+	}
+	fg = f + poly(3.0, 2) + poly(-1.5, 3);
+	return acc;
+}
+''',
+	'swap': '''
+int g;
+int swp(int n) {
+	while (n > 0) {
+		g = g + n;
+		n = n - 1;
+	}
+	return g;
+}
+int main(void) {
+	int x;
+	int y;
+	int t;
+	int i;
+	int s;
+	x = 1;
+	y = 2;
+	i = 0;
+	s = 0;
+	while (i < 7) {
+		t = x;
+		x = y;
+		y = t;
+		s = s * 3 + x;
+		if (s > 100) {
+			break;
+		}
+		i = i + 1;
+	}
+	s = s + swp(4);
+	return s * 10 + x;
+}
+''',
+	'constants': '''
+int N;
+int k(int x) {
+	int a;
+	int b;
+	a = 3 * 4 + 2;
+	b = a - 4;
+	if (b > 5) {
+		x = x + b * 2;
+	} else {
+		x = x - 1000;
+	}
+	while (a < 20) {
+		a = a + 1;
+	}
+	return x + -a;
+}
+int main(void) {
+	int s;
+	int i;
+	int n;
+	N = 10;
+	n = 8 / 2;
+	s = 0;
+	i = 0;
+	while (i < N * n) {
+		s = s + k(i) + n * 2;
+		i = i + 1;
+	}
+	return s;
+}
+''',
+	'unary': '''
+float fz;
+bool flag;
+int main(void) {
+	int x;
+	int y;
+	float f;
+	bool b;
+	x = 7;
+	y = -x;
+	f = 0.0;
+	f = -f;
+	b = x > 3;
+	b = !b;
+	if (b) { y = y + 1; } else { y = y + 0; }
+	x = y;
+	y = x + x;
+	fz = f;
+	flag = b;
+	return y + 0;
+}
+''',
+	'arrays': '''
+int g[];
+float avg;
+int fill(int a[], int n){
+	int i;
+	i = 0;
+	while (i < n) {
+		a[i] = i * i;
+		i = i + 1;
+	}
+	return n;
+}
+int main(void){
+	int a[];
+	float f[];
+	int n;
+	int i;
+	int s;
+	n = 200;
+	a = new int[n];
+	f = new float[10];
+	g = new int[5];
+	n = fill(a, a.size);
+	i = 0;
+	s = 0;
+	while (i < a.size) {
+		s = s + a[i] + a[i];
+		i = i + 1;
+	}
+	f[3] = 2.5;
+	g[2] = s;
+	avg = f[3] * 2.0;
+	return s + g[2];
+}
+''',
+	'redundant': '''
+int g;
+int bump(int n) {
+	g = g + n;
+	return g;
+}
+int main(void) {
+	int a[];
+	int i;
+	int x;
+	int y;
+	int t;
+	a = new int[10];
+	i = 0;
+	while (i < 10) {
+		a[i] = i * 3;
+		i = i + 1;
+	}
+	i = 4;
+	x = a[i] + a[i];
+	a[i] = 100;
+	x = x + a[i] + a[i];
+	y = 7;
+	t = x * y + x * y;
+	x = 1;
+	t = t + x * y;
+	g = 5;
+	t = t + g;
+	t = t + bump(2);
+	t = t + g;
+	if (t > 10) {
+		t = t + x * y;
+	}
+	return t + x * y;
+}
+''',
+	'invariants': '''
+int scale;
+int kernel(int a[], int n, int stride) {
+	int i;
+	int j;
+	int s;
+	int lim;
+	s = 0;
+	i = 0;
+	while (i < n) {
+		j = 0;
+		lim = n * stride;
+		while (j < a.size) {
+			s = s + a[j] * (n * stride + lim) + scale / stride;
+			j = j + stride * 2;
+		}
+		i = i + 1;
+	}
+	return s;
+}
+int main(void) {
+	int a[];
+	int k;
+	a = new int[50];
+	k = 0;
+	while (k < a.size) {
+		a[k] = k;
+		k = k + 1;
+	}
+	scale = 90;
+	return kernel(a, 20, 3) + kernel(a, 10, 0 + 1);
+}
+''',
+	'helpers': '''
+int g;
+int a[];
+int r1;
+float r2;
+int sq(int x) { return x * x; }
+int get(int i) { return a[i]; }
+int clamp(int x, int lo, int hi) {
+	if (x < lo) { return lo; }
+	if (x > hi) { return hi; }
+	return x;
+}
+int twice(int x) { return sq(x) + sq(x); }
+int bump(void) { g = g + 1; return g; }
+float half(float f) { return f / 2.0; }
+int fact(int n) { if (n < 2) { return 1; } return n * fact(n - 1); }
+int main(void) {
+	int i;
+	int j;
+	int k;
+	int s;
+	a = new int[20];
+	i = 0;
+	while (i < 20) { a[i] = i * 3; i = i + 1; }
+	s = 0;
+	j = 0;
+	k = 0;
+	i = 0;
+	while (i < 300) {
+		s = s + sq(get(j)) + clamp(i, 10, 50) + twice(k);
+		j = j + 1;
+		if (j == 20) { j = 0; }
+		k = k + 1;
+		if (k == 7) { k = 0; }
+		i = i + 1;
+	}
+	r2 = half(5.0);
+	r1 = fact(10);
+	g = 5;
+	return s + bump() + g;
+}
+''',
+}
+
+def print_program():
+	'''
+	Imprime 0..4, un float y un char, y retorna 5
+	'''
+	function = Function('__minic_main', [], 'I')
+	function.code = [
+		('ALLOCI', 'i'),
+		('LABEL', 'L1'),
+		('LOADI', 'i', 'R1'),
+		('MOVI', 5, 'R2'),
+		('CMPI', '<', 'R1', 'R2', 'R3'),
+		('CBRANCH', 'R3', 'L2', 'L3'),
+		('LABEL', 'L2'),
+		('LOADI', 'i', 'R4'),
+		('PRINTI', 'R4'),
+		('MOVI', 1, 'R5'),
+		('ADDI', 'R4', 'R5', 'R6'),
+		('STOREI', 'R6', 'i'),
+		('BRANCH', 'L1'),
+		('LABEL', 'L3'),
+		('MOVF', 2.5, 'R7'),
+		('PRINTF', 'R7'),
+		('MOVB', 65, 'R8'),
+		('PRINTB', 'R8'),
+		('LOADI', 'i', 'R9'),
+		('RET', 'R9'),
+	]
+	function.register_count = 9
+	return [function]
+
+IR_PROGRAMS = {
+	'print': print_program,
+}
+
+NAMES = sorted(PROGRAMS) + sorted(IR_PROGRAMS)
+
+Outcome = namedtuple('Outcome', ['result', 'globals', 'output'])
+
+def compile_program(name, optimize=False):
+	'''
+	Retorna una lista nueva de ircode.Function para el programa name
+	'''
+	if name in IR_PROGRAMS:
+		return IR_PROGRAMS[name]()
+	clear_errors()
+	code = compile_ircode(PROGRAMS[name], optimize=optimize)
+	assert code and not errors_reported(), name
+	return code
+
+def outcome(functions, interpreter):
+	'''
+	Ejecuta functions con interpreter (creado con output=CaptureSink())
+	'''
+	result = interpreter.execute(functions)
+	return Outcome(result, [repr(value) for value in interpreter.globals], interpreter.output.getvalue())
+
+def interpreters():
+	'''
+	El intérprete base con y sin superinstrucciones y quickening
+	'''
+	return [Interpreter(output=CaptureSink()),
+		Interpreter(output=CaptureSink(), superinstructions=False, quickening=False)]
+
+@lru_cache(maxsize=None)
+def reference(name):
+	'''
+	Outcome de referencia del programa name
+	'''
+	interpreter = Interpreter(output=CaptureSink(), superinstructions=False, quickening=False)
+	return outcome(compile_program(name), interpreter)
+
+def assert_same(name, functions):
+	'''
+	functions (el programa name transformado) da el Outcome de
+	referencia en el intérprete base
+	'''
+	for interpreter in interpreters():
+		assert outcome(functions, interpreter) == reference(name)
+
+def transformed(name, transform, optimize=False):
+	'''
+	Compila name y aplica transform a cada una de sus funciones
+	'''
+	code = compile_program(name, optimize)
+	for function in code:
+		transform(function)
+	return code
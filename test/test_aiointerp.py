@@ -0,0 +1,119 @@
+# test/test_aiointerp.py
+import asyncio
+
+import pytest
+
+from ircode import compile_ircode
+from aiointerp import AsyncInterpreter, run_programs
+from output import AsyncSink, AsyncStreamSink
+from support import NAMES, Outcome, compile_program, reference
+from test_interp import LOOP
+
+@pytest.mark.parametrize('name', NAMES)
+def test_same_as_interpreter(name):
+	# Cede el control muy seguido, también dentro de llamadas anidadas
+	interpreter = AsyncInterpreter(yield_every=7)
+	result = asyncio.run(interpreter.execute_async(compile_program(name)))
+	got = Outcome(result, [repr(value) for value in interpreter.globals], interpreter.output.getvalue())
+	assert got == reference(name)
+	assert interpreter.yields > 0
+
+def test_programs_run_concurrently():
+	results = asyncio.run(run_programs([compile_program(name) for name in NAMES], yield_every=50))
+	assert results == [(reference(name).result, reference(name).output) for name in NAMES]
+
+def test_programs_interleave():
+	order = [ ]
+	async def run(name):
+		async def emit(text):
+			order.append((name, text))
+		interpreter = AsyncInterpreter(yield_every=1, output=AsyncSink(emit))
+		await interpreter.execute_async(LOOP)
+
+	async def both():
+		await asyncio.gather(run('a'), run('b'))
+
+	asyncio.run(both())
+	# La salida se entrega cada vez que un programa cede el control
+	assert [text for name, text in order if name == 'a'] == ['0\n', '2\n', '4\n']
+	assert [name for name, text in order] == ['a', 'b'] * 3
+
+class Writer(object):
+	'''
+	Imita un asyncio.StreamWriter
+	'''
+	def __init__(self):
+		self.data = b''
+		self.drains = 0
+
+	def write(self, data):
+		self.data += data
+
+	async def drain(self):
+		self.drains += 1
+
+def test_stream_sink():
+	writer = Writer()
+	interpreter = AsyncInterpreter(yield_every=1, output=AsyncStreamSink(writer))
+	asyncio.run(interpreter.execute_async(LOOP))
+	assert writer.data == b'0\n2\n4\n'
+	assert writer.drains == 3
+
+DEEP = '''
+int down(int n) {
+	if (n == 0) { return 0; }
+	return down(n - 1) + 1;
+}
+int main(void) {
+	return down(50000);
+}
+'''
+
+def test_deep_recursion_does_not_use_python_stack():
+	# Interpreter no llega a esta profundidad: se agota la pila de C
+	interpreter = AsyncInterpreter()
+	assert asyncio.run(interpreter.execute_async(compile_ircode(DEEP))) == 50000
+	assert interpreter.yields > 0
+
+FAILING = '''
+int f(int n) {
+	int z;
+	z = 0;
+	if (n == 0) { return 1 / z; }
+	return f(n - 1);
+}
+int main(void) {
+	int t;
+	t = f(4);
+	return t;
+}
+'''
+
+def test_frames_returned_on_error():
+	interpreter = AsyncInterpreter(yield_every=3)
+	saved = interpreter.function, interpreter.registers, interpreter.vars, interpreter.slots
+	with pytest.raises(ZeroDivisionError):
+		asyncio.run(interpreter.execute_async(compile_ircode(FAILING)))
+	# Los cinco niveles de f y el de main vuelven vacíos a sus funciones
+	frames = interpreter.functions['f'].frames
+	assert len(frames) == 5
+	assert len(interpreter.functions['__minic_main'].frames) == 1
+	assert all(set(frame.vars) == {None} for frame in frames)
+	assert (interpreter.function, interpreter.registers, interpreter.vars, interpreter.slots) == saved
+
+SPIN = FAILING.replace('return 1 / z;', 'while (z < 1000000) { z = z + 1; } return z;')
+
+def test_frames_returned_on_cancel():
+	interpreter = AsyncInterpreter(yield_every=5)
+	async def cancel():
+		task = asyncio.ensure_future(interpreter.execute_async(compile_ircode(SPIN)))
+		# Cancela dentro del ciclo, con cinco llamadas a f en la pila
+		while interpreter.yields < 100:
+			await asyncio.sleep(0)
+		task.cancel()
+		with pytest.raises(asyncio.CancelledError):
+			await task
+	asyncio.run(cancel())
+	assert len(interpreter.functions['f'].frames) == 5
+	assert len(interpreter.functions['__minic_main'].frames) == 1
+	assert interpreter.function is None
@@ -0,0 +1,104 @@
+# test/test_arrays.py
+from array import array
+
+import pytest
+
+from ircode import Function, compile_ircode
+from interp import Interpreter, new_array
+from pycompile import CompiledProgram
+
+def test_new_array():
+	assert new_array('I', 3) == array('q', [0, 0, 0])
+	assert new_array('F', 2) == array('d', [0.0, 0.0])
+	assert new_array('B', 4) == bytearray(4)
+	assert len(new_array('I', 0)) == 0
+
+SOURCE = '''
+int gi[];
+float gf[];
+int total;
+int main(void) {
+	int a[];
+	int n;
+	n = 5;
+	a = new int[n];
+	gi = new int[3];
+	gf = new float[n * 2];
+	a[4] = 7;
+	gi[0] = a[4] + a.size;
+	gf[9] = 2.5;
+	total = gf.size;
+	return a[4] * 100 + gi[0];
+}
+'''
+
+def run(interpreter, source=SOURCE):
+	return interpreter.execute(compile_ircode(source))
+
+@pytest.mark.parametrize('interpreter', [Interpreter(), Interpreter(superinstructions=False, quickening=False)])
+def test_typed_heap(interpreter):
+	assert run(interpreter) == 712
+	globals = {name: interpreter.globals[slot] for name, slot in interpreter.global_slots.items()}
+	assert globals['gi'] == array('q', [12, 0, 0])
+	assert globals['gf'].typecode == 'd' and globals['gf'][9] == 2.5
+	assert globals['total'] == 10
+
+def test_ir():
+	code = compile_ircode(SOURCE)[1].code
+	ops = {inst[0] for inst in code}
+	assert {'NEWI', 'NEWF', 'ALOADI', 'ASTOREI', 'ASTOREF', 'ASIZE'} <= ops
+	assert ('ALLOCI', 'a') in code
+
+def test_compiled_tier():
+	program = CompiledProgram(compile_ircode(SOURCE))
+	assert program.execute() == 712
+	assert program.globals[program.global_slots['gi']] == array('q', [12, 0, 0])
+
+BOUNDS = '''
+int main(void) {
+	int a[];
+	int i;
+	a = new int[3];
+	i = %s;
+	a[i] = 1;
+	return a[i];
+}
+'''
+
+@pytest.mark.parametrize('index', ['3', '0 - 1', '0 - 4'])
+def test_bounds(index):
+	code = compile_ircode(BOUNDS % index)
+	for interpreter in [Interpreter(), Interpreter(superinstructions=False, quickening=False)]:
+		with pytest.raises(IndexError):
+			interpreter.execute(code)
+	with pytest.raises(IndexError):
+		CompiledProgram(code).execute()
+
+def test_int_overflow():
+	# array('q') guarda enteros de 64 bits
+	with pytest.raises(OverflowError):
+		Interpreter().execute(compile_ircode(BOUNDS.replace('a[i] = 1', 'a[0] = 9223372036854775807 + 1') % '0'))
+
+def test_char_array():
+	function = Function('__minic_main', [ ], 'I')
+	function.code = [
+		('ALLOCB', 's'),
+		('MOVI', 3, 'R1'),
+		('NEWB', 'R1', 'R2'),
+		('STOREB', 'R2', 's'),
+		('MOVB', 65, 'R3'),
+		('MOVI', 2, 'R4'),
+		('ASTOREB', 'R3', 's', 'R4'),
+		('ALOADB', 's', 'R4', 'R5'),
+		('ASIZE', 's', 'R6'),
+		('ADDI', 'R5', 'R6', 'R7'),
+		('RET', 'R7'),
+	]
+	function.register_count = 7
+	interpreter = Interpreter()
+	assert interpreter.execute([function]) == 68
+	assert CompiledProgram([function]).execute() == 68
+	# Un char no cabe en más de un byte
+	function.code[4] = ('MOVB', 300, 'R3')
+	with pytest.raises(ValueError):
+		Interpreter().execute([function])
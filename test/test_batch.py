@@ -0,0 +1,81 @@
+# test/test_batch.py
+import sys
+import json
+
+from batch import find_programs, main, run_batch, run_program
+from support import PROGRAMS, reference
+
+def write_programs(directory):
+	(directory / 'calls.c').write_text(PROGRAMS['calls'])
+	(directory / 'loops.c').write_text(PROGRAMS['loops'])
+	(directory / 'broken.c').write_text('int main(void) { return ; ')
+	return find_programs(str(directory))
+
+def test_run_program(tmp_path):
+	broken, calls, loops = write_programs(tmp_path)
+	result = run_program(calls)
+	assert result['status'] == 'ok'
+	assert result['exit'] == reference('calls').result
+	assert run_program(broken)['status'] == 'compile-error'
+
+	result = run_program(loops, {'max_instructions': 1000})
+	assert result['status'] == 'limit'
+	assert result['limit']['limit'] == 'instructions'
+
+def test_run_batch_keeps_order(tmp_path):
+	paths = write_programs(tmp_path)
+	results = run_batch(paths, workers=2)
+	assert [result['path'] for result in results] == paths
+	statuses = {result['path'].rsplit('/', 1)[-1]: result['status'] for result in results}
+	assert statuses == {'broken.c': 'compile-error', 'calls.c': 'ok', 'loops.c': 'ok'}
+	assert [result['exit'] for result in results if result['status'] == 'ok'] == \
+		[reference('calls').result, reference('loops').result]
+
+def test_manifest(tmp_path):
+	write_programs(tmp_path)
+	(tmp_path / 'manifest.txt').write_text('# comentario\ncalls.c\n\nloops.c\n')
+	assert find_programs(str(tmp_path / 'manifest.txt')) == \
+		[str(tmp_path / 'calls.c'), str(tmp_path / 'loops.c')]
+
+RUNAWAY = '''
+int down(int n){
+	int t;
+	t = down(n + 1);
+	return t;
+}
+int main(void){
+	int t;
+	t = down(0);
+	return t;
+}
+'''
+
+OUT_OF_BOUNDS = '''
+int main(void){
+	int a[];
+	int i;
+	a = new int[2];
+	i = 5;
+	a[i] = 1;
+	return 0;
+}
+'''
+
+def test_errors_and_default_depth(tmp_path):
+	(tmp_path / 'runaway.c').write_text(RUNAWAY)
+	(tmp_path / 'bounds.c').write_text(OUT_OF_BOUNDS)
+	bounds, runaway = run_batch(find_programs(str(tmp_path)), workers=1)
+	assert bounds['status'] == 'error'
+	assert bounds['errors'].startswith('IndexError')
+	# Sin límite explícito, la recursión infinita se corta en MAX_DEPTH
+	assert runaway['status'] == 'limit'
+	assert runaway['limit']['limit'] == 'depth'
+
+def test_main_writes_json(tmp_path, monkeypatch):
+	write_programs(tmp_path)
+	target = tmp_path / 'results.json'
+	monkeypatch.setattr(sys, 'argv', ['batch', '--workers=1', f'--output={target}', str(tmp_path)])
+	main()
+	results = json.loads(target.read_text())['results']
+	assert [result['status'] for result in results] == ['compile-error', 'ok', 'ok']
+	assert all(set(result) >= {'path', 'exit', 'stdout', 'errors', 'compile', 'run'} for result in results)
@@ -0,0 +1,81 @@
+# test/test_calls.py
+from ircode import compile_ircode
+from interp import Interpreter, MAX_FREE_FRAMES
+
+SOURCE = '''
+int calls;
+int depth(int n) {
+	calls = calls + 1;
+	if (n == 0) { return 0; }
+	return depth(n - 1) + 1;
+}
+int fib(int n) {
+	if (n < 2) { return n; }
+	return fib(n - 1) + fib(n - 2);
+}
+int add(int a, int b) {
+	int s;
+	s = a + b;
+	return s;
+}
+int main(void) {
+	int x;
+	x = add(40, 2);
+	return x * 1000 + fib(10) + depth(5);
+}
+'''
+
+def run(source):
+	# Sin optimizar, para que inline no quite las llamadas
+	functions = compile_ircode(source, optimize=False)
+	assert functions
+	interpreter = Interpreter()
+	return interpreter, interpreter.execute(functions)
+
+def test_call_and_return():
+	interpreter, result = run(SOURCE)
+	assert result == 42000 + 55 + 5
+	assert interpreter.globals[interpreter.global_slots['calls']] == 6
+
+def test_parameters_in_first_slots():
+	interpreter, _ = run(SOURCE)
+	assert interpreter.functions['add'].slots == {'a': 0, 'b': 1, 's': 2}
+
+def test_frames_are_reused():
+	interpreter, _ = run(SOURCE)
+	add = interpreter.functions['add']
+	# Una función no recursiva deja un solo frame libre...
+	assert len(add.frames) == 1
+	frame = add.frames[0]
+	assert interpreter.call(add, (1, 2)) == 3
+	# ...que se reutiliza en la siguiente llamada
+	assert add.frames == [frame]
+	# Una recursiva deja uno por nivel de profundidad alcanzado
+	assert len(interpreter.functions['depth'].frames) == 6
+	assert len(interpreter.functions['fib'].frames) == 10
+
+def test_released_frames_are_empty():
+	interpreter, _ = run(SOURCE)
+	frame, = interpreter.functions['add'].frames
+	assert frame.vars == [None, None, None]
+	assert set(frame.registers) == {None}
+
+def test_free_frames_are_capped():
+	interpreter, result = run(SOURCE.replace('depth(5)', 'depth(100)'))
+	assert result == 42000 + 55 + 100
+	assert len(interpreter.functions['depth'].frames) == MAX_FREE_FRAMES
+
+def test_recursion_keeps_locals_per_frame():
+	_, result = run('''
+int f(int n) {
+	int mine;
+	int t;
+	mine = n * 10;
+	if (n > 0) { t = f(n - 1); }
+	return mine;
+}
+int main(void) {
+	return f(3);
+}
+''')
+	assert result == 30
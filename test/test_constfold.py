@@ -0,0 +1,92 @@
+# test/test_constfold.py
+import pytest
+
+from ircode import Function, compile_ircode
+from interp import Interpreter
+from constfold import fold_constants
+from support import compile_program
+
+def function_named(code, name):
+	return next(function for function in code if function.name == name)
+
+def test_folds_expressions_and_branches():
+	function = function_named(compile_program('constants'), 'k')
+	stats = fold_constants(function)
+	# a = 3 * 4 + 2; b = a - 4; if (b > 5) ...
+	assert ('MOVI', 14, 'R5') in function.code
+	assert ('MOVI', 10, 'R8') in function.code
+	assert stats['branches'] == 1
+	assert ('BRANCH', 'L2') in function.code
+	# x es un parámetro y a cambia dentro del while
+	assert ('LOADI', 'x', 'R12') in function.code
+	assert ('CBRANCH', 'R22', 'L5', 'L6') in function.code
+
+def test_calls_clobber_globals_only():
+	function = function_named(compile_program('constants'), '__minic_main')
+	fold_constants(function)
+	# N = 10 antes del ciclo, pero k() puede cambiarla; n es local
+	assert ('LOADI', 'N', 'R8') in function.code
+	assert ('MOVI', 4, 'R9') in function.code
+	assert ('MOVI', 8, 'R18') in function.code
+
+def test_only_executable_edges():
+	code = compile_ircode('''
+int main(void) {
+	int a;
+	int b;
+	a = 1;
+	if (a > 5) { a = 2; }
+	b = a + 1;
+	return b;
+}
+''', optimize=False)
+	fold_constants(code[1])
+	op_code, *args = code[1].code[-1]
+	assert op_code == 'RET'
+	assert ('MOVI', 2, args[0]) in code[1].code
+	assert not [inst for inst in code[1].code if inst[0] in ('LOADI', 'CBRANCH')]
+
+def test_division_by_zero_is_not_folded():
+	function = Function('__minic_main', [ ], 'I')
+	function.code = [
+		('MOVI', 1, 'R1'),
+		('MOVI', 0, 'R2'),
+		('DIVI', 'R1', 'R2', 'R3'),
+		('RET', 'R3'),
+	]
+	function.register_count = 3
+	stats = fold_constants(function)
+	assert stats['folded'] == 0
+	assert ('DIVI', 'R1', 'R2', 'R3') in function.code
+	with pytest.raises(ZeroDivisionError):
+		Interpreter().execute([function])
+
+def test_neg_and_not():
+	function = Function('__minic_main', [ ], 'I')
+	function.code = [
+		('MOVI', 4, 'R1'),
+		('NEGI', 'R1', 'R2'),
+		('NOT', 'R1', 'R3'),
+		('ADDI', 'R2', 'R3', 'R4'),
+		('RET', 'R4'),
+	]
+	function.register_count = 4
+	fold_constants(function)
+	assert function.code[1:4] == [('MOVI', -4, 'R2'), ('MOVI', 5, 'R3'), ('MOVI', 1, 'R4')]
+
+def test_neg_and_not_with_reused_registers():
+	# R2 y R3 tienen un valor constante antes del NEG y del NOT que los
+	# redefinen: ese valor no puede seguir propagándose
+	function = Function('__minic_main', [('x', 'I')], 'I')
+	function.code = [
+		('MOVI', 5, 'R2'),
+		('MOVI', 1, 'R3'),
+		('LOADI', 'x', 'R1'),
+		('NEGI', 'R1', 'R2'),
+		('NOT', 'R1', 'R3'),
+		('ADDI', 'R2', 'R3', 'R4'),
+		('RET', 'R4'),
+	]
+	function.register_count = 4
+	fold_constants(function)
+	assert ('ADDI', 'R2', 'R3', 'R4') in function.code
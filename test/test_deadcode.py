@@ -0,0 +1,67 @@
+# test/test_deadcode.py
+from ircode import Function, compile_ircode
+from constfold import fold_constants
+from deadcode import eliminate_dead_code
+from support import compile_program
+
+def test_removes_branch_not_taken():
+	function = next(function for function in compile_program('constants') if function.name == 'k')
+	fold_constants(function)
+	assert eliminate_dead_code(function)['unreachable'] > 0
+	assert not any(inst[0] == 'MOVI' and inst[1] == 1000 for inst in function.code)
+
+def test_removes_dead_stores_and_allocs():
+	code = compile_ircode('''
+int f(int y) {
+	int x;
+	int unused;
+	x = y * 3;
+	x = 4;
+	unused = x + 1;
+	return x;
+}
+int main(void) {
+	return f(2);
+}
+''', optimize=False)
+	function = next(function for function in code if function.name == 'f')
+	assert eliminate_dead_code(function)['dead'] > 0
+	assert ('ALLOCI', 'unused') not in function.code
+	assert not any(inst[0] == 'MULI' for inst in function.code)
+
+def test_threads_jumps_through_empty_blocks():
+	function = Function('__minic_main', [('x', 'I')], 'I')
+	function.code = [
+		('LOADI', 'x', 'R1'),
+		('CBRANCH', 'R1', 'L1', 'L2'),
+		('LABEL', 'L1'),
+		('BRANCH', 'L3'),
+		('LABEL', 'L2'),
+		('BRANCH', 'L3'),
+		('LABEL', 'L3'),
+		('RET', 'R1'),
+	]
+	function.register_count = 1
+	stats = eliminate_dead_code(function)
+	# Los dos destinos llevan a L3: el CBRANCH se vuelve un BRANCH y los
+	# bloques de paso desaparecen
+	assert stats['unreachable'] == 2
+	assert ('CBRANCH', 'R1', 'L1', 'L2') not in function.code
+	assert ('LABEL', 'L1') not in function.code and ('LABEL', 'L2') not in function.code
+
+def test_keeps_side_effects():
+	function = Function('__minic_main', [ ], 'I')
+	function.code = [
+		('MOVI', 1, 'R1'),
+		('MOVI', 0, 'R2'),
+		('DIVI', 'R1', 'R2', 'R3'),
+		('STOREI', 'R1', 'g'),
+		('PRINTI', 'R1'),
+		('NEWI', 'R1', 'R4'),
+		('CALL', 'f', 'R5'),
+		('ADDI', 'R1', 'R1', 'R6'),
+		('RET', 'R1'),
+	]
+	function.register_count = 6
+	assert eliminate_dead_code(function)['dead'] == 1
+	assert [inst[0] for inst in function.code] == ['MOVI', 'MOVI', 'DIVI', 'STOREI', 'PRINTI', 'NEWI', 'CALL', 'RET']
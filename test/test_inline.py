@@ -0,0 +1,70 @@
+# test/test_inline.py
+import pytest
+
+from ircode import get_registers
+from inline import Inliner, format_decisions, inline_functions
+from optimize import optimize_program, format_report
+from support import NAMES, assert_same, compile_program
+
+@pytest.mark.parametrize('max_depth', [1, 3])
+@pytest.mark.parametrize('name', NAMES)
+def test_same_result(name, max_depth):
+	code = compile_program(name)
+	inline_functions(code, max_depth=max_depth)
+	assert_same(name, code)
+
+def decisions(name, **options):
+	return {(caller, callee, depth): decision
+		for caller, callee, depth, decision in Inliner(compile_program(name), **options).run()}
+
+def test_decisions():
+	found = decisions('helpers')
+	assert found['__minic_main', 'sq', 1] == 'expandida'
+	assert found['__minic_main', 'fact', 1] == 'recursiva'
+	assert found['twice', 'sq', 1] == 'expandida'
+	assert found['__minic_main', 'sq', 2] == 'expandida'
+
+def test_max_depth():
+	found = decisions('helpers', max_depth=1)
+	assert found['__minic_main', 'twice', 1] == 'expandida'
+	assert found['__minic_main', 'sq', 2].startswith('profundidad')
+
+def test_max_size():
+	code = compile_program('helpers')
+	stats = inline_functions(code, max_size=0)
+	assert stats['inlined'] == 0 and stats['kept'] > 0
+	assert 'muy grande' in format_decisions(Inliner(compile_program('helpers'), max_size=0).run())
+
+def test_removes_calls():
+	code = compile_program('calls')
+	assert inline_functions(code)['inlined'] == 1
+	main = next(function for function in code if function.name == '__minic_main')
+	assert not any(inst[0] == 'CALL' for inst in main.code)
+
+def test_stats_decisions():
+	stats = optimize_program(compile_program('helpers'), ['inline'])['inline']
+	assert stats['decisions'] == Inliner(compile_program('helpers')).run()
+	assert stats['inlined'] + stats['kept'] == len(stats['decisions'])
+	report = format_report({'inline': stats}).splitlines()
+	assert report[0] == f'inline       inlined={stats["inlined"]}, kept={stats["kept"]}'
+	assert report[1:] == [f'    {line}' for line in format_decisions(stats['decisions']).splitlines()]
+
+def test_not_a_default_pass():
+	main = compile_program('calls', optimize=True)[-1]
+	assert any(inst[0] == 'CALL' for inst in main.code)
+
+def test_spliced_body():
+	code = compile_program('calls')
+	main = code[-1]
+	before = main.register_count
+	inline_functions(code)
+	start = main.code.index(('ALLOCI', 'x_i1'))
+	end = main.code.index(('LABEL', 'sq_fin_i1'))
+	body = main.code[start:end]
+	# El parámetro recibe el argumento; y pasa a ser una local nueva
+	assert body[:3] == [('ALLOCI', 'x_i1'), ('STOREI', 'R7', 'x_i1'), ('ALLOCI', 'y_i1')]
+	# El RET copia el resultado al destino del CALL y salta al final
+	assert body[-2:] == [('COPYI', 'R21', 'R8'), ('BRANCH', 'sq_fin_i1')]
+	# Los registros de sq se numeran después de los de main
+	registers = {reg for inst in body for regs in get_registers(inst) for reg in regs} - {'R7', 'R8'}
+	assert registers == {f'R{n}' for n in range(before + 1, main.register_count + 1)}
@@ -0,0 +1,177 @@
+# test/test_interp.py
+import sys
+
+import pytest
+
+import interp
+from ircode import compile_ircode
+from interp import Interpreter
+
+def test_decode_binds_handlers():
+	interpreter = Interpreter(quickening=False)
+	program, register_count = interpreter.decode([
+		('MOVI', 2, 'R1'),
+		('ADDI', 'R1', 'R1', 'R7'),
+		('VARI', 'R1'),
+		('STOREI', 'R7', 'R1'),
+	])
+	# Los registros pasan a ser posiciones; una variable llamada R1 no
+	assert [(handler.__func__, args) for handler, args in program] == [
+		(Interpreter.run_MOVI, (2, 1)),
+		(Interpreter.run_ADDI, (1, 1, 7)),
+		(Interpreter.run_VARI, ('R1',)),
+		(Interpreter.run_STOREI, (7, 'R1')),
+	]
+	assert all(handler.__self__ is interpreter for handler, _ in program)
+	assert register_count == 8
+
+def test_unknown_opcode_before_running(capsys):
+	with pytest.raises(RuntimeError, match='BOGUS'):
+		Interpreter().execute([
+			('MOVI', 1, 'R1'),
+			('PRINTI', 'R1'),
+			('BOGUS', 'R1'),
+		])
+	assert capsys.readouterr().out == ''
+
+def test_execute(capsys):
+	Interpreter().execute([
+		('VARI', 'x'),
+		('VARF', 'f'),
+		('MOVI', 7, 'R1'),
+		('MOVI', 2, 'R2'),
+		('ADDI', 'R1', 'R2', 'R3'),
+		('MULI', 'R3', 'R2', 'R4'),
+		('SUBI', 'R4', 'R1', 'R5'),
+		('DIVI', 'R5', 'R2', 'R6'),
+		('STOREI', 'R6', 'x'),
+		('LOADI', 'x', 'R7'),
+		('PRINTI', 'R7'),
+		('MOVF', 1.0, 'R8'),
+		('MOVF', 4.0, 'R9'),
+		('DIVF', 'R8', 'R9', 'R10'),
+		('STOREF', 'R10', 'f'),
+		('LOADF', 'f', 'R11'),
+		('PRINTF', 'R11'),
+		('MOVB', 65, 'R12'),
+		('PRINTB', 'R12'),
+	])
+	assert capsys.readouterr().out == '5\n0.25\nA'
+
+def test_registers_per_function():
+	functions = compile_ircode('''
+int g;
+int f(int x) {
+	return x * 2 + 1;
+}
+int main(void) {
+	int y;
+	y = 3;
+	return y + 4;
+}
+''', optimize=False)
+	for function in functions:
+		registers = {int(arg[1:]) for inst in function.code for arg in inst[1:]
+			if isinstance(arg, str) and arg[:1] == 'R' and arg[1:].isdigit()}
+		assert registers == set(range(1, function.register_count + 1)), function.name
+	assert [function.register_count > 0 for function in functions] == [False, True, True]
+
+# Suma 0..4 con un salto hacia atrás (el ciclo) y uno hacia adelante
+# (el if que salta el PRINT de los impares)
+LOOP = [
+	('VARI', 'i'),
+	('LABEL', 'L1'),
+	('LOADI', 'i', 'R1'),
+	('MOVI', 5, 'R2'),
+	('CMPI', '<', 'R1', 'R2', 'R3'),
+	('CBRANCH', 'R3', 'L2', 'L4'),
+	('LABEL', 'L2'),
+	('MOVI', 1, 'R4'),
+	('ANDI', 'R1', 'R4', 'R5'),
+	('CBRANCH', 'R5', 'L3', 'L5'),
+	('LABEL', 'L5'),
+	('PRINTI', 'R1'),
+	('LABEL', 'L3'),
+	('ADDI', 'R1', 'R4', 'R6'),
+	('STOREI', 'R6', 'i'),
+	('BRANCH', 'L1'),
+	('LABEL', 'L4'),
+]
+
+def test_label_table():
+	program, _ = Interpreter().decode(LOOP)
+	assert len(program) == len(LOOP) - sum(inst[0] == 'LABEL' for inst in LOOP)
+	handler, args = program[4]
+	assert handler.__func__ is Interpreter.run_CBRANCH
+	# L2 es la instrucción siguiente; L4 (el final) es len(program)
+	assert args == (3, 5, len(program))
+	handler, args = program[-1]
+	assert handler.__func__ is Interpreter.run_BRANCH and args == (1,)
+
+def test_forward_and_backward_jumps(capsys):
+	Interpreter().execute(LOOP)
+	assert capsys.readouterr().out == '0\n2\n4\n'
+
+def test_unknown_label():
+	with pytest.raises(KeyError):
+		Interpreter().decode([('BRANCH', 'L9')])
+
+def test_while_and_break():
+	function = compile_ircode('''
+int main(void) {
+	int i;
+	i = 0;
+	while (i < 10) {
+		if (i == 3) { break; }
+		i = i + 1;
+	}
+	return i;
+}
+''', optimize=False)[1]
+	code = function.code
+	top = next(inst[1] for inst in code if inst[0] == 'LABEL')
+	_, _, body, exit = next(inst for inst in code if inst[0] == 'CBRANCH')
+	# La condición se evalúa arriba, el cuerpo vuelve a ella y el break
+	# salta a la salida, que va después del salto hacia atrás
+	assert code.index(('LABEL', top)) < code.index(('LABEL', body)) < code.index(('BRANCH', top))
+	assert code.count(('BRANCH', exit)) == 1
+	assert code.index(('BRANCH', top)) < code.index(('LABEL', exit))
+
+@pytest.mark.parametrize('flags', [
+	['--tier=jit'],
+	['--tier=python', '--profile'],
+	['--tier=python', '--stats'],
+	['--tier=python', '--max-instructions=10'],
+	['--tier=tiered', '--profile-json=perfil.json'],
+	['--passes=inline,nada'],
+	['--no-optimize', '--passes=inline'],
+])
+def test_rejected_flags(flags, tmp_path, monkeypatch, capsys):
+	monkeypatch.chdir(tmp_path)
+	source = tmp_path / 'prog.c'
+	source.write_text('int main(void) { return 0; }\n')
+	monkeypatch.setattr(sys, 'argv', ['interp', *flags, str(source)])
+	with pytest.raises(SystemExit) as info:
+		interp.main()
+	assert info.value.code == 1
+	assert capsys.readouterr().out == ''
+
+def test_stats_report(tmp_path, monkeypatch, capsys):
+	source = tmp_path / 'prog.c'
+	source.write_text('''
+int sq(int x){
+	return x * x;
+}
+int main(void){
+	int y;
+	y = sq(7);
+	return y;
+}
+''')
+	monkeypatch.setattr(sys, 'argv', ['interp', '--stats', '--passes=inline,constfold', str(source)])
+	interp.main()
+	lines = capsys.readouterr().err.splitlines()
+	# El reporte de los pases va antes de las estadísticas de quickening
+	assert lines[0].startswith('inline       inlined=1, kept=0')
+	assert lines[1].split() == ['__minic_main', '->', 'sq', 'profundidad', '1:', 'expandida']
+	assert lines[2].startswith('constfold    ')
@@ -0,0 +1,72 @@
+# test/test_irencode.py
+import pytest
+
+from ircode import Function
+from irencode import decode, encode, tuple_nbytes
+from output import CaptureSink
+from pycompile import CompiledProgram
+from tiered import TieredInterpreter
+from support import NAMES, assert_same, compile_program, reference
+
+def same_code(functions, decoded):
+	'''
+	Compara con repr para distinguir 1, 1.0 y True, y 0.0 de -0.0
+	'''
+	assert [repr(function) for function in decoded] == [repr(function) for function in functions]
+	for function, copy in zip(functions, decoded):
+		assert [repr(inst) for inst in copy.code] == [repr(inst) for inst in function.code]
+		assert copy.register_count == function.register_count
+
+@pytest.mark.parametrize('optimize', [False, True])
+@pytest.mark.parametrize('name', NAMES)
+def test_round_trip(name, optimize):
+	code = compile_program(name, optimize)
+	same_code(code, decode(encode(code)))
+
+@pytest.mark.parametrize('optimize', [False, True])
+@pytest.mark.parametrize('name', NAMES)
+def test_execute_encoded(name, optimize):
+	assert_same(name, encode(compile_program(name, optimize)))
+
+@pytest.mark.parametrize('make', [CompiledProgram, TieredInterpreter])
+def test_other_tiers(make):
+	code = encode(compile_program('fib', optimize=True))
+	if make is CompiledProgram:
+		assert make(code, CaptureSink()).execute() == reference('fib').result
+	else:
+		assert make(hot_calls=2, output=CaptureSink()).execute(code) == reference('fib').result
+
+def test_decodes_once():
+	program = encode(compile_program('calls'))
+	function = program[-1]
+	assert function.code is function.code
+	assert list(function.code) == list(function)
+	# decode() entrega una lista propia que se puede modificar
+	copy = function.decode()
+	copy.code.append(('RET',))
+	assert len(copy.code) == len(function.code) + 1
+
+def test_readable_repr():
+	code = compile_program('calls')
+	text = repr(encode(code)).splitlines()
+	assert text[0].startswith('; ')
+	assert text[1:] == [line for function in code
+		for line in [f'{"::"*5} {function} {"::"*5}'] + [f'    {inst}' for inst in function.code]]
+
+def test_constants_keep_their_type():
+	function = Function('f', [('x', 'I')], 'F')
+	function.code = [
+		('MOVF', 0.0, 'R1'),
+		('MOVF', -0.0, 'R2'),
+		('MOVI', 1, 'R3'),
+		('MOVF', 1.0, 'R4'),
+		('MOVB', True, 'R5'),
+		('CALL', 'g', 'R1', 'R2', 'R6'),
+		('RET', 'R2'),
+	]
+	function.register_count = 6
+	same_code([function], decode(encode([function])))
+
+def test_smaller_than_tuples():
+	code = compile_program('helpers')
+	assert encode(code).nbytes() < tuple_nbytes(code)
@@ -0,0 +1,69 @@
+# test/test_lanes.py
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from ircode import compile_ircode
+from interp import Interpreter
+from lanes import LaneExecutor, run_lanes
+from output import CaptureSink
+from support import compile_program
+
+NUMERIC = '''
+int collatz(int n) {
+	int steps;
+	steps = 0;
+	while (n > 1) {
+		if (n == (n / 2) * 2) {
+			n = n / 2;
+		} else {
+			n = 3 * n + 1;
+		}
+		steps = steps + 1;
+	}
+	return steps;
+}
+int sign(int x, bool flip) {
+	int s;
+	s = 0;
+	if (x > 0) { s = 1; }
+	if (x < 0) { s = -1; }
+	if (!flip) { return s; }
+	return -s;
+}
+int main(void) {
+	return collatz(27);
+}
+'''
+
+def interpreted(code, name, *arguments):
+	'''
+	Resultado de llamar name con el intérprete base, una entrada a la vez
+	'''
+	interpreter = Interpreter(output=CaptureSink())
+	interpreter.load(code)
+	return [interpreter.call(interpreter.functions[name], args) for args in zip(*arguments)]
+
+def test_collatz():
+	code = compile_ircode(NUMERIC)
+	ns = np.arange(1, 200)
+	assert list(run_lanes(code, 'collatz', ns)) == interpreted(code, 'collatz', ns.tolist())
+
+def test_branches_and_not():
+	# Las lanes que ya retornaron no siguen al RET de más abajo
+	code = compile_ircode(NUMERIC)
+	xs = [-5, 0, 7, -1, 3, 0]
+	flips = [0, 1, 1, 0, 0, 1]
+	assert list(run_lanes(code, 'sign', xs, flips)) == interpreted(code, 'sign', xs, flips)
+
+def test_floats():
+	code = compile_program('floats')
+	xs = [-3.0, -0.5, 0.0, 1.25, 4.0]
+	ks = [0, 1, 2, 3, 4]
+	assert list(run_lanes(code, 'poly', xs, ks)) == interpreted(code, 'poly', xs, ks)
+
+def test_rejects_unsupported_instructions():
+	code = compile_program('calls')
+	main = next(function for function in code if function.name == '__minic_main')
+	with pytest.raises(RuntimeError):
+		LaneExecutor(main)
@@ -0,0 +1,74 @@
+# test/test_licm.py
+from ircode import compile_ircode
+from licm import hoist_invariants
+from support import compile_program
+
+def kernel():
+	function = next(function for function in compile_program('invariants') if function.name == 'kernel')
+	return function, hoist_invariants(function)
+
+def block_of(function, inst):
+	'''
+	Rotulo del bloque que contiene inst (None antes del primer rotulo)
+	'''
+	label = None
+	for other in function.code:
+		if other[0] == 'LABEL':
+			label = other[1]
+		elif other == inst:
+			return label
+	raise AssertionError(f'{inst} no está en {function.name}')
+
+def test_hoists_from_nested_loops():
+	function, stats = kernel()
+	assert stats == {'hoisted': 23, 'loops': 2}
+	# n * stride sale de los dos ciclos, incluido el del ciclo interno
+	assert block_of(function, ('MULI', 'R7', 'R8', 'R9')) is None
+	assert block_of(function, ('MULI', 'R16', 'R17', 'R18')) is None
+	# stride * 2 sale con la constante que lee; el + 1 de i no
+	assert block_of(function, ('MOVI', 2, 'R29')) is None
+	assert block_of(function, ('MOVI', 1, 'R33')) == 'L6'
+	# scale es global pero el ciclo no llama a nadie
+	assert block_of(function, ('LOADI', 'scale', 'R23')) is None
+
+def test_keeps_what_the_loop_changes():
+	function, _ = kernel()
+	# lim se escribe en el ciclo externo: su LOAD solo sale del interno
+	assert block_of(function, ('LOADI', 'lim', 'R19')) == 'L2'
+	assert block_of(function, ('ADDI', 'R18', 'R19', 'R20')) == 'L2'
+	assert block_of(function, ('LOADI', 'j', 'R14')) == 'L5'
+
+def test_instructions_that_can_fail():
+	function, _ = kernel()
+	# a.size está en el encabezado del ciclo interno, pero no en el del
+	# externo; la división y a[j] no están en un encabezado
+	assert block_of(function, ('ASIZE', 'a', 'R11')) == 'L2'
+	assert block_of(function, ('DIVI', 'R23', 'R24', 'R25')) == 'L5'
+	assert block_of(function, ('ALOADI', 'a', 'R14', 'R15')) == 'L5'
+
+def test_calls_keep_global_loads():
+	code = compile_ircode('''
+int g;
+int h;
+int bump(void) {
+	g = g + 1;
+	return g;
+}
+int main(void) {
+	int i;
+	int s;
+	int t;
+	i = 0;
+	s = 0;
+	while (i < 5) {
+		t = bump();
+		s = s + g + h + t;
+		i = i + 1;
+	}
+	return s;
+}
+''', optimize=False)
+	function = code[2]
+	hoist_invariants(function)
+	loads = [inst for inst in function.code if inst[0] == 'LOADI' and inst[1] in ('g', 'h')]
+	assert loads and all(block_of(function, inst) is not None for inst in loads)
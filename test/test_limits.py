@@ -0,0 +1,98 @@
+# test/test_limits.py
+import pytest
+
+from ircode import compile_ircode
+from interp import Interpreter, ExecutionLimitExceeded
+from output import CaptureSink
+from profiler import ProfilingInterpreter
+from tiered import TieredInterpreter
+from support import NAMES, compile_program, reference
+
+GENEROUS = {'max_instructions': 10**8, 'time_limit': 60.0, 'max_allocated': 10**8, 'max_depth': 1000}
+
+def exceeded(name, **limits):
+	with pytest.raises(ExecutionLimitExceeded) as info:
+		Interpreter(output=CaptureSink()).execute(compile_program(name), **limits)
+	return info.value
+
+def test_instructions():
+	error = exceeded('loops', max_instructions=1000)
+	assert error.limit == 'instructions'
+	assert error.instructions > 1000
+
+def test_time():
+	assert exceeded('loops', time_limit=0.0).limit == 'time'
+
+def test_allocated():
+	error = exceeded('arrays', max_allocated=100)
+	assert error.limit == 'allocated'
+	assert error.allocated <= 100
+
+REALLOCATE = '''
+int main(void) {
+	int a[];
+	int i;
+	i = 0;
+	while (i < 10) {
+		a = new int[10];
+		i = i + 1;
+	}
+	return i;
+}
+'''
+
+def test_allocated_counts_every_array():
+	# Diez arreglos de 80 bytes, aunque solo uno está en uso a la vez
+	code = compile_ircode(REALLOCATE)
+	with pytest.raises(ExecutionLimitExceeded):
+		Interpreter(output=CaptureSink()).execute(code, max_allocated=799)
+	assert Interpreter(output=CaptureSink()).execute(code, max_allocated=800) == 10
+
+def test_depth():
+	assert exceeded('fib', max_depth=5).limit == 'depth'
+
+@pytest.mark.parametrize('name', NAMES)
+@pytest.mark.parametrize('make', [Interpreter, TieredInterpreter, ProfilingInterpreter])
+def test_generous_limits_same_result(name, make):
+	interpreter = make(output=CaptureSink())
+	result = interpreter.execute(compile_program(name), **GENEROUS)
+	assert result == reference(name).result
+	assert interpreter.output.getvalue() == reference(name).output
+
+def test_profile_with_limits():
+	plain = ProfilingInterpreter(output=CaptureSink())
+	plain.execute(compile_program('calls'))
+	limited = ProfilingInterpreter(output=CaptureSink())
+	limited.execute(compile_program('calls'), max_instructions=10**8)
+
+	profile = limited.as_dict()
+	assert sum(op['count'] for op in profile['opcodes'].values()) > 0
+	assert any(count for hits in profile['blocks'].values() for count in hits.values())
+	assert {op_code: op['count'] for op_code, op in profile['opcodes'].items()} == \
+		{op_code: op['count'] for op_code, op in plain.as_dict()['opcodes'].items()}
+	assert profile['blocks'] == plain.as_dict()['blocks']
+
+def test_profiler_counts_instructions_like_interpreter():
+	counts = [ ]
+	for make in (Interpreter, ProfilingInterpreter):
+		interpreter = make(output=CaptureSink())
+		interpreter.execute(compile_program('calls'), max_instructions=10**8)
+		counts.append(interpreter.executed_instructions())
+	assert counts[0] == counts[1]
+
+def test_limits_only_when_requested():
+	interpreter = Interpreter(output=CaptureSink())
+	interpreter.execute(compile_program('loops'))
+	assert interpreter.run.__func__ is Interpreter.run
+	assert interpreter.allocate.__func__ is Interpreter.allocate
+
+def test_exceeded_as_dict():
+	error = exceeded('loops', max_instructions=1000)
+	assert error.as_dict() == {'limit': 'instructions', 'instructions': error.instructions,
+		'elapsed': error.elapsed, 'allocated': 0}
+
+def test_tiered_does_not_promote_with_limits():
+	interpreter = TieredInterpreter(hot_calls=2, hot_loops=3, output=CaptureSink())
+	assert interpreter.execute(compile_program('fib'), max_instructions=10**8) == reference('fib').result
+	assert not any(function.compiled for function in interpreter.functions.values())
+	assert interpreter.executed_instructions() > 0
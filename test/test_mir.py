@@ -0,0 +1,75 @@
+# test/test_mir.py
+import json
+import struct
+import sys
+
+import pytest
+
+from ircode import Function
+from irencode import encode
+import interp
+from mir import HEADER, OPCODES_CHECKSUM, VERSION, dump_mir, load_mir, parse_mir, write_mir
+from support import NAMES, assert_same, compile_program
+
+@pytest.mark.parametrize('optimize', [False, True])
+@pytest.mark.parametrize('name', NAMES)
+def test_round_trip(name, optimize):
+	code = compile_program(name, optimize)
+	program = parse_mir(dump_mir(code))
+	assert [repr(function) for function in program] == [repr(function) for function in code]
+	for function, copy in zip(code, program):
+		assert [repr(inst) for inst in copy.code] == [repr(inst) for inst in function.code]
+		assert copy.register_count == function.register_count
+	assert_same(name, program)
+
+@pytest.mark.parametrize('name', NAMES)
+def test_write_and_load(name, tmp_path):
+	path = tmp_path / f'{name}.mir'
+	write_mir(compile_program(name), str(path))
+	assert_same(name, load_mir(str(path)))
+
+def test_dump_encoded_program():
+	code = compile_program('arrays')
+	assert dump_mir(encode(code)) == dump_mir(code)
+
+def test_constants():
+	function = Function('__minic_main', [ ], 'F')
+	function.code = [
+		('MOVI', 2**70, 'R1'),
+		('MOVI', -2**63, 'R2'),
+		('MOVF', -0.0, 'R3'),
+		('MOVB', False, 'R4'),
+		('MOVF', 1.0, 'R5'),
+		('RET', 'R3'),
+	]
+	function.register_count = 5
+	copy, = parse_mir(dump_mir([function]))
+	assert [repr(inst) for inst in copy.code] == [repr(inst) for inst in function.code]
+
+def corrupt(data, fmt, offset, value):
+	data = bytearray(data)
+	struct.pack_into(fmt, data, offset, value)
+	return bytes(data)
+
+@pytest.mark.parametrize('fmt, offset, value', [
+	('<4s', 0, b'MIX\0'),
+	('<H', 4, VERSION + 1),
+	('<H', 6, 1),
+	('<I', 8, OPCODES_CHECKSUM ^ 1),
+])
+def test_rejects_bad_header(fmt, offset, value):
+	data = corrupt(dump_mir(compile_program('calls')), fmt, offset, value)
+	with pytest.raises(ValueError):
+		parse_mir(data)
+
+def test_rejects_truncated():
+	with pytest.raises(ValueError):
+		parse_mir(dump_mir(compile_program('calls'))[:HEADER.size - 1])
+
+def test_interp_runs_mir(tmp_path, monkeypatch):
+	path = tmp_path / 'fib.mir'
+	write_mir(compile_program('fib', optimize=True), str(path))
+	target = tmp_path / 'perfil.json'
+	monkeypatch.setattr(sys, 'argv', ['interp', f'--profile-json={target}', str(path)])
+	interp.main()
+	assert json.loads(target.read_text())['functions']['fib']['calls'] == 1973
@@ -0,0 +1,101 @@
+# test/test_output.py
+import io
+import os
+
+import pytest
+
+from ircode import Function
+from interp import Interpreter
+from output import BufferedSink, FileDescriptorSink, CaptureSink
+from pycompile import CompiledProgram
+from tiered import TieredInterpreter
+
+class CountingStream(io.StringIO):
+	'''
+	Un StringIO que cuenta las llamadas a write()
+	'''
+	def __init__(self):
+		super().__init__()
+		self.writes = 0
+
+	def write(self, text):
+		self.writes += 1
+		return super().write(text)
+
+def test_buffered_sink():
+	stream = CountingStream()
+	sink = BufferedSink(stream, buffer_size=4)
+	sink.write('ab')
+	assert stream.getvalue() == ''
+	sink.write('cd')
+	assert stream.getvalue() == 'abcd'
+	sink.write('e')
+	sink.flush()
+	sink.flush()
+	assert stream.getvalue() == 'abcde'
+	assert stream.writes == 2
+
+def test_buffered_sink_default_stream(capsys):
+	sink = BufferedSink()
+	sink.write('hola\n')
+	assert capsys.readouterr().out == ''
+	sink.flush()
+	assert capsys.readouterr().out == 'hola\n'
+
+def test_file_descriptor_sink():
+	read_fd, write_fd = os.pipe()
+	try:
+		sink = FileDescriptorSink(write_fd, buffer_size=3)
+		sink.write('ñ')
+		sink.write('x\n')
+		sink.write('y')
+		assert os.read(read_fd, 100) == 'ñx\n'.encode('utf-8')
+		sink.flush()
+		assert os.read(read_fd, 100) == b'y'
+	finally:
+		os.close(read_fd)
+		os.close(write_fd)
+
+def test_capture_sink():
+	sink = CaptureSink()
+	sink.write('1\n')
+	sink.flush()
+	sink.write('A')
+	assert sink.getvalue() == '1\nA'
+
+def print_then_fail():
+	'''
+	Imprime 7, 2.5 y 'A' y luego divide por cero
+	'''
+	function = Function('__minic_main', [ ], 'I')
+	function.code = [
+		('MOVI', 7, 'R1'),
+		('PRINTI', 'R1'),
+		('MOVF', 2.5, 'R2'),
+		('PRINTF', 'R2'),
+		('MOVB', 65, 'R3'),
+		('PRINTB', 'R3'),
+		('MOVI', 0, 'R4'),
+		('DIVI', 'R1', 'R4', 'R5'),
+		('RET', 'R5'),
+	]
+	function.register_count = 5
+	return [function]
+
+@pytest.mark.parametrize('make', [Interpreter, TieredInterpreter])
+def test_interpreter_flushes_on_error(make):
+	stream = CountingStream()
+	interpreter = make(output=BufferedSink(stream))
+	with pytest.raises(ZeroDivisionError):
+		interpreter.execute(print_then_fail())
+	# Una sola escritura al final, aunque el programa falle
+	assert stream.getvalue() == '7\n2.5\nA'
+	assert stream.writes == 1
+
+def test_compiled_flushes_on_error():
+	stream = CountingStream()
+	program = CompiledProgram(print_then_fail(), BufferedSink(stream))
+	with pytest.raises(ZeroDivisionError):
+		program.execute()
+	assert stream.getvalue() == '7\n2.5\nA'
+	assert stream.writes == 1
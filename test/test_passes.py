@@ -0,0 +1,36 @@
+# test/test_passes.py
+'''
+Cada pase de optimize.PASSES y PROGRAM_PASSES, aplicado solo, no
+cambia el resultado, las globales ni la salida de ningún programa de
+prueba
+'''
+import pytest
+
+from optimize import PASSES, PROGRAM_PASSES, optimize_program, format_report
+from output import CaptureSink
+from pycompile import CompiledProgram
+from support import NAMES, assert_same, compile_program, reference, transformed
+
+@pytest.mark.parametrize('name', NAMES)
+@pytest.mark.parametrize('pass_name', sorted(PASSES))
+def test_pass_alone(pass_name, name):
+	assert_same(name, transformed(name, PASSES[pass_name]))
+
+@pytest.mark.parametrize('name', NAMES)
+@pytest.mark.parametrize('pass_name', sorted(PROGRAM_PASSES))
+def test_program_pass_alone(pass_name, name):
+	code = compile_program(name)
+	PROGRAM_PASSES[pass_name](code)
+	assert_same(name, code)
+
+@pytest.mark.parametrize('name', NAMES)
+def test_default_passes(name):
+	assert_same(name, compile_program(name, optimize=True))
+	program = CompiledProgram(compile_program(name, optimize=True), CaptureSink())
+	assert program.execute() == reference(name).result
+
+def test_report():
+	report = optimize_program(compile_program('constants'), ['constfold'])
+	assert list(report) == ['constfold']
+	assert report['constfold']['folded'] > 0
+	assert format_report(report).startswith('constfold    folded=')
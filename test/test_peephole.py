@@ -0,0 +1,65 @@
+# test/test_peephole.py
+import pytest
+
+from ircode import Function
+from interp import Interpreter
+from peephole import RULES, optimize_peephole
+from support import NAMES, assert_same, compile_program, transformed
+
+@pytest.mark.parametrize('rule', sorted(RULES))
+@pytest.mark.parametrize('name', NAMES)
+def test_each_rule(name, rule):
+	assert_same(name, transformed(name, lambda function: optimize_peephole(function, [rule])))
+
+def peephole(code, rules=None):
+	function = Function('f', [ ], 'I')
+	function.code = code
+	removed = optimize_peephole(function, rules)
+	return function.code, {name: count for name, count in removed.items() if count}
+
+def test_branch_next():
+	assert peephole([('BRANCH', 'L1'), ('LABEL', 'L1'), ('RET',)]) == \
+		([('LABEL', 'L1'), ('RET',)], {'branch-next': 1})
+
+def test_store_load():
+	code = [('MOVI', 2, 'R1'), ('STOREI', 'R1', 'x'), ('LOADI', 'x', 'R2'), ('RET', 'R2')]
+	assert peephole(code) == ([('MOVI', 2, 'R1'), ('STOREI', 'R1', 'x'), ('RET', 'R1')], {'store-load': 1})
+	# Con tipos distintos (o R2 definido dos veces) el LOAD se queda
+	code = [('MOVI', 2, 'R1'), ('STOREI', 'R1', 'x'), ('LOADI', 'x', 'R2'), ('MOVI', 3, 'R2'), ('RET', 'R2')]
+	assert peephole(code)[1] == { }
+
+def test_neg_and_not():
+	code = [
+		('LOADF', 'x', 'R1'),
+		('MOVF', 0.0, 'R2'),
+		('SUBF', 'R2', 'R1', 'R3'),
+		('LOADI', 'b', 'R4'),
+		('MOVI', 1, 'R5'),
+		('XOR', 'R5', 'R4', 'R6'),
+	]
+	assert peephole(code) == ([
+		('LOADF', 'x', 'R1'),
+		('NEGF', 'R1', 'R3'),
+		('LOADI', 'b', 'R4'),
+		('NOT', 'R4', 'R6'),
+	], {'neg': 1, 'not': 1})
+
+def test_neg_keeps_the_sign_of_zero():
+	function = Function('__minic_main', [ ], 'F')
+	function.code = [('MOVF', 0.0, 'R1'), ('NEGF', 'R1', 'R2'), ('RET', 'R2')]
+	function.register_count = 2
+	result = Interpreter().execute([function])
+	assert str(result) == '0.0'
+
+def test_add_zero_only_for_integers():
+	code = [('LOADI', 'x', 'R1'), ('MOVI', 0, 'R2'), ('ADDI', 'R2', 'R1', 'R3'), ('RET', 'R3')]
+	assert peephole(code) == ([('LOADI', 'x', 'R1'), ('RET', 'R1')], {'add-zero': 2})
+	code = [('LOADF', 'x', 'R1'), ('MOVF', 0.0, 'R2'), ('ADDF', 'R2', 'R1', 'R3'), ('RET', 'R3')]
+	assert peephole(code) == (code, { })
+
+def test_unary_program():
+	function = next(function for function in compile_program('unary') if function.name == '__minic_main')
+	removed = optimize_peephole(function)
+	assert removed['neg'] > 0 and removed['not'] > 0
+	assert any(inst[0] == 'NEGI' for inst in function.code)
+	assert any(inst[0] == 'NOT' for inst in function.code)
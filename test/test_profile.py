@@ -0,0 +1,110 @@
+# test/test_profile.py
+import json
+import sys
+
+import pytest
+
+import interp
+from ircode import compile_ircode
+from output import CaptureSink
+from profiler import ProfilingInterpreter, ENTRY_BLOCK
+from support import compile_program, outcome, reference
+
+# f se llama a sí misma y en cada nivel llama a g, que no llama a nadie
+RECURSIVE = '''
+int work(int n){
+	int i;
+	int s;
+	i = 0;
+	s = 0;
+	while (i < n) {
+		s = s + i;
+		i = i + 1;
+	}
+	return s;
+}
+int down(int n){
+	int t;
+	t = work(50);
+	if (n == 0) { return t; }
+	return t + down(n - 1);
+}
+int main(void){
+	return down(20);
+}
+'''
+
+def profile(source, **kwargs):
+	interpreter = ProfilingInterpreter(output=CaptureSink(), **kwargs)
+	result = interpreter.execute(compile_ircode(source))
+	return result, interpreter
+
+def test_same_result():
+	interpreter = ProfilingInterpreter(output=CaptureSink())
+	assert outcome(compile_program('floats'), interpreter) == reference('floats')
+
+def test_inclusive_and_exclusive_under_recursion():
+	result, interpreter = profile(RECURSIVE)
+	assert result == 21 * 1225
+	functions = interpreter.as_dict()['functions']
+	down = functions['down']
+	work = functions['work']
+	main = functions['__minic_main']
+	assert down['calls'] == 21
+	assert work['calls'] == 21
+
+	# El tiempo inclusivo de down cuenta solo la llamada más externa:
+	# no puede superar al de main, que la contiene
+	assert down['inclusive'] <= main['inclusive']
+	assert down['exclusive'] < down['inclusive']
+	assert down['inclusive'] == pytest.approx(down['exclusive'] + work['inclusive'], rel=1e-9)
+	assert work['inclusive'] == pytest.approx(work['exclusive'], rel=1e-9)
+	assert main['inclusive'] == pytest.approx(main['exclusive'] + down['inclusive'], rel=1e-9)
+
+@pytest.mark.parametrize('superinstructions', [True, False])
+def test_block_hits(superinstructions):
+	interpreter = ProfilingInterpreter(output=CaptureSink(), superinstructions=superinstructions)
+	interpreter.execute(compile_program('loops'))
+	profile = interpreter.as_dict()
+
+	# Ciclo externo de 60 vueltas con un ciclo interno de 60 vueltas.  Las
+	# superinstrucciones no mueven los rotulos.
+	assert profile['blocks']['__minic_main'] == {
+		ENTRY_BLOCK: 1,
+		'L1': 61, 'L2': 60,
+		'L4': 3660, 'L5': 3600, 'L6': 60,
+		'L3': 1,
+	}
+	opcodes = profile['opcodes']
+	if superinstructions:
+		assert opcodes['CMPVCBRI']['count'] == 3721
+		assert opcodes['ADDVCI']['count'] == 3660
+		assert 'CBRANCH' not in opcodes
+	else:
+		assert opcodes['CBRANCH']['count'] == 3721
+		assert opcodes['CMPI']['count'] == 3721
+	assert opcodes['BRANCH']['count'] == 3660
+
+def test_as_dict_and_report():
+	_, interpreter = profile(RECURSIVE)
+	profile_dict = interpreter.as_dict()
+	assert set(profile_dict) == {'opcodes', 'functions', 'blocks'}
+	assert profile_dict['opcodes']['CALL']['count'] == 42
+	# __minic_init está vacía y no tiene RET
+	assert profile_dict['opcodes']['RET']['count'] == 43
+	assert json.loads(json.dumps(profile_dict)) == profile_dict
+
+	report = interpreter.report().splitlines()
+	assert report[0] == 'Opcodes'
+	assert 'Funciones' in report
+	assert 'Bloques' in report
+	assert any(line.split()[:2] == ['down', '21'] for line in report)
+	assert any(line.split() == ['work', ENTRY_BLOCK, '21'] for line in report)
+
+def test_profile_json_option(tmp_path, monkeypatch):
+	source = tmp_path / 'recursive.c'
+	source.write_text(RECURSIVE)
+	target = tmp_path / 'perfil.json'
+	monkeypatch.setattr(sys, 'argv', ['interp', f'--profile-json={target}', str(source)])
+	interp.main()
+	assert json.loads(target.read_text())['functions']['down']['calls'] == 21
@@ -0,0 +1,118 @@
+# test/test_pycompile.py
+import pytest
+
+from ircode import Function, compile_ircode
+from interp import Interpreter
+from output import CaptureSink
+from pycompile import CompiledProgram, FunctionTranslator, find_global_slots
+from support import NAMES, Outcome, compile_program, reference
+
+def compiled_outcome(functions):
+	program = CompiledProgram(functions, CaptureSink())
+	result = program.execute()
+	return Outcome(result, [repr(value) for value in program.globals], program.output.getvalue())
+
+@pytest.mark.parametrize('name', NAMES)
+def test_same_as_interpreter(name):
+	assert compiled_outcome(compile_program(name)) == reference(name)
+
+def translate(name, function_name):
+	functions = compile_program(name)
+	function = next(function for function in functions if function.name == function_name)
+	return FunctionTranslator(function, find_global_slots(functions)).translate()
+
+def test_straight_line_code():
+	source = translate('fib', '__minic_main')
+	assert source.startswith('def f___minic_main():')
+	assert 'while' not in source and 'pc' not in source
+	assert 'R2 = f_fib(R1)' in source
+
+def test_locals_and_globals():
+	source = translate('calls', 'sq')
+	assert 'def f_sq(v_x):' in source
+	assert 'v_y = ' in source
+	source = translate('calls', '__minic_main')
+	# g es la única global: G[0]
+	assert 'G[0] = ' in source
+
+@pytest.mark.parametrize('optimize', [False, True])
+@pytest.mark.parametrize('name', NAMES)
+def test_structured_code(name, optimize):
+	functions = compile_program(name, optimize)
+	global_slots = find_global_slots(functions)
+	for function in functions:
+		source = FunctionTranslator(function, global_slots).translate()
+		assert 'pc' not in source
+
+def test_loops_and_branches():
+	source = translate('loops', '__minic_main').splitlines()
+	assert sum(line.strip() == 'while True:' for line in source) == 2
+	# El ciclo interno está dentro del externo
+	outer, inner = [line.index('w') for line in source if line.strip() == 'while True:']
+	assert inner > outer
+	assert any(line.strip() == 'break' for line in source)
+
+def irreducible():
+	'''
+	Un ciclo con dos entradas (A y B): no se puede escribir con while
+	'''
+	function = Function('__minic_main', [ ], 'I')
+	function.code = [
+		('MOVI', 0, 'R1'),
+		('MOVI', 1, 'R2'),
+		('MOVI', 5, 'R3'),
+		('CMPI', '<', 'R1', 'R2', 'R4'),
+		('CBRANCH', 'R4', 'A', 'B'),
+		('LABEL', 'A'),
+		('ADDI', 'R1', 'R2', 'R1'),
+		('LABEL', 'B'),
+		('ADDI', 'R1', 'R1', 'R1'),
+		('CMPI', '<', 'R1', 'R3', 'R4'),
+		('CBRANCH', 'R4', 'A', 'C'),
+		('LABEL', 'C'),
+		('RET', 'R1'),
+	]
+	function.register_count = 4
+	return [function]
+
+def test_dispatch_fallback():
+	source = FunctionTranslator(irreducible()[0], { }).translate()
+	assert 'pc = blocks[pc]()' in source
+	# 0 -> 1 -> 2 -> 3 -> 6
+	assert CompiledProgram(irreducible(), CaptureSink()).execute() == 6
+	assert Interpreter(output=CaptureSink()).execute(irreducible()) == 6
+
+# El break salta directo a la salida del ciclo y el return es otra salida
+EXITS = '''
+int f(int n) {
+	int s;
+	int c;
+	s = n;
+	c = 0;
+	while (c < 4) {
+		c = c + 1;
+		if (s > 21) { break; }
+		s = s * 2 + 1;
+		if (s > 50) { return s; }
+	}
+	s = s - 3;
+	return s;
+}
+int main(void) {
+	int a;
+	int b;
+	int d;
+	a = f(1);
+	b = f(10);
+	d = f(30);
+	return a * 10000 + b * 100 + d;
+}
+'''
+
+def test_loop_with_several_exits():
+	functions = compile_ircode(EXITS)
+	f = next(function for function in functions if function.name == 'f')
+	source = FunctionTranslator(f, { }).translate()
+	assert 'pc' not in source and 'break' in source
+	expected = Interpreter(output=CaptureSink()).execute(compile_ircode(EXITS))
+	assert CompiledProgram(functions, CaptureSink()).execute() == expected == 28 * 10000 + 40 * 100 + 27
@@ -0,0 +1,110 @@
+# test/test_quicken.py
+from ircode import Function, compile_ircode
+from interp import Interpreter
+
+def program(code, parameters=(), register_count=9):
+	function = Function('__minic_main', list(parameters), 'I')
+	function.code = code
+	function.register_count = register_count
+	return [function]
+
+# Un ciclo de 3 vueltas sobre una local y una global
+LOOP = [
+	('VARI', 'g'),
+	('ALLOCI', 'i'),
+	('LABEL', 'L1'),
+	('LOADI', 'i', 'R1'),
+	('MOVI', 3, 'R2'),
+	('CMPI', '<', 'R1', 'R2', 'R3'),
+	('CBRANCH', 'R3', 'L2', 'L3'),
+	('LABEL', 'L2'),
+	('MOVI', 1, 'R4'),
+	('ADDI', 'R1', 'R4', 'R5'),
+	('STOREI', 'R5', 'i'),
+	('LOADI', 'g', 'R6'),
+	('ADDI', 'R6', 'R1', 'R7'),
+	('STOREI', 'R7', 'g'),
+	('BRANCH', 'L1'),
+	('LABEL', 'L3'),
+	('LOADI', 'g', 'R8'),
+	('MOVI', 0, 'R9'),
+	('CMPI', '>', 'R8', 'R9', 'R9'),
+	('RET', 'R8'),
+]
+
+def test_specialized_handlers():
+	interpreter = Interpreter(superinstructions=False)
+	assert interpreter.execute(program(LOOP)) == 3
+	names = [handler.__name__ for handler, _ in interpreter.functions['__minic_main'].program]
+	assert names == [
+		'run_VARG', 'run_ALLOCL',
+		'run_LOADL', 'run_MOVI', 'run_CMPQ', 'run_CBRANCH',
+		'run_MOVI', 'run_ADDI', 'run_STOREL', 'run_LOADG', 'run_ADDI', 'run_STOREG', 'run_BRANCH',
+		'run_LOADG', 'run_MOVI', 'run_CMPQ', 'run_RET',
+	]
+	# Los operandos quedan resueltos: posición de la variable y operador
+	_, args = interpreter.functions['__minic_main'].program[2]
+	assert args == (0, 1)
+
+def test_stats():
+	interpreter = Interpreter(superinstructions=False)
+	interpreter.execute(program(LOOP))
+	# 17 instrucciones decodificadas; las 9 de variables y CMP se
+	# especializan una sola vez, aunque el ciclo las ejecute varias
+	assert (interpreter.decoded_count, interpreter.quickened_count) == (17, 9)
+	assert interpreter.quickening_stats() == 'quickening: 9 de 17 instrucciones (52.9%)'
+
+def test_only_executed_instructions():
+	code = LOOP[:3] + [('MOVI', 0, 'R1'), ('CBRANCH', 'R1', 'L2', 'L3'), ('LABEL', 'L2'),
+		('LOADI', 'g', 'R2'), ('STOREI', 'R2', 'i'), ('LABEL', 'L3'), ('RET', 'R1')]
+	interpreter = Interpreter(superinstructions=False)
+	interpreter.execute(program(code))
+	# El LOAD y el STORE de la rama que no se toma siguen sin especializar
+	assert interpreter.quickened_count == 2
+	names = [handler.__name__ for handler, _ in interpreter.functions['__minic_main'].program]
+	assert names.count('quicken') == 2
+
+def test_disabled():
+	interpreter = Interpreter(superinstructions=False, quickening=False)
+	assert interpreter.execute(program(LOOP)) == 3
+	assert interpreter.quickened_count == 0
+	assert 'quicken' not in [handler.__name__ for handler, _ in interpreter.functions['__minic_main'].program]
+
+def test_fused_globals_stay_generic():
+	code = compile_ircode('''
+int g;
+int main(void) {
+	int x;
+	x = 1;
+	g = x + 2;
+	x = x + g;
+	return x;
+}
+''', optimize=False)
+	interpreter = Interpreter()
+	assert interpreter.execute(code) == 4
+	names = [handler.__name__ for handler, _ in interpreter.functions['__minic_main'].program]
+	# x + 2 guardado en la global g no se especializa; x + g tampoco
+	assert 'run_ADDVCI' in names and 'run_ADDVVI' in names
+
+def test_type_change():
+	# b guarda un bool (CMP) y después un int (XOR con 1): el mismo LOAD,
+	# XOR y CBRANCH especializados ven los dos tipos
+	code = compile_ircode('''
+int main(void) {
+	bool b;
+	int i;
+	int n;
+	i = 0;
+	n = 0;
+	b = i < 0;
+	while (i < 5) {
+		b = !b;
+		if (b) { n = n + 1; }
+		i = i + 1;
+	}
+	return n;
+}
+''')
+	for interpreter in [Interpreter(), Interpreter(superinstructions=False, quickening=False)]:
+		assert interpreter.execute(code) == 3
@@ -0,0 +1,68 @@
+# test/test_regalloc.py
+import pytest
+
+from ircode import Function, get_registers
+from regalloc import allocate_registers
+from superinst import fuse_code
+from interp import Interpreter
+from optimize import DEFAULT_PASSES
+from support import NAMES, compile_program
+
+def main_function(name):
+	return next(function for function in compile_program(name) if function.name == '__minic_main')
+
+def test_reuses_registers():
+	function = main_function('loops')
+	before = function.register_count
+	stats = allocate_registers(function)
+	assert stats == {'registers': before, 'slots': function.register_count}
+	assert function.register_count < before
+	registers = {reg for inst in function.code for regs in get_registers(inst) for reg in regs}
+	assert registers == {f'R{n}' for n in range(1, function.register_count + 1)}
+
+@pytest.mark.parametrize('name', NAMES)
+def test_last_default_pass(name):
+	assert DEFAULT_PASSES[-1] == 'regalloc'
+	plain = compile_program(name)
+	optimized = compile_program(name, optimize=True)
+	assert max(f.register_count for f in optimized) <= max(f.register_count for f in plain)
+
+def test_live_values_get_different_registers():
+	function = Function('__minic_main', [ ], 'I')
+	function.code = [
+		('MOVI', 1, 'R1'),
+		('MOVI', 2, 'R2'),
+		('ADDI', 'R1', 'R2', 'R3'),
+		('MOVI', 3, 'R4'),
+		('ADDI', 'R3', 'R4', 'R5'),
+		('ADDI', 'R5', 'R1', 'R6'),
+		('RET', 'R6'),
+	]
+	function.register_count = 6
+	allocate_registers(function)
+	# R1 vive hasta el final, junto a otros dos valores a la vez
+	assert function.register_count == 3
+	assert Interpreter().execute([function]) == 7
+
+@pytest.mark.parametrize('name', ['loops', 'calls'])
+def test_fusion_after_allocation(name):
+	# Los registros reutilizados no impiden las superinstrucciones
+	plain = {inst[0] for inst in fuse_code(main_function(name).code)}
+	function = main_function(name)
+	allocate_registers(function)
+	assert {inst[0] for inst in fuse_code(function.code)} == plain
+
+def test_no_fusion_when_value_is_read_later():
+	code = [
+		('LOADI', 'x', 'R1'),
+		('MOVI', 1, 'R2'),
+		('ADDI', 'R1', 'R2', 'R1'),
+		('STOREI', 'R1', 'x'),
+		('PRINTI', 'R1'),
+		('MOVI', 2, 'R1'),
+		('RET', 'R1'),
+	]
+	assert fuse_code(code)[0][0] == 'LOADI'
+	# Sin el PRINTI, el resultado de la suma solo lo lee el STORE
+	del code[4]
+	assert fuse_code(code)[0] == ('ADDVCI', 'x', 1, 'x')
@@ -0,0 +1,93 @@
+# test/test_ssa.py
+from collections import Counter
+
+import pytest
+
+from cfg import ControlFlowGraph
+from ircode import get_base_op_code, get_registers
+from output import CaptureSink
+from pycompile import CompiledProgram
+from ssa import from_ssa, promotable_variables, promote_locals, to_ssa
+from support import NAMES, assert_same, compile_program, reference, transformed
+
+def main_function(name):
+	return next(function for function in compile_program(name) if function.name == '__minic_main')
+
+def test_blocks_and_dominators():
+	graph = ControlFlowGraph(main_function('loops'))
+	assert [block.label for block in graph.blocks] == ['B1', 'L1', 'L2', 'L4', 'L5', 'L6', 'L3']
+	labels = graph.labels
+	assert [block.label for block in labels['L4'].preds] == ['L2', 'L5']
+	assert [block.label for block in labels['L1'].succs] == ['L2', 'L3']
+
+	idom = graph.dominators()
+	assert {block.label: dominator.label for block, dominator in idom.items()} == {
+		'B1': 'B1', 'L1': 'B1', 'L2': 'L1', 'L3': 'L1', 'L4': 'L2', 'L5': 'L4', 'L6': 'L4'}
+	frontiers = graph.dominance_frontiers(idom)
+	assert {block.label: sorted(other.label for other in frontier) for block, frontier in frontiers.items()} == {
+		'B1': [], 'L1': ['L1'], 'L2': ['L1'], 'L3': [], 'L4': ['L1', 'L4'], 'L5': ['L4'], 'L6': ['L1']}
+
+def test_nested_loops():
+	graph = ControlFlowGraph(main_function('loops'))
+	loops = [(header.label, sorted(block.label for block in body)) for header, body in graph.loops()]
+	# Del más interno al más externo
+	assert loops == [('L4', ['L4', 'L5']), ('L1', ['L1', 'L2', 'L4', 'L5', 'L6'])]
+
+@pytest.mark.parametrize('name', NAMES)
+def test_round_trip(name):
+	assert_same(name, transformed(name, promote_locals))
+
+@pytest.mark.parametrize('name', NAMES)
+def test_single_assignment(name):
+	for function in compile_program(name):
+		graph = to_ssa(function)
+		definitions = Counter()
+		for block in graph.blocks:
+			definitions.update(phi.target for phi in block.phis)
+			for inst in block.code:
+				definitions.update(get_registers(inst)[0])
+		assert all(count == 1 for count in definitions.values()), function.name
+
+def test_phis_at_loop_header():
+	function = main_function('loops')
+	graph = to_ssa(function)
+	phis = {block.label: sorted(phi.var for phi in block.phis) for block in graph.blocks if block.phis}
+	assert phis['L1'] == ['i', 'j', 's']
+	assert phis['L4'] == ['j', 's']
+
+	from_ssa(graph)
+	promoted = promotable_variables(function)
+	variables = {args[1] if get_base_op_code(op_code) == 'STORE' else args[0]
+		for op_code, *args in function.code if get_base_op_code(op_code) in ('LOAD', 'STORE', 'ALLOC')}
+	assert not variables & set(promoted)
+	# Las globales siguen en memoria
+	assert variables == {'total'}
+
+def test_parallel_copies_and_critical_edges():
+	function = main_function('swap')
+	promote_locals(function)
+	labels = [inst[1] for inst in function.code if inst[0] == 'LABEL']
+	# La salida del while (L4 -> fin) es una arista crítica: se parte
+	# con un bloque nuevo para las copias
+	assert any(label.startswith('B') for label in labels)
+
+	# x e y se intercambian en cada vuelta: las copias del salto hacia
+	# atrás leen todos los valores antes de escribir alguno
+	back = function.code.index(('BRANCH', 'L4'))
+	copies = [ ]
+	for inst in reversed(function.code[:back]):
+		if inst[0] != 'COPYI':
+			break
+		copies.insert(0, inst)
+	half = len(copies) // 2
+	temporaries = {target for _, _, target in copies[:half]}
+	assert {source for _, source, _ in copies[half:]} == temporaries
+	assert not temporaries & {target for _, _, target in copies[half:]}
+
+def test_arrays_are_not_promoted():
+	assert set(promotable_variables(main_function('arrays'))) == {'n', 'i', 's'}
+
+@pytest.mark.parametrize('name', ['swap', 'floats'])
+def test_copies_in_python_tier(name):
+	program = CompiledProgram(transformed(name, promote_locals), CaptureSink())
+	assert program.execute() == reference(name).result
@@ -0,0 +1,115 @@
+# test/test_superinst.py
+import pytest
+
+from ircode import Function
+from interp import Interpreter
+from superinst import fuse_code, static_pair_frequencies, dynamic_pair_frequencies, pair_report
+from support import NAMES, assert_same, compile_program
+
+@pytest.mark.parametrize('code, fused', [
+	# x = y + z
+	([('LOADI', 'y', 'R1'), ('LOADI', 'z', 'R2'), ('ADDI', 'R1', 'R2', 'R3'), ('STOREI', 'R3', 'x')],
+	 [('ADDVVI', 'y', 'z', 'x')]),
+	# x = y * 2.0
+	([('LOADF', 'y', 'R1'), ('MOVF', 2.0, 'R2'), ('MULF', 'R1', 'R2', 'R3'), ('STOREF', 'R3', 'x')],
+	 [('MULVCF', 'y', 2.0, 'x')]),
+	# while (i < n)
+	([('LOADI', 'i', 'R1'), ('LOADI', 'n', 'R2'), ('CMPI', '<', 'R1', 'R2', 'R3'), ('CBRANCH', 'R3', 'L1', 'L2')],
+	 [('CMPVVBRI', '<', 'i', 'n', 'L1', 'L2')]),
+	([('LOADI', 'i', 'R1'), ('MOVI', 10, 'R2'), ('CMPI', '<', 'R1', 'R2', 'R3'), ('CBRANCH', 'R3', 'L1', 'L2')],
+	 [('CMPVCBRI', '<', 'i', 10, 'L1', 'L2')]),
+	([('CMPF', '==', 'R1', 'R2', 'R3'), ('CBRANCH', 'R3', 'L1', 'L2')],
+	 [('CMPBRF', '==', 'R1', 'R2', 'L1', 'L2')]),
+	([('MOVB', 1, 'R1'), ('STOREB', 'R1', 'b')],
+	 [('STORECB', 1, 'b')]),
+	# Los operandos del CMP están invertidos: solo se fusiona CMP/CBRANCH
+	([('LOADI', 'i', 'R1'), ('LOADI', 'n', 'R2'), ('CMPI', '<', 'R2', 'R1', 'R3'), ('CBRANCH', 'R3', 'L1', 'L2')],
+	 [('LOADI', 'i', 'R1'), ('LOADI', 'n', 'R2'), ('CMPBRI', '<', 'R2', 'R1', 'L1', 'L2')]),
+])
+def test_patterns(code, fused):
+	assert fuse_code(code) == fused
+
+@pytest.mark.parametrize('code', [
+	# R3 se lee otra vez después del STORE
+	[('LOADI', 'y', 'R1'), ('LOADI', 'z', 'R2'), ('ADDI', 'R1', 'R2', 'R3'), ('STOREI', 'R3', 'x'),
+	 ('PRINTI', 'R3')],
+	# El resultado de CMP también se imprime
+	[('CMPI', '<', 'R1', 'R2', 'R3'), ('CBRANCH', 'R3', 'L1', 'L2'), ('LABEL', 'L1'), ('PRINTI', 'R3')],
+	# El STORE no guarda el MOV
+	[('MOVI', 1, 'R1'), ('STOREI', 'R2', 'x')],
+])
+def test_not_fused(code):
+	assert fuse_code(code) == code
+
+def test_longest_pattern_first():
+	code = [('LOADI', 'y', 'R1'), ('MOVI', 1, 'R2'), ('ADDI', 'R1', 'R2', 'R3'), ('STOREI', 'R3', 'y'),
+		('MOVI', 0, 'R4'), ('STOREI', 'R4', 'z')]
+	assert fuse_code(code) == [('ADDVCI', 'y', 1, 'y'), ('STORECI', 0, 'z')]
+
+@pytest.mark.parametrize('name', NAMES)
+def test_same_result(name):
+	assert_same(name, compile_program(name))
+
+def test_interpreter_runs_fused_code():
+	interpreter = Interpreter(quickening=False)
+	interpreter.execute(compile_program('loops'))
+	handlers = {handler.__name__ for handler, _ in interpreter.functions['__minic_main'].program}
+	assert {'run_ADDVVI', 'run_ADDVCI', 'run_STORECI', 'run_CMPVCBRI'} <= handlers
+
+COUNT = [
+	('ALLOCI', 'i'),
+	('LABEL', 'L1'),
+	('LOADI', 'i', 'R1'),
+	('MOVI', 3, 'R2'),
+	('CMPI', '<', 'R1', 'R2', 'R3'),
+	('CBRANCH', 'R3', 'L2', 'L3'),
+	('LABEL', 'L2'),
+	('MOVI', 1, 'R4'),
+	('ADDI', 'R1', 'R4', 'R5'),
+	('STOREI', 'R5', 'i'),
+	('BRANCH', 'L1'),
+	('LABEL', 'L3'),
+	('RET', 'R1'),
+]
+
+def count_program():
+	function = Function('__minic_main', [ ], 'I')
+	function.code = list(COUNT)
+	function.register_count = 5
+	return [function]
+
+def test_static_pairs():
+	pairs = static_pair_frequencies(count_program())
+	assert pairs['LOADI', 'MOVI'] == 1
+	assert pairs['CBRANCH', 'LABEL'] == 1
+	assert sum(pairs.values()) == len(COUNT) - 1
+
+def test_dynamic_pairs():
+	pairs = dynamic_pair_frequencies(count_program())
+	# Tres vueltas completas y una evaluación final de la condición
+	assert pairs['LOADI', 'MOVI'] == 4
+	assert pairs['MOVI', 'ADDI'] == 3
+	assert pairs['BRANCH', 'LOADI'] == 3
+	assert pairs['CBRANCH', 'RET'] == 1
+	assert ('ALLOCI', 'LOADI') in pairs
+	# Los LABEL no se ejecutan
+	assert not any('LABEL' in pair for pair in pairs)
+
+def test_dynamic_pairs_discard_output(capsys):
+	pairs = dynamic_pair_frequencies(compile_program('print'))
+	# Cinco PRINTI, un PRINTF y un PRINTB
+	assert sum(count for (_, second), count in pairs.items() if second.startswith('PRINT')) == 7
+	assert capsys.readouterr().out == ''
+
+def test_pair_report():
+	pairs = dynamic_pair_frequencies(count_program())
+	lines = pair_report(pairs, top=2).splitlines()
+	assert len(lines) == 3
+	assert lines[1].split()[:3] == ['LOADI', 'MOVI', '4']
+
+def test_dynamic_pairs_do_not_cross_calls():
+	pairs = dynamic_pair_frequencies(compile_program('calls'))
+	# sq empieza con ALLOCI y termina con RET, y nunca sigue a un CALL
+	assert not [pair for pair in pairs if pair[0] == 'CALL' and pair[1] != 'ADDI']
+	assert pairs['CALL', 'ADDI'] == 10
+	assert not [pair for pair in pairs if pair[0] == 'RET']
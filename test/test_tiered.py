@@ -0,0 +1,37 @@
+# test/test_tiered.py
+import pytest
+
+from output import CaptureSink
+from tiered import TieredInterpreter
+from support import NAMES, compile_program, outcome, reference
+
+@pytest.mark.parametrize('name', NAMES)
+def test_same_as_interpreter(name):
+	# Umbrales bajos: casi todo el código termina en el nivel compilado
+	interpreter = TieredInterpreter(hot_calls=2, hot_loops=3, output=CaptureSink())
+	assert outcome(compile_program(name), interpreter) == reference(name)
+
+def test_promotes_hot_functions():
+	interpreter = TieredInterpreter(hot_calls=2, hot_loops=3, output=CaptureSink())
+	interpreter.execute(compile_program('fib'))
+	# fib y ack; __minic_init y __minic_main se llaman una sola vez
+	assert interpreter.promoted_functions == 2
+	assert interpreter.functions['fib'].compiled is not None
+	assert interpreter.functions['__minic_main'].compiled is None
+
+def test_promotes_hot_loop():
+	interpreter = TieredInterpreter(hot_calls=2, hot_loops=3, output=CaptureSink())
+	assert interpreter.execute(compile_program('loops')) == reference('loops').result
+	# El ciclo interno se calienta primero y su entrada OSR termina la
+	# función, incluido el ciclo externo
+	assert interpreter.promoted_loops == 1
+	assert interpreter.promoted_functions == 0
+
+def test_cold_code_stays_interpreted():
+	interpreter = TieredInterpreter(hot_calls=10**6, hot_loops=10**6, output=CaptureSink())
+	assert outcome(compile_program('fib'), interpreter) == reference('fib')
+	assert interpreter.promoted_functions == interpreter.promoted_loops == 0
+	assert interpreter.functions['fib'].calls == 1973
+
+def test_default_thresholds():
+	assert outcome(compile_program('floats'), TieredInterpreter(output=CaptureSink())) == reference('floats')
@@ -0,0 +1,77 @@
+# test/test_valnum.py
+from ircode import Function
+from valnum import ValueNumbering, number_values
+from support import compile_program
+
+def numbered_main():
+	function = next(function for function in compile_program('redundant') if function.name == '__minic_main')
+	return function, number_values(function)
+
+def count(function, op_code):
+	return sum(inst[0] == op_code for inst in function.code)
+
+def test_reuses_expressions():
+	function, stats = numbered_main()
+	assert stats['expressions'] == 1
+	# t = x * y + x * y calcula x * y una vez
+	x_times_y = [inst for inst in function.code if inst[0] == 'MULI' and inst[2] == 'R29']
+	assert len(x_times_y) == 2
+	product = x_times_y[0][-1]
+	assert ('ADDI', product, product, 'R36') in function.code
+
+def test_loads_and_stores():
+	function, stats = numbered_main()
+	assert stats['loads'] == 22
+	# x = a[i] + a[i] lee a[i] una vez; a[i] = 100 invalida esa lectura
+	assert count(function, 'ALOADI') == 2
+	assert ('ADDI', 'R16', 'R16', 'R19') in function.code
+	# i = 4 deja su valor disponible para los a[i] que siguen
+	assert ('ALOADI', 'a', 'R14', 'R16') in function.code
+
+def test_calls_invalidate_globals():
+	function, _ = numbered_main()
+	# g = 5 se reutiliza antes de bump(), pero no después
+	assert ('ADDI', 'R42', 'R43', 'R46') in function.code
+	assert ('LOADI', 'g', 'R52') in function.code
+
+def test_memory_reads_stay_in_their_block():
+	function, _ = numbered_main()
+	# x e y se escriben en la función: los LOAD del bloque del if no
+	# sirven en el bloque siguiente
+	assert ('LOADI', 'x', 'R58') in function.code and ('LOADI', 'y', 'R59') in function.code
+	assert ('LOADI', 'x', 'R63') in function.code and ('LOADI', 'y', 'R64') in function.code
+
+def test_registers_defined_twice_are_left_alone():
+	function = Function('__minic_main', [('x', 'I')], 'I')
+	function.code = [
+		('LOADI', 'x', 'R1'),
+		('ADDI', 'R1', 'R1', 'R2'),
+		('ADDI', 'R1', 'R1', 'R2'),
+		('ADDI', 'R1', 'R1', 'R3'),
+		('ADDI', 'R2', 'R3', 'R4'),
+		('RET', 'R4'),
+	]
+	function.register_count = 4
+	assert number_values(function) == {'expressions': 0, 'loads': 0}
+
+def test_loads_keyed_by_variable():
+	function = Function('f', [('x', 'I'), ('y', 'I')], 'I')
+	function.code = [
+		('LOADI', 'x', 'R1'),
+		('MOVI', 1, 'R2'),
+		('STOREI', 'R2', 'y'),
+		('LOADI', 'x', 'R3'),
+		('ADDI', 'R1', 'R3', 'R4'),
+		('STOREI', 'R4', 'x'),
+		('LOADI', 'x', 'R5'),
+		('LOADI', 'y', 'R6'),
+		('ADDI', 'R5', 'R6', 'R7'),
+		('RET', 'R7'),
+	]
+	function.register_count = 7
+	assert ValueNumbering(function).key(('LOADI', 'x', 'R1')) == (('LOAD', 'x'), 'LOADI')
+	# El STORE a y no invalida la lectura de x; cada STORE deja su valor
+	# disponible para la variable que escribe
+	assert number_values(function) == {'expressions': 0, 'loads': 3}
+	assert ('ADDI', 'R1', 'R1', 'R4') in function.code
+	assert ('ADDI', 'R4', 'R2', 'R7') in function.code